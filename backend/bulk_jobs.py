@@ -0,0 +1,214 @@
+"""
+Bulk Validation Jobs
+/validate-emails/ enqueues one job per uploaded file and answers with its
+task_id right away. A small worker pool runs the jobs; the handler (main.py)
+feeds a whole job through the validator and commits progress, partial counts
+and result rows every few seconds as verdicts land, so the HTTP request, the
+load balancer and the DB session are never held for a whole file. Each commit
+also advances the job's checkpoint, from which a restarted process resumes it.
+Every change to a job bumps its version; `BulkJob.watch` turns that into a
+coalesced feed (at most one update per tick) for the task event stream.
+"""
+import asyncio
+import os
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+BULK_JOB_WORKERS = int(os.getenv("BULK_JOB_WORKERS", "4"))  # Jobs validated at once (they share slots fairly)
+MAX_FINISHED_JOBS = 1000  # Finished jobs kept in memory for their final response
+THROUGHPUT_SAMPLES = 10  # Progress updates the throughput (and ETA) is measured over
+
+# ValidationTask.status values
+PENDING, PROCESSING, COMPLETED, FAILED = "Pending", "Processing", "Completed", "Failed"
+
+
+class BulkJob:
+    """One uploaded file waiting for / under validation"""
+
+    def __init__(self, task_id: str, user_id: int, filename: str, emails: List[str],
+                 fresh: bool = False, weight: float = 1.0):
+        self.task_id = task_id
+        self.user_id = user_id
+        self.filename = filename
+        self.emails = emails
+        self.fresh = fresh
+        self.weight = weight  # Fair-share weight of the owner's plan
+        self.status = PENDING
+        self.processed = 0
+        self.valid = 0
+        self.invalid = 0
+        self.billable = 0  # Results that cost a credit
+        self.counts: Counter = Counter()  # ValidationTask count column -> addresses
+        self.result: Optional[Dict[str, Any]] = None  # Final response payload
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = asyncio.Event()
+        self.version = 0  # Bumped by touch() on every change
+        self._changed = asyncio.Event()
+        self._samples: Deque[Tuple[float, int]] = deque(maxlen=THROUGHPUT_SAMPLES)  # (time, processed)
+
+    @property
+    def total(self) -> int:
+        return len(self.emails)
+
+    @property
+    def remaining(self) -> int:
+        return self.total - self.processed
+
+    @property
+    def progress(self) -> int:
+        return 100 if not self.emails else self.processed * 100 // self.total
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (COMPLETED, FAILED)
+
+    @property
+    def throughput(self) -> float:
+        """Addresses per second over the last THROUGHPUT_SAMPLES updates (decays while stalled)"""
+        if not self._samples:
+            return 0.0
+        since, processed = self._samples[0]
+        elapsed = (self.finished_at or time.time()) - since
+        return (self.processed - processed) / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[int]:
+        """Seconds left at the current throughput (None until it is known)"""
+        if self.finished:
+            return 0
+        throughput = self.throughput
+        return round(self.remaining / throughput) if throughput > 0 else None
+
+    def touch(self):
+        """Record a change (status, progress, counts) and wake watchers"""
+        self.version += 1
+        if self.status == PROCESSING:
+            self._samples.append((time.time(), self.processed))
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_for_change(self, version: int, timeout: float) -> bool:
+        """Wait until the job moves past `version`; False on timeout"""
+        if self.version != version:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def watch(self, tick: float, keepalive: float) -> AsyncIterator[bool]:
+        """
+        Coalesced change feed: yields True when the job changed (at most once per
+        `tick` - updates in between fold into the next one), False after `keepalive`
+        idle seconds. The last True is the finished state.
+        """
+        version = -1
+        while True:
+            if self.version != version:
+                version = self.version
+                finished = self.finished
+                yield True
+                if finished:
+                    return
+                await asyncio.sleep(tick)
+            elif not await self.wait_for_change(version, keepalive):
+                yield False
+
+
+class LeaseLost(Exception):
+    """Another worker took over the job (this worker's lease on its checkpoint lapsed)"""
+
+
+JobHandler = Callable[[BulkJob], Awaitable[None]]
+
+
+class BulkJobQueue:
+    """FIFO of bulk jobs drained by BULK_JOB_WORKERS workers"""
+
+    def __init__(self, workers: int = BULK_JOB_WORKERS):
+        self.workers = workers
+        self.handler: Optional[JobHandler] = None
+        self._queue: "asyncio.Queue[BulkJob]" = asyncio.Queue()
+        self._jobs: "OrderedDict[str, BulkJob]" = OrderedDict()
+        self._tasks: List[asyncio.Task] = []
+        self.completed = 0
+        self.failed = 0
+
+    async def start(self, handler: JobHandler):
+        self.handler = handler
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    def submit(self, job: BulkJob) -> int:
+        """Queue a job; returns how many jobs are ahead of it"""
+        self._jobs[job.task_id] = job
+        self._prune()
+        self._queue.put_nowait(job)
+        return self._queue.qsize() - 1
+
+    def get(self, task_id: str) -> Optional[BulkJob]:
+        return self._jobs.get(task_id)
+
+    def outstanding(self, user_id: int) -> int:
+        """Addresses of a user's unfinished jobs (not charged yet)"""
+        return sum(job.remaining for job in self._jobs.values() if job.user_id == user_id and not job.finished)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job.status = PROCESSING
+            job.started_at = time.time()
+            job.touch()
+            try:
+                await self.handler(job)
+                job.status = COMPLETED
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except LeaseLost as e:
+                print(f"[BULK JOB] {job.task_id} handed over: {e}")
+                job.status = FAILED
+                job.error = "Taken over by another worker"
+                self._jobs.pop(job.task_id, None)  # Status comes from the task row now
+            except Exception as e:
+                print(f"[BULK JOB] {job.task_id} failed: {e}")
+                job.status = FAILED
+                job.error = str(e)
+                self.failed += 1
+            finally:
+                job.finished_at = time.time()
+                job.touch()
+                job.done.set()
+                self._queue.task_done()
+
+    def _prune(self):
+        finished = [task_id for task_id, job in self._jobs.items() if job.finished]
+        for task_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[task_id]
+
+    async def close(self):
+        """Stop the workers (app shutdown); interrupted jobs resume from their checkpoints on the next start"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        running = [job for job in self._jobs.values() if job.status == PROCESSING]
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "running": {job.task_id: {"progress": job.progress, "total": job.total} for job in running},
+            "completed": self.completed,
+            "failed": self.failed
+        }
+
+
+# ======================= GLOBAL QUEUE =======================
+
+bulk_jobs = BulkJobQueue()
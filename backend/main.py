@@ -1,15 +1,27 @@
 from fastapi import FastAPI, UploadFile, File, Form, APIRouter, Depends, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-import csv, os, time
-from typing import List, Dict, Optional, Literal, Any
+import asyncio, csv, json, os, socket, time
+from collections import Counter
+from functools import partial
+from typing import Any, Callable, Dict, List, Literal, Optional, Set
 from sqlalchemy.ext.asyncio import AsyncSession
 from db import engine
 from sqlalchemy.future import select
-from models import EmailRecord, Base, User, CreditHistory, ValidationTask
-from db import get_db
+from models import EmailRecord, Base, User, CreditHistory, ValidationTask, SubscriptionPlan, UserSubscription, BulkJobCheckpoint
+from db import get_db, AsyncSessionLocal
 from config import DATABASE_URL
+from validator.cache_store import open_cache_store, close_cache_store
+from validator.cache_backend import get_cache_backend
+from validator.concurrency import get_limiter_stats
+from validator.domain_profile import domain_profiles
+from validator.circuit_breaker import smtp_breaker
+from validator.greylist_queue import greylist_queue, is_greylisted
+from validator.pending_checks import pending_checks
+from validator.rate_limit import mx_rate_limiter
+from bulk_jobs import bulk_jobs, BulkJob, LeaseLost, PENDING, PROCESSING, COMPLETED, FAILED
+from validator.priority import priority_lane, fair_share, plan_weight, get_priority_stats, get_job_stats, LANE_BULK
 
 # Validator mode: "async" (production), "fast" (default), or "strict"
 VALIDATOR_MODE = os.getenv("VALIDATOR_MODE", "async").lower()
@@ -17,19 +29,21 @@ VALIDATOR_MODE = os.getenv("VALIDATOR_MODE", "async").lower()
 if VALIDATOR_MODE == "async":
     # NEW: Production-grade async validator (2,200 emails in <30s)
     print("INFO: Using ASYNC PRODUCTION validator (domain-pooled SMTP, <30s for 2000 emails)")
-    from validator.async_validator import validate_email_async, validate_bulk_async
+    from validator.async_validator import validate_email_async, validate_bulk_async, validate_email_instant
     
     # Wrapper to match existing interface
-    async def process_emails_async_wrapper(emails, batch_id=None, validation_type="individual"):
+    async def process_emails_async_wrapper(emails, batch_id=None, validation_type="individual", fresh=False, on_result=None):
         valid_statuses = ("valid", "role")
         if len(emails) == 1:
-            result = await validate_email_async(emails[0])
+            result = await validate_email_async(emails[0], fresh=fresh)
             if batch_id:
                 result["batch_id"] = batch_id
+            if on_result:
+                on_result(result)
             is_valid = result["status"] in valid_statuses
             return [result], 1, 1 if is_valid else 0, 0 if is_valid else 1, []
         else:
-            results = await validate_bulk_async(emails, batch_id)
+            results = await validate_bulk_async(emails, batch_id, fresh=fresh, on_result=on_result)
             total = len(results)
             valid = sum(1 for r in results if r.get("status") in valid_statuses)
             # risky is counted separately or as invalid depending on UI, but for basic count:
@@ -74,7 +88,7 @@ else:
 
 from contextlib import asynccontextmanager
 from uuid import uuid4
-from sqlalchemy import func, case
+from sqlalchemy import func, case, update, delete, exists, or_
 import bcrypt
 from signup import router as signup_router
 from jose import jwt
@@ -89,6 +103,9 @@ router = APIRouter()
 # Global async validator instance (not used in async mode, but needed for compatibility)
 _async_validator: Optional[Any] = None
 
+# Maintenance loops started by the lifespan
+_background_tasks: set = set()
+
 # Placeholder for async mode (not needed since we import functions directly)
 if VALIDATOR_MODE == "async":
     AsyncEmailValidator = None
@@ -112,12 +129,48 @@ async def lifespan(app: FastAPI):
             print("SUCCESS: Async email validator initialized with warm-up.")
         else:
             print("SUCCESS: Async production validator loaded (no initialization needed).")
+        
+        # Warm start MX / catch-all caches from the persistent store (VALIDATOR_CACHE_PATH)
+        cache_store = open_cache_store()
+        if cache_store:
+            if VALIDATOR_MODE == "async":
+                from validator.async_validator import dns_cache
+                loaded = dns_cache.load_persisted(cache_store)
+            else:
+                from validator.fast_validator import load_persisted_caches
+                loaded = load_persisted_caches(cache_store)
+            loaded += domain_profiles.load_persisted(cache_store)
+            pending = greylist_queue.load_persisted(cache_store)
+            await cache_store.start()
+            print(f"SUCCESS: Loaded {loaded} cached MX/catch-all/profile entries and {pending} pending greylist re-checks from {cache_store.path}")
+        
+        # Deferred re-checks of greylisted (450/451) addresses
+        await greylist_queue.start(recheck=recheck_greylisted, on_verdict=apply_greylist_verdict)
+        
+        # Bulk uploads cut off by a restart continue from their last checkpoint
+        resumed = await resume_bulk_jobs()
+        await bulk_jobs.start(run_bulk_job)
+        _background_tasks.add(asyncio.create_task(keep_bulk_job_leases()))
+        if resumed:
+            print(f"SUCCESS: Resumed {resumed} bulk validation tasks from their checkpoints.")
     except Exception as e:
         print(f"ERROR during startup: {e}")
     yield
     # Cleanup on shutdown
+    for task in _background_tasks:
+        task.cancel()
+    await bulk_jobs.close()
+    await release_bulk_job_leases()
     if _async_validator:
         await _async_validator.cleanup()
+    if VALIDATOR_MODE == "async":
+        from validator.async_validator import smtp_pools
+        await smtp_pools.close_all()
+    await smtp_breaker.close()
+    await greylist_queue.close()
+    await pending_checks.close()
+    await close_cache_store()
+    await get_cache_backend().close()
     print("Shutting down app.")
 
 app = FastAPI(lifespan=lifespan)
@@ -147,7 +200,7 @@ app.add_middleware(
 )
 
 # Constants
-BATCH_SIZE = 250  # Optimized batch size for async processing
+CHECKPOINT_INTERVAL = 2.0  # Seconds between commits of a bulk job's finished results (progress + checkpoint)
 
 @app.get("/")
 def read_root():
@@ -155,10 +208,13 @@ def read_root():
 
 # ======================= Email Validation Core =======================
 
-async def process_emails_async(emails: List[str], batch_id: str = None, validation_type: str = "individual"):
+async def process_emails_async(emails: List[str], batch_id: str = None, validation_type: str = "individual", fresh: bool = False,
+                               on_result: Optional[Callable[[Dict[str, Any]], None]] = None):
     """
     High-performance async email validation.
     Uses the appropriate validator based on VALIDATOR_MODE.
+    fresh=True bypasses the verdict cache (async mode).
+    on_result is called with each result as soon as it is final (bulk job progress).
     """
     global _async_validator
     
@@ -168,12 +224,14 @@ async def process_emails_async(emails: List[str], batch_id: str = None, validati
         start_time = time.time()
         
         if len(emails) == 1:
-            result = await validate_email_async(emails[0])
+            result = await validate_email_async(emails[0], fresh=fresh)
             if batch_id:
                 result["batch_id"] = batch_id
+            if on_result:
+                on_result(result)
             results = [result]
         else:
-            results = await validate_bulk_async(emails, batch_id)
+            results = await validate_bulk_async(emails, batch_id, fresh=fresh, on_result=on_result)
         
         elapsed = time.time() - start_time
         print(f"PERF: Validated {len(emails)} emails in {elapsed:.2f}s ({len(emails)/max(elapsed, 0.001):.1f} emails/sec)")
@@ -194,9 +252,11 @@ async def process_emails_async(emails: List[str], batch_id: str = None, validati
     
     start_time = time.time()
     if validation_type == "bulk" or len(emails) > 1:
-        results = await _async_validator.validate_bulk(emails, batch_id)
+        results = await _async_validator.validate_bulk(emails, batch_id, on_result=on_result)
     else:
         result = await _async_validator.validate_email(emails[0])
+        if on_result:
+            on_result(result)
         results = [result]
     
     total = len(emails)
@@ -206,6 +266,501 @@ async def process_emails_async(emails: List[str], batch_id: str = None, validati
     
     return results, total, valid, invalid, failed_emails
 
+# ======================= Result Files & Task Counts =======================
+
+VALIDATED_FIELDNAMES = [
+    'email', 'status', 'sub_status', 'score', 
+    'syntax_val', 'domain_exists', 'mx_record', 
+    'is_disposable', 'is_role', 'is_catch_all', 'verdict'
+]
+
+# Serializes rewrites of validated_*.csv files by greylist verdicts
+_result_file_lock = asyncio.Lock()
+
+def _result_category(r: Dict[str, Any]) -> str:
+    """ValidationTask count column a result falls into (status-driven, Principal Architect Rule)"""
+    status = r.get("status", "invalid")
+    sub_status = r.get("sub_status", "none")
+    
+    if status == "valid": return "safe_count"
+    elif status == "role" or sub_status == "role_based": return "role_count"
+    elif status == "catch_all" or sub_status == "catchall": return "catch_all_count"
+    elif status == "disposable" or sub_status == "disposable": return "disposable_count"
+    elif sub_status == "mailbox_full": return "inbox_full_count"
+    elif sub_status == "spamtrap": return "spam_trap_count"
+    elif sub_status == "disabled": return "disabled_count"
+    elif status == "invalid": return "invalid_count"
+    return "unknown_count"  # Risky and anything uncertain
+
+def _validated_row(r: Dict[str, Any]) -> Dict[str, Any]:
+    """One row of a validated_*.csv result file (Architect Format)"""
+    return {
+        "email": r["email"], 
+        "status": r.get("status"),
+        "sub_status": r.get("sub_status"),
+        "score": r.get("score"),
+        "syntax_val": r.get("checks", {}).get("syntax"),
+        "domain_exists": r.get("checks", {}).get("domain"),
+        "mx_record": r.get("checks", {}).get("mx"),
+        "is_disposable": r.get("is_disposable"),
+        "is_role": r.get("is_role_account"),
+        "is_catch_all": r.get("is_catch_all"),
+        "verdict": r.get("status")
+    }
+
+def _write_validated_rows(filename: str, results: List[Dict[str, Any]], header: bool = False):
+    """Append rows to a result file, or start it with the header (blocking - run via to_thread)"""
+    with open(filename, 'w' if header else 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=VALIDATED_FIELDNAMES)
+        if header:
+            writer.writeheader()
+        writer.writerows([_validated_row(r) for r in results])
+
+def _rewrite_validated_row(filename: str, result: Dict[str, Any]):
+    """Replace one address's row in a result file (blocking - run via to_thread)"""
+    if not os.path.exists(filename):
+        return
+    with open(filename, newline='') as f:
+        rows = list(csv.DictReader(f))
+    email = result["email"].lower()
+    _replace_validated_rows(filename, [_validated_row(result) if row["email"].lower() == email else row for row in rows])
+
+def _truncate_validated_rows(filename: str, keep: int) -> Set[str]:
+    """
+    Cut a result file back to its first `keep` rows - the ones covered by the last checkpoint -
+    and return their addresses (blocking)
+    """
+    rows = []
+    if os.path.exists(filename):
+        with open(filename, newline='') as f:
+            rows = [row for _, row in zip(range(keep), csv.DictReader(f))]
+    _replace_validated_rows(filename, rows)
+    return {row["email"] for row in rows}
+
+def _replace_validated_rows(filename: str, rows: List[Dict[str, Any]]):
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=VALIDATED_FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp_filename, filename)
+
+# ======================= Greylist Re-checks =======================
+
+def schedule_greylisted(results: List[Dict[str, Any]], user_id: int, task_id: str = None, filename: str = None) -> int:
+    """Queue deferred re-checks for results that got a temporary 450/451 RCPT reply"""
+    scheduled = 0
+    for r in results:
+        if is_greylisted(r):
+            context = {"user_id": user_id, "task_id": task_id, "file": filename, "category": _result_category(r)}
+            scheduled += greylist_queue.schedule(r["email"], r, context)
+    return scheduled
+
+async def recheck_greylisted(email: str) -> Dict[str, Any]:
+    """Re-validate one greylisted address, bypassing the verdict cache (background work - bulk lane)"""
+    with priority_lane(LANE_BULK), fair_share("greylist-rechecks"):
+        results, *_ = await process_emails_async([email], validation_type="individual", fresh=True)
+    return results[0]
+
+async def _update_email_record(db: AsyncSession, user_id: int, result: Dict[str, Any]):
+    """Overwrite the user's latest EmailRecord for this address with a later verdict"""
+    record = (await db.execute(
+        select(EmailRecord)
+        .where(EmailRecord.user_id == user_id, EmailRecord.email == result["email"])
+        .order_by(EmailRecord.created_at.desc())
+    )).scalars().first()
+    if record:
+        record.status = result["status"]
+        record.smtp = result.get("smtp", "N/A")
+
+async def apply_greylist_verdict(context: Dict[str, Any], result: Dict[str, Any]):
+    """Final verdict of a greylist re-check: update the EmailRecord, the task counts and the result file"""
+    async with AsyncSessionLocal() as db:
+        await _update_email_record(db, context["user_id"], result)
+        
+        if context.get("task_id"):
+            task = (await db.execute(
+                select(ValidationTask).where(ValidationTask.task_id == context["task_id"])
+            )).scalars().first()
+            old_category, new_category = context["category"], _result_category(result)
+            if task and old_category != new_category:
+                setattr(task, old_category, max(0, (getattr(task, old_category) or 0) - 1))
+                setattr(task, new_category, (getattr(task, new_category) or 0) + 1)
+                job = bulk_jobs.get(context["task_id"])
+                if job:
+                    job.counts[old_category] -= 1
+                    job.counts[new_category] += 1
+                    job.touch()
+        await db.commit()
+    
+    if context.get("file"):
+        async with _result_file_lock:
+            await asyncio.to_thread(_rewrite_validated_row, context["file"], result)
+    print(f"GREYLIST: {result['email']} re-checked -> {result['status']}")
+
+# ======================= Fair Share =======================
+
+async def _fair_share_weight(db: AsyncSession, user: User) -> float:
+    """Round-robin weight of a user's bulk jobs, from their active subscription plan (VALIDATOR_PLAN_WEIGHTS)"""
+    plan_name = (await db.execute(
+        select(SubscriptionPlan.name)
+        .join(UserSubscription, UserSubscription.plan_id == SubscriptionPlan.id)
+        .where(UserSubscription.user_id == user.id, UserSubscription.active == True)
+    )).scalars().first()
+    return plan_weight(plan_name)
+
+# ======================= Bulk Jobs =======================
+
+BULK_JOB_LEASE = int(os.getenv("BULK_JOB_LEASE", "60"))  # Seconds a worker's claim on a task lasts without renewal
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"  # Lease owner name of this process
+
+def _lease_until() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=BULK_JOB_LEASE)
+
+async def _get_task(db: AsyncSession, task_id: str) -> Optional[ValidationTask]:
+    return (await db.execute(select(ValidationTask).where(ValidationTask.task_id == task_id))).scalars().first()
+
+# Response key -> ValidationTask count column
+CATEGORY_KEYS = {
+    "safe": "safe_count",
+    "role": "role_count",
+    "catch_all": "catch_all_count",
+    "disposable": "disposable_count",
+    "inbox_full": "inbox_full_count",
+    "risky": "unknown_count",
+    "disabled": "disabled_count",
+    "invalid": "invalid_count",
+}
+
+def _category_counts(counts: Counter) -> Dict[str, int]:
+    return {key: counts[column] for key, column in CATEGORY_KEYS.items()}
+
+def _bulk_job_response(job: BulkJob, validated_filename: str, credits_remaining: int) -> Dict[str, Any]:
+    """Per-file result of a finished task (the response shape of the old synchronous endpoint)"""
+    return {
+        "file": job.filename, "total": job.processed, "valid": job.valid,
+        **_category_counts(job.counts),
+        "validated_download": f"/download/{validated_filename}",
+        "credits_remaining": credits_remaining,
+        "batch_id": job.task_id
+    }
+
+TASK_PROGRESS_TICK = 1.0  # Seconds between progress events of one task stream (changes in between are coalesced)
+
+def _task_progress(job: BulkJob) -> Dict[str, Any]:
+    """Live state of a queued / running task (task event stream payload)"""
+    progress = {
+        "task_id": job.task_id, "file": job.filename, "status": job.status,
+        "total": job.total, "processed": job.processed, "progress": job.progress,
+        "valid": job.valid, "invalid": job.invalid,
+        "counts": _category_counts(job.counts),
+        "throughput": round(job.throughput, 1),  # Addresses / second
+        "eta_seconds": job.eta
+    }
+    if job.error:
+        progress["error"] = job.error
+    if job.result:
+        progress["result"] = job.result
+    return progress
+
+def _is_valid_result(r: Dict[str, Any]) -> bool:
+    return str(r.get("status")).lower() in ("valid", "safe", "role")
+
+async def _commit_bulk_results(job: BulkJob, results: List[Dict[str, Any]], validated_filename: str) -> bool:
+    """
+    Store verdicts that landed since the last commit: result rows, EmailRecords, the task's progress and
+    partial counts and the checkpoint cursor (one transaction, which also renews this worker's lease).
+    False if the task was deleted meanwhile; LeaseLost if another worker has taken the job over.
+    """
+    counts = Counter(_result_category(r) for r in results)
+    job.processed += len(results)
+    job.valid += sum(1 for r in results if _is_valid_result(r))
+    job.invalid += sum(1 for r in results if str(r.get("status")).lower() == "invalid")
+    # REQ: Deduct only for non-error results (anything that gives a status)
+    job.billable += sum(1 for r in results if r.get("status") not in ["unknown", "error"])
+    job.counts.update(counts)
+    job.touch()
+    
+    async with AsyncSessionLocal() as db:
+        # Cursor and lease first: the row stays locked until commit, so no other worker can claim it in between
+        claimed = await db.execute(
+            update(BulkJobCheckpoint)
+            .where(BulkJobCheckpoint.task_id == job.task_id, BulkJobCheckpoint.owner == WORKER_ID)
+            .values(processed=job.processed, valid=job.valid, invalid=job.invalid, billable=job.billable,
+                    lease_until=_lease_until())
+        )
+        if claimed.rowcount == 0:
+            raise LeaseLost(f"checkpoint of {job.task_id} is held by another worker")
+        async with _result_file_lock:
+            await asyncio.to_thread(_write_validated_rows, validated_filename, results)
+        for result in results:
+            db.add(EmailRecord(
+                email=result["email"], 
+                regex=result.get("regex", "N/A"), 
+                mx=result.get("mx", "N/A"),
+                smtp=result.get("smtp", "N/A"), 
+                status=result["status"],
+                created_at=datetime.utcnow(), 
+                user_id=job.user_id
+            ))
+        # Increments in SQL: greylist verdicts may move counts of the same task concurrently
+        updated = await db.execute(
+            update(ValidationTask).where(ValidationTask.task_id == job.task_id).values(
+                status=PROCESSING, progress=job.progress,
+                **{column: getattr(ValidationTask, column) + n for column, n in counts.items()}
+            )
+        )
+        await db.commit()
+    if updated.rowcount == 0:
+        return False
+    schedule_greylisted(results, job.user_id, job.task_id, validated_filename)
+    return True
+
+async def run_bulk_job(job: BulkJob):
+    """
+    Validate one queued upload. The whole file goes through the engine in one call, so domain grouping
+    and catch-all-first see every address; verdicts are collected as they land and committed every
+    CHECKPOINT_INTERVAL seconds (see _commit_bulk_results). Credits are charged once, together with
+    the final status and the checkpoint's removal - also for the part validated before the task was
+    deleted (the job stops at its next commit). A job resumed after a restart validates only the
+    addresses its checkpoint does not cover.
+    """
+    validated_filename = f"validated_{job.task_id}_{job.filename}"
+    try:
+        done: Set[str] = set()
+        if job.processed:
+            # Drop result rows that were written but not committed before the restart
+            async with _result_file_lock:
+                done = await asyncio.to_thread(_truncate_validated_rows, validated_filename, job.processed)
+        else:
+            await asyncio.to_thread(_write_validated_rows, validated_filename, [], True)
+        
+        landed: List[Dict[str, Any]] = []
+        # Bulk lane: single checks keep reserved worker / SMTP slots and jump the queue;
+        # concurrent uploads share the bulk slots round-robin per user
+        with priority_lane(LANE_BULK), fair_share(f"user:{job.user_id}", job.task_id, job.weight):
+            engine = asyncio.ensure_future(process_emails_async(
+                [email for email in job.emails if email not in done], batch_id=job.task_id,
+                validation_type="bulk", fresh=job.fresh, on_result=landed.append
+            ))
+        task_exists = True
+        try:
+            # Until the engine is done AND nothing is left: verdicts may land while a commit is awaited
+            while task_exists and (landed or not engine.done()):
+                if not engine.done():
+                    await asyncio.wait([engine], timeout=CHECKPOINT_INTERVAL)
+                results, landed[:] = landed[:], []
+                if results:
+                    task_exists = await _commit_bulk_results(job, results, validated_filename)
+            if task_exists:
+                engine.result()  # Engine errors fail the job
+        finally:
+            engine.cancel()
+        
+        async with AsyncSessionLocal() as db:
+            # Only the lease holder finishes (and charges) a job
+            finished = await db.execute(
+                delete(BulkJobCheckpoint).where(BulkJobCheckpoint.task_id == job.task_id, BulkJobCheckpoint.owner == WORKER_ID)
+            )
+            if finished.rowcount == 0:
+                raise LeaseLost(f"checkpoint of {job.task_id} is held by another worker")
+            user = await db.get(User, job.user_id)
+            if job.billable > 0:
+                user.credits -= job.billable
+                db.add(CreditHistory(
+                    user_id=job.user_id,
+                    reason=f"Bulk Verification - {job.filename}",
+                    credits_change_instant=-job.billable,
+                    balance_after_instant=user.credits
+                ))
+            else:
+                print(f"DEBUG: No credits deducted for {job.filename} as all validations failed.")
+            task = await _get_task(db, job.task_id)
+            if task:
+                task.status = COMPLETED
+                task.progress = 100
+                task.download_url = f"/download/{validated_filename}"
+                task.completed_at = datetime.utcnow()
+            else:
+                print(f"BULK: task {job.task_id} was deleted after {job.processed} addresses - stopped")
+            await db.commit()
+            job.result = _bulk_job_response(job, validated_filename, user.credits)
+    except LeaseLost:
+        raise  # The new owner carries on from the checkpoint
+    except Exception:
+        try:
+            async with AsyncSessionLocal() as db:
+                failed = await db.execute(
+                    delete(BulkJobCheckpoint).where(BulkJobCheckpoint.task_id == job.task_id, BulkJobCheckpoint.owner == WORKER_ID)
+                )
+                if failed.rowcount:
+                    await db.execute(update(ValidationTask).where(ValidationTask.task_id == job.task_id).values(status=FAILED))
+                await db.commit()
+        except Exception as e:
+            print(f"ERROR: Could not mark task {job.task_id} as failed: {e}")
+        raise
+
+async def _claim_checkpoints(db: AsyncSession) -> List[BulkJobCheckpoint]:
+    """
+    Take over checkpoints no live worker holds (never claimed, or lease expired). Each claim is one
+    conditional UPDATE, so when workers race for a checkpoint exactly one of them gets it.
+    """
+    now = datetime.utcnow()
+    candidates = (await db.execute(
+        select(BulkJobCheckpoint.id)
+        .where(or_(BulkJobCheckpoint.owner.is_(None), BulkJobCheckpoint.lease_until < now))
+        .order_by(BulkJobCheckpoint.id)
+    )).scalars().all()
+    claimed = []
+    for checkpoint_id in candidates:
+        result = await db.execute(
+            update(BulkJobCheckpoint)
+            .where(BulkJobCheckpoint.id == checkpoint_id,
+                   or_(BulkJobCheckpoint.owner.is_(None), BulkJobCheckpoint.lease_until < now))
+            .values(owner=WORKER_ID, lease_until=_lease_until())
+        )
+        if result.rowcount:
+            claimed.append(checkpoint_id)
+    await db.commit()
+    if not claimed:
+        return []
+    return (await db.execute(
+        select(BulkJobCheckpoint).where(BulkJobCheckpoint.id.in_(claimed)).order_by(BulkJobCheckpoint.id)
+    )).scalars().all()
+
+async def resume_bulk_jobs() -> int:
+    """
+    Requeue here the tasks whose worker is gone (restart, crash), from the checkpoints this process
+    claimed; unfinished tasks left without any checkpoint are marked Failed.
+    """
+    resumed = 0
+    async with AsyncSessionLocal() as db:
+        for checkpoint in await _claim_checkpoints(db):
+            task = await _get_task(db, checkpoint.task_id)
+            if task is None or task.status not in (PENDING, PROCESSING):
+                if task is None and checkpoint.billable:
+                    # Deleted mid-run: the committed part is still charged, as run_bulk_job would have
+                    user = await db.get(User, checkpoint.user_id)
+                    user.credits -= checkpoint.billable
+                    db.add(CreditHistory(
+                        user_id=user.id,
+                        reason=f"Bulk Verification - {checkpoint.filename}",
+                        credits_change_instant=-checkpoint.billable,
+                        balance_after_instant=user.credits
+                    ))
+                await db.delete(checkpoint)
+                continue
+            running = bulk_jobs.get(checkpoint.task_id)
+            if running and not running.finished:
+                continue  # Still ours: the lease had lapsed (renewals failing) but nobody took it
+            job = BulkJob(checkpoint.task_id, checkpoint.user_id, checkpoint.filename, json.loads(checkpoint.emails),
+                          fresh=checkpoint.fresh, weight=checkpoint.weight)
+            job.processed, job.valid, job.invalid = checkpoint.processed, checkpoint.valid, checkpoint.invalid
+            job.billable = checkpoint.billable
+            # The task row also carries greylist re-check moves
+            job.counts.update({column: getattr(task, column) or 0 for column in CATEGORY_KEYS.values()})
+            bulk_jobs.submit(job)
+            resumed += 1
+        # Task and checkpoint are created, finished and failed in the same transactions,
+        # so an unfinished task without one was cut off before checkpoints existed
+        await db.execute(
+            update(ValidationTask)
+            .where(ValidationTask.status.in_([PENDING, PROCESSING]),
+                   ~exists().where(BulkJobCheckpoint.task_id == ValidationTask.task_id))
+            .values(status=FAILED)
+        )
+        await db.commit()
+    return resumed
+
+async def keep_bulk_job_leases():
+    """
+    Every BULK_JOB_LEASE / 3 seconds: renew the leases of this process's tasks (queued ones included)
+    and pick up tasks whose worker stopped renewing.
+    """
+    while True:
+        await asyncio.sleep(BULK_JOB_LEASE / 3)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(BulkJobCheckpoint).where(BulkJobCheckpoint.owner == WORKER_ID).values(lease_until=_lease_until())
+                )
+                await db.commit()
+            resumed = await resume_bulk_jobs()
+            if resumed:
+                print(f"BULK: took over {resumed} tasks of a stopped worker")
+        except Exception as e:
+            print(f"ERROR: Bulk job lease renewal failed: {e}")
+
+async def release_bulk_job_leases():
+    """Shutdown: hand this process's unfinished tasks to the next worker that looks (no lease to wait out)"""
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(BulkJobCheckpoint).where(BulkJobCheckpoint.owner == WORKER_ID).values(owner=None, lease_until=None)
+            )
+            await db.commit()
+    except Exception as e:
+        print(f"ERROR: Could not release bulk job leases: {e}")
+
+# ======================= Two-Tier Single Checks =======================
+
+SINGLE_CHECK_MAX_WAIT = 30.0  # Longest long-poll on a pending check (seconds)
+SSE_KEEPALIVE_INTERVAL = 15.0
+
+def _charge_single_check(db: AsyncSession, user: User, result: Dict[str, Any]):
+    """One credit for a finished single check (none for validation errors), with its history row"""
+    if result.get("status") in ["Error", "Unknown"]:
+        print(f"DEBUG: No credit deducted for {result['email']} due to validation error.")
+        return
+    user.credits -= 1
+    db.add(CreditHistory(
+        user_id=user.id,
+        reason=f"Single Email Verification - {result['email']}",
+        credits_change_instant=-1,
+        balance_after_instant=user.credits
+    ))
+
+async def apply_deep_result(user_id: int, result: Dict[str, Any]):
+    """Final SMTP / catch-all verdict of an instant-mode check: update the stored record and charge the check"""
+    async with AsyncSessionLocal() as db:
+        await _update_email_record(db, user_id, result)
+        user = await db.get(User, user_id)
+        if user:
+            _charge_single_check(db, user, result)
+        await db.commit()
+    schedule_greylisted([result], user_id)
+
+def _single_email_response(result: Dict[str, Any], time_taken: float, credits_remaining: int) -> Dict[str, Any]:
+    """Response body of the single-email endpoints (keys expected by the frontend)"""
+    return {
+        "email": result["email"],
+        "is_valid": result["status"] in ("valid", "role"),
+        "status": result["status"],
+        "reason": result.get("reason", "N/A"),
+        "syntax_valid": result.get("checks", {}).get("syntax", False),
+        "mx_valid": result.get("checks", {}).get("mx", False),
+        "smtp_status": result.get("checks", {}).get("smtp", "N/A"),
+        "disposable": result.get("is_disposable", False),
+        "role_based": result.get("is_role_account", False),
+        "catch_all": result.get("is_catch_all", False),
+        "score": result.get("score", 0),
+        "grade": result.get("quality_grade", "N/A"),
+        "time_taken": round(time_taken, 2),
+        "credits_remaining": credits_remaining,
+        "cached": result.get("cached", False),
+        # Keys expected by frontend components
+        "regex": "Valid" if result.get("checks", {}).get("syntax") else "Not Valid",
+        "mx": "Valid" if result.get("checks", {}).get("mx") else "Not Valid",
+        "smtp": "Pending" if result.get("checks", {}).get("smtp") == "pending"
+                else "Valid" if result["status"] in ("valid", "role") else "Not Valid"
+    }
+
+def _pending_check_response(check, credits_remaining: int) -> Dict[str, Any]:
+    end = check.finished_at or time.time()
+    resp = _single_email_response(check.current(), end - check.created_at, credits_remaining)
+    resp.update({"check_id": check.check_id, "pending_smtp": check.pending, "smtp_failed": check.failed})
+    return resp
+
 # ======================= Models =======================
 
 class LoginData(BaseModel):
@@ -364,161 +919,95 @@ async def update_user_profile(
 async def validate_emails(
     files: List[UploadFile] = File([]),
     email: Optional[str] = Form(None),
+    fresh: bool = Form(False),
+    wait: bool = Form(False),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    """
+    Queue one validation task per uploaded file and answer right away with its task_id.
+    Poll /user/validation-task/{task_id} for status, progress and partial counts, or follow
+    live progress from /user/validation-task/{task_id}/events;
+    wait=true keeps the old behaviour (block until done and return the full results).
+    """
     print(f"BULK validation requested by {current_user.email}")
-    start_time = time.time()
-    response_payload = []
-    batch_id = uuid4().hex
     try:
         if email:
             # Re-direct to single validation logic if email is provided here
-            return await validate_single_email(email=email, db=db, current_user=current_user)
-
-        if files:
-            for file in files:
-                contents = await file.read()
-                lines = contents.decode(errors='ignore').splitlines()
-                try:
-                    reader = csv.DictReader(lines)
-                    emails = [row.get('email', '').strip() for row in reader if row.get('email')]
-                    if not emails:
-                         emails = [line.strip() for line in lines if line.strip()]
-                except Exception:
-                    emails = [line.strip() for line in lines if line.strip()]
-
-                # REQ 15: Automatically remove duplicate emails
-                emails = list(dict.fromkeys([e.lower() for e in emails if e]))
-                
-                if not emails:
-                    continue
-
-                if current_user.credits < len(emails):
-                    raise HTTPException(
-                        status_code=403, 
-                        detail=f"Insufficient credits. You need {len(emails)} credits for this file, but only have {current_user.credits}."
-                    )
-
-                # REQ 22: Cache / Deduplicate against DB if needed (Optional but suggested)
-                # For now, we process all provided unique emails.
-
-                results, total, valid, invalid, _ = await process_emails_async(emails, batch_id=batch_id, validation_type="bulk")
-                
-                # REQ: Deduct only for non-error results (anything that gives a status)
-                successful_results = [r for r in results if r.get("status") not in ["unknown", "error"]]
-                deduction_count = len(successful_results)
-                
-                if deduction_count > 0:
-                    current_user.credits -= deduction_count
-                    db.add(CreditHistory(
-                        user_id=current_user.id,
-                        reason=f"Bulk Verification - {file.filename}",
-                        credits_change_instant=-deduction_count,
-                        balance_after_instant=current_user.credits
-                    ))
-                else:
-                    print(f"DEBUG: No credits deducted for {file.filename} as all validations failed.")
-
-                for result in results:
-                    db.add(EmailRecord(
-                        email=result["email"], 
-                        regex=result.get("regex", "N/A"), 
-                        mx=result.get("mx", "N/A"),
-                        smtp=result.get("smtp", "N/A"), 
-                        status=result["status"],
-                        created_at=datetime.utcnow(), 
-                        user_id=current_user.id
-                    ))
-                
-                # Calculate detailed category counts for visualization (Status-driven)
-                safe_count = role_count = catch_all_count = disposable_count = 0
-                inbox_full_count = spam_trap_count = disabled_count = invalid_count = risky_count = 0
-                
-                # Status-driven aggregation (Principal Architect Rule)
-                for r in results:
-                    status = r.get("status", "invalid")
-                    sub_status = r.get("sub_status", "none")
-                    
-                    if status == "valid": safe_count += 1
-                    elif status == "role" or sub_status == "role_based": role_count += 1
-                    elif status == "catch_all" or sub_status == "catchall": catch_all_count += 1
-                    elif status == "disposable" or sub_status == "disposable": disposable_count += 1
-                    elif sub_status == "mailbox_full": inbox_full_count += 1
-                    elif sub_status == "spamtrap": spam_trap_count += 1
-                    elif sub_status == "disabled": disabled_count += 1
-                    elif status == "invalid": invalid_count += 1
-                    elif status == "risky": risky_count += 1
-                    else: risky_count += 1 # Default fallback for uncertainty
-
-                
-                
-                validated_filename = f"validated_{batch_id}_{file.filename}"
-                # Save results to a file for download (Architect Format)
-                with open(validated_filename, 'w', newline='') as f:
-                    writer = csv.DictWriter(f, fieldnames=[
-                        'email', 'status', 'sub_status', 'score', 
-                        'syntax_val', 'domain_exists', 'mx_record', 
-                        'is_disposable', 'is_role', 'is_catch_all', 'verdict'
-                    ])
-                    writer.writeheader()
-                    writer.writerows([
-                        {
-                            "email": r["email"], 
-                            "status": r.get("status"),
-                            "sub_status": r.get("sub_status"),
-                            "score": r.get("score"),
-                            "syntax_val": r.get("checks", {}).get("syntax"),
-                            "domain_exists": r.get("checks", {}).get("domain"),
-                            "mx_record": r.get("checks", {}).get("mx"),
-                            "is_disposable": r.get("is_disposable"),
-                            "is_role": r.get("is_role_account"),
-                            "is_catch_all": r.get("is_catch_all"),
-                            "verdict": r.get("status")
-                        } for r in results
-                    ])
-
-                response_payload.append({
-                    "file": file.filename, "total": total, "valid": valid, "invalid": invalid,
-                    "safe": safe_count,
-                    "role": role_count,
-                    "catch_all": catch_all_count,
-                    "disposable": disposable_count,
-                    "inbox_full": inbox_full_count,
-                    "risky": risky_count,
-                    "disabled": disabled_count,
-                    "invalid": invalid_count,
-                    "validated_download": f"/download/{validated_filename}",
-                    "credits_remaining": current_user.credits,
-                    "batch_id": batch_id
-                })
-                
-                # Save validation task to database for history
-                validation_task = ValidationTask(
-                    task_id=batch_id,
-                    user_id=current_user.id,
-                    filename=file.filename,
-                    status="Completed",
-                    total_emails=total,
-                    progress=100,
-                    safe_count=safe_count,
-                    role_count=role_count,
-                    catch_all_count=catch_all_count,
-                    disposable_count=disposable_count,
-                    inbox_full_count=inbox_full_count,
-                    spam_trap_count=spam_trap_count,
-                    disabled_count=disabled_count,
-                    invalid_count=invalid_count,
-                    unknown_count=risky_count, # Map risky to unknown field in DB
-                    download_url=f"/download/{validated_filename}",
-                    completed_at=datetime.utcnow()
-                )
-                db.add(validation_task)
-            
-            await db.commit()
-            return {"message": "Validation completed", "results": response_payload}
+            return await validate_single_email(email=email, fresh=fresh, mode="full", db=db, current_user=current_user)
 
-        return {"message": "No data provided", "results": []}
+        if not files:
+            return {"message": "No data provided", "results": []}
+        
+        uploads = []
+        for file in files:
+            contents = await file.read()
+            lines = contents.decode(errors='ignore').splitlines()
+            try:
+                reader = csv.DictReader(lines)
+                emails = [row.get('email', '').strip() for row in reader if row.get('email')]
+                if not emails:
+                     emails = [line.strip() for line in lines if line.strip()]
+            except Exception:
+                emails = [line.strip() for line in lines if line.strip()]
+
+            # REQ 15: Automatically remove duplicate emails
+            emails = list(dict.fromkeys([e.lower() for e in emails if e]))
+            if emails:
+                uploads.append((file.filename, emails))
+        
+        # Credits are charged as tasks finish: count what is already queued for this user
+        needed = sum(len(emails) for _, emails in uploads)
+        available = current_user.credits - bulk_jobs.outstanding(current_user.id)
+        if available < needed:
+            raise HTTPException(
+                status_code=403, 
+                detail=f"Insufficient credits. You need {needed} credits for these files, but only have {max(available, 0)} available."
+            )
+        
+        share_weight = await _fair_share_weight(db, current_user)
+        jobs = []
+        for filename, emails in uploads:
+            job = BulkJob(uuid4().hex, current_user.id, filename, emails, fresh=fresh, weight=share_weight)
+            db.add(ValidationTask(
+                task_id=job.task_id,
+                user_id=current_user.id,
+                filename=filename,
+                status=PENDING,
+                total_emails=job.total,
+                progress=0
+            ))
+            db.add(BulkJobCheckpoint(
+                task_id=job.task_id,
+                user_id=current_user.id,
+                filename=filename,
+                emails=json.dumps(emails),
+                fresh=fresh,
+                weight=share_weight,
+                owner=WORKER_ID,
+                lease_until=_lease_until()
+            ))
+            jobs.append(job)
+        await db.commit()
+        
+        response_payload = []
+        for job in jobs:
+            ahead = bulk_jobs.submit(job)
+            response_payload.append({
+                "file": job.filename, "total": job.total, "status": job.status,
+                "task_id": job.task_id, "batch_id": job.task_id, "queue_position": ahead,
+                "status_url": f"/user/validation-task/{job.task_id}",
+                "events_url": f"/user/validation-task/{job.task_id}/events"
+            })
+        
+        if wait:
+            for job in jobs:
+                await job.done.wait()
+            failed = [job for job in jobs if job.status == FAILED]
+            if failed:
+                raise HTTPException(status_code=500, detail=f"Validation error: {failed[0].error}")
+            return {"message": "Validation completed", "results": [job.result for job in jobs]}
+        return {"message": "Validation queued", "results": response_payload}
     except HTTPException as http_exc:
         # Re-raise HTTP exceptions as-is
         raise http_exc
@@ -533,10 +1022,17 @@ async def validate_emails(
 @app.post("/validate-single-email/")
 async def validate_single_email(
     email: str = Form(...),
+    fresh: bool = Form(False),
+    mode: Literal["full", "instant"] = Form("full"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Validate a single email with credit deduction and history logging"""
+    """
+    Validate a single email with credit deduction and history logging (fresh=true skips the verdict cache).
+    mode=instant (async validator) answers from syntax / DNS / disposable / role right away with
+    pending_smtp=true and a check_id; SMTP & catch-all finish in the background - fetch the final
+    result from /validate-single-email/{check_id} or subscribe to .../{check_id}/events.
+    """
     print(f"DEBUG: Single validation for {email} by {current_user.email}")
     start_time = time.time()
     email = email.strip().lower()
@@ -545,7 +1041,7 @@ async def validate_single_email(
         if current_user.credits < 1:
             raise HTTPException(status_code=403, detail="Insufficient credits. Please top up your account.")
         
-        # REQ 22: Cache check - BYPASSED AS PER USER REQUEST (Always real-time)
+        # REQ 22: Cache check - replaced by the in-memory verdict cache (validator/verdict_cache.py), opt out with fresh=true
         # result = await db.execute(select(EmailRecord).where(EmailRecord.email == email).order_by(EmailRecord.created_at.desc()))
         # cached_record = result.scalars().first()
         
@@ -567,21 +1063,16 @@ async def validate_single_email(
         #         "cached": True
         #     }
 
-        # No cache, call VerifyKit
-        results, total, valid, invalid, _ = await process_emails_async([email], validation_type="individual")
-        
-        # Deduct credit only if successful
-        if results[0].get("status") not in ["Error", "Unknown"]:
-            current_user.credits -= 1
-            # Log to history
-            db.add(CreditHistory(
-                user_id=current_user.id,
-                reason=f"Single Email Verification - {email}",
-                credits_change_instant=-1,
-                balance_after_instant=current_user.credits
-            ))
+        deep = None
+        if mode == "instant" and VALIDATOR_MODE == "async":
+            preliminary, deep = await validate_email_instant(email, fresh=fresh)
+            results = [preliminary]
         else:
-            print(f"DEBUG: No credit deducted for {email} due to validation error.")
+            results, total, valid, invalid, _ = await process_emails_async([email], validation_type="individual", fresh=fresh)
+        
+        # Deduct credit only if successful; an instant check is charged when its SMTP verdict lands
+        if deep is None:
+            _charge_single_check(db, current_user, results[0])
         
         # Save email record
         for result in results:
@@ -597,27 +1088,18 @@ async def validate_single_email(
         
         await db.commit()
         print(f"SUCCESS: Validation successful for {email}")
+        recheck_pending = schedule_greylisted(results, current_user.id) > 0
+        check_id = None
+        if deep is not None:
+            check_id = pending_checks.submit(results[0], deep, owner=current_user.id,
+                                             on_done=partial(apply_deep_result, current_user.id))
         
-        resp = {
-            "email": results[0]["email"],
-            "is_valid": results[0]["status"] in ("valid", "role"),
-            "status": results[0]["status"],
-            "reason": results[0].get("reason", "N/A"),
-            "syntax_valid": results[0].get("checks", {}).get("syntax", False),
-            "mx_valid": results[0].get("checks", {}).get("mx", False),
-            "smtp_status": results[0].get("checks", {}).get("smtp", "N/A"),
-            "disposable": results[0].get("is_disposable", False),
-            "role_based": results[0].get("is_role_account", False),
-            "catch_all": results[0].get("is_catch_all", False),
-            "score": results[0].get("score", 0),
-            "grade": results[0].get("quality_grade", "N/A"),
-            "time_taken": round(time.time() - start_time, 2),
-            "credits_remaining": current_user.credits,
-            # Keys expected by frontend components
-            "regex": "Valid" if results[0].get("checks", {}).get("syntax") else "Not Valid",
-            "mx": "Valid" if results[0].get("checks", {}).get("mx") else "Not Valid",
-            "smtp": "Valid" if results[0]["status"] in ("valid", "role") else "Not Valid"
-        }
+        resp = _single_email_response(results[0], time.time() - start_time, current_user.credits)
+        resp.update({
+            "recheck_pending": recheck_pending,  # Greylisted: the stored record is updated after a delayed re-check
+            "pending_smtp": check_id is not None,
+            "check_id": check_id
+        })
         print(f"DEBUG: Final Response to Frontend: {resp}")
         return resp
     except Exception as e:
@@ -627,6 +1109,42 @@ async def validate_single_email(
         print(f"ERROR: VALIDATION ERROR: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _owned_check(check_id: str, user: User):
+    check = pending_checks.get(check_id)
+    if check is None or check.owner != user.id:
+        raise HTTPException(status_code=404, detail="Check not found or expired")
+    return check
+
+@app.get("/validate-single-email/{check_id}")
+async def get_single_email_check(
+    check_id: str,
+    wait: float = 0,
+    current_user: User = Depends(get_current_user)
+):
+    """Current result of an instant-mode check; wait=N long-polls up to N seconds for the final verdict"""
+    check = _owned_check(check_id, current_user)
+    if wait > 0 and check.pending:
+        await pending_checks.wait(check, min(wait, SINGLE_CHECK_MAX_WAIT))
+    return _pending_check_response(check, current_user.credits)
+
+@app.get("/validate-single-email/{check_id}/events")
+async def stream_single_email_check(
+    check_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Server-sent events: the instant verdict, then the final one (event: result) when SMTP finishes"""
+    check = _owned_check(check_id, current_user)
+    credits = current_user.credits
+    
+    async def events():
+        if check.pending:
+            yield f"event: preliminary\ndata: {json.dumps(_pending_check_response(check, credits))}\n\n"
+        while not await pending_checks.wait(check, SSE_KEEPALIVE_INTERVAL):
+            yield ": keep-alive\n\n"
+        yield f"event: result\ndata: {json.dumps(_pending_check_response(check, credits))}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.get("/download/{filename}")
 def download_file(filename: str):
     file_path = os.path.join(".", filename)
@@ -882,7 +1400,43 @@ async def get_validation_task_details(task_id: str, db: AsyncSession = Depends(g
     if not task:
         raise HTTPException(status_code=404, detail="Validation task not found")
     
-    return task.to_dict()
+    details = task.to_dict()
+    job = bulk_jobs.get(task_id)
+    if job and job.result:
+        details["result"] = job.result  # Same shape as the old synchronous /validate-emails/ response
+    return details
+
+@app.get("/user/validation-task/{task_id}/events")
+async def stream_validation_task(task_id: str, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """
+    Server-sent events: `progress` (status, counts, throughput, ETA) at most once per
+    TASK_PROGRESS_TICK while the task runs, then `result` with the final state.
+    Tasks no longer held in memory get a single `result` with the stored task.
+    """
+    result = await db.execute(
+        select(ValidationTask)
+        .where(ValidationTask.task_id == task_id, ValidationTask.user_id == current_user.id)
+    )
+    task = result.scalar_one_or_none()
+    
+    if not task:
+        raise HTTPException(status_code=404, detail="Validation task not found")
+    
+    job = bulk_jobs.get(task_id)
+    stored = task.to_dict()
+    
+    async def events():
+        if job is None:
+            yield f"event: result\ndata: {json.dumps(stored)}\n\n"
+            return
+        async for changed in job.watch(TASK_PROGRESS_TICK, SSE_KEEPALIVE_INTERVAL):
+            if not changed:
+                yield ": keep-alive\n\n"
+                continue
+            event = "result" if job.finished else "progress"
+            yield f"event: {event}\ndata: {json.dumps(_task_progress(job))}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 @app.delete("/user/validation-task/{task_id}")
 async def delete_validation_task(task_id: str, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
@@ -938,6 +1492,24 @@ async def get_recent_results(db: AsyncSession = Depends(get_db)):
 async def get_validation_metrics():
     """Get performance metrics for email validation (DNS times, SMTP times, etc.)"""
     global _async_validator
+    if VALIDATOR_MODE == "async":
+        from validator.async_validator import dns_cache, verdict_cache, smtp_pools
+        return {
+            "status": "ok",
+            "dns_cache": dns_cache.get_cache_stats(),
+            "verdict_cache": verdict_cache.get_stats(),
+            "smtp_pools": smtp_pools.stats(),
+            "mx_concurrency": get_limiter_stats(),
+            "domain_profiles": domain_profiles.get_stats(),
+            "smtp_breaker": smtp_breaker.stats(),
+            "greylist_queue": greylist_queue.get_stats(),
+            "pending_checks": pending_checks.get_stats(),
+            "priority_lanes": get_priority_stats(),
+            "job_queue_times": get_job_stats(),
+            "mx_rate_limits": mx_rate_limiter.get_stats(),
+            "bulk_jobs": bulk_jobs.get_stats(),
+        }
+    
     if _async_validator is None:
         return {"error": "Validator not initialized", "metrics": {}}
     
@@ -950,6 +1522,15 @@ async def get_validation_metrics():
         "mx_cache_size": cache_size,
         "connection_pools": pool_stats,
         "domain_metrics": metrics,
+        "mx_concurrency": get_limiter_stats(),
+        "domain_profiles": domain_profiles.get_stats(),
+        "smtp_breaker": smtp_breaker.stats(),
+        "greylist_queue": greylist_queue.get_stats(),
+        "pending_checks": pending_checks.get_stats(),
+        "priority_lanes": get_priority_stats(),
+        "job_queue_times": get_job_stats(),
+        "mx_rate_limits": mx_rate_limiter.get_stats(),
+        "bulk_jobs": bulk_jobs.get_stats(),
         "config": {
             "max_concurrent_validations": 400,
             "dns_timeout_sec": 1.5,
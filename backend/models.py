@@ -1,5 +1,5 @@
 from db import Base
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey
 from datetime import datetime, timezone
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -156,4 +156,30 @@ class ValidationTask(Base):
             "download_url": self.download_url,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "completed_at": self.completed_at.isoformat() if self.completed_at else None,
-        }
\ No newline at end of file
+        }
+
+
+class BulkJobCheckpoint(Base):
+    """Input and cursor of an unfinished bulk validation task (deleted when the task finishes)"""
+    __tablename__ = "bulk_job_checkpoints"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(String, unique=True, index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    filename = Column(String, nullable=False)
+    emails = Column(Text, nullable=False)  # JSON list of the deduplicated addresses
+    fresh = Column(Boolean, default=False)
+    weight = Column(Float, default=1.0)
+    
+    # Committed together with each batch of EmailRecords and task counts
+    processed = Column(Integer, default=0)  # Addresses validated so far (resume cursor)
+    valid = Column(Integer, default=0)
+    invalid = Column(Integer, default=0)
+    billable = Column(Integer, default=0)  # Charged once, with the final status
+    
+    # Worker process running the task: claimed atomically, renewed while it runs, taken over once it lapses
+    owner = Column(String, nullable=True, index=True)
+    lease_until = Column(DateTime, nullable=True)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,83 @@
+"""
+Test script for the background bulk job queue
+Runs main's real bulk job handler against a throwaway SQLite database (needs aiosqlite) with a stand-in engine
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+WORKDIR = tempfile.mkdtemp(prefix="bulk_jobs_")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{WORKDIR}/test.db"
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import main
+from bulk_jobs import BulkJobQueue, BulkJob, COMPLETED, PROCESSING
+
+
+def test_task_event_stream_follows_run_bulk_job():
+    emails = [f"{'good' if i % 2 else 'bad'}{i}@stream.example" for i in range(40)]
+
+    async def stand_in_engine(emails, batch_id=None, validation_type="bulk", fresh=False, on_result=None):
+        results = []
+        for email in emails:
+            await asyncio.sleep(0.005)
+            result = {"email": email, "status": "valid" if email.startswith("good") else "invalid", "smtp": "accepted"}
+            on_result(result)
+            results.append(result)
+        return results, len(results), 0, 0, []
+
+    async def run():
+        main.process_emails_async = stand_in_engine
+        main.CHECKPOINT_INTERVAL, main.TASK_PROGRESS_TICK = 0.03, 0.03
+        main.bulk_jobs = BulkJobQueue(workers=1)
+        async with main.engine.begin() as conn:
+            await conn.run_sync(main.Base.metadata.create_all)
+        async with main.AsyncSessionLocal() as db:
+            user = main.User(name="t", email="stream@corp.example", hashed_password="x", credits=100)
+            db.add(user)
+            await db.commit()
+            db.add(main.ValidationTask(task_id="task9", user_id=user.id, filename="stream.csv", status=PROCESSING,
+                                       total_emails=len(emails), progress=0))
+            db.add(main.BulkJobCheckpoint(task_id="task9", user_id=user.id, filename="stream.csv",
+                                          emails=json.dumps(emails), owner=main.WORKER_ID, lease_until=main._lease_until()))
+            await db.commit()
+
+            job = BulkJob("task9", user.id, "stream.csv", emails)
+            main.bulk_jobs.submit(job)
+            response = await main.stream_validation_task("task9", db=db, current_user=user)
+            await main.bulk_jobs.start(main.run_bulk_job)
+            events = []
+            async for chunk in response.body_iterator:
+                if chunk.startswith("event: "):
+                    event, data = chunk.split("\n")[:2]
+                    events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+        await main.bulk_jobs.close()
+        async with main.AsyncSessionLocal() as db:
+            task = await main._get_task(db, "task9")
+            user = await db.get(main.User, user.id)
+        await main.engine.dispose()
+        return job, task, user, events
+
+    os.chdir(WORKDIR)
+    job, task, user, events = asyncio.run(run())
+    progress = [data for event, data in events if event == "progress"]
+    assert 2 <= len(progress) < len(emails)  # Coalesced to the tick, not one event per verdict
+    processed = [data["processed"] for data in progress]
+    assert processed == sorted(processed) and any(0 < n < len(emails) for n in processed)
+    assert any(data["eta_seconds"] is not None for data in progress if 0 < data["processed"] < len(emails))
+    event, final = events[-1]
+    assert event == "result" and final["status"] == COMPLETED and final["processed"] == len(emails)
+    assert final["valid"] == final["invalid"] == len(emails) // 2 and final["result"]
+    assert job.status == COMPLETED and task.status == COMPLETED and task.progress == 100
+    assert task.safe_count == len(emails) // 2 and user.credits == 100 - len(emails)
+
+
+if __name__ == "__main__":
+    for test in (test_task_event_stream_follows_run_bulk_job,):
+        test()
+        print(f"✅ {test.__name__}")
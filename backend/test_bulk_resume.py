@@ -0,0 +1,166 @@
+"""
+Test script for bulk job checkpoints, leases and resume
+Runs main's bulk job handler against a throwaway SQLite database (needs aiosqlite) with a stand-in engine
+"""
+import asyncio
+import csv
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+WORKDIR = tempfile.mkdtemp(prefix="bulk_resume_")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{WORKDIR}/test.db"
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import main
+from bulk_jobs import BulkJobQueue, COMPLETED, PROCESSING
+from sqlalchemy import select, update
+
+EMAILS = [f"{'good' if i % 2 else 'bad'}{i}@corp.example" for i in range(12)]
+engine_calls = []
+
+
+async def stand_in_engine(emails, batch_id=None, validation_type="bulk", fresh=False, on_result=None):
+    """One verdict every 20 ms, reported as it lands"""
+    engine_calls.append(list(emails))
+    results = []
+    for email in emails:
+        await asyncio.sleep(0.02)
+        result = {"email": email, "status": "valid" if email.startswith("good") else "invalid", "smtp": "accepted"}
+        on_result(result)
+        results.append(result)
+    return results, len(results), 0, 0, []
+
+
+async def create_user(email):
+    async with main.engine.begin() as conn:
+        await conn.run_sync(main.Base.metadata.create_all)
+    async with main.AsyncSessionLocal() as db:
+        user = main.User(name="t", email=email, hashed_password="x", credits=100)
+        db.add(user)
+        await db.commit()
+        return user.id
+
+
+async def queue_task(user_id, task_id="task1", filename="list.csv", emails=EMAILS):
+    """/validate-emails/: task row + checkpoint leased to this worker, in one transaction"""
+    async with main.AsyncSessionLocal() as db:
+        db.add(main.ValidationTask(task_id=task_id, user_id=user_id, filename=filename, status=PROCESSING,
+                                   total_emails=len(emails), progress=0))
+        db.add(main.BulkJobCheckpoint(task_id=task_id, user_id=user_id, filename=filename, emails=json.dumps(emails),
+                                      owner=main.WORKER_ID, lease_until=main._lease_until()))
+        await db.commit()
+
+
+def test_killed_job_resumes_once():
+    async def run():
+        main.process_emails_async = stand_in_engine
+        main.CHECKPOINT_INTERVAL = 0.05
+        user_id = await create_user("t@corp.example")
+        await queue_task(user_id)
+
+        # Worker A is killed mid-run: no shutdown, its lease is left to run out
+        running = asyncio.ensure_future(main.run_bulk_job(main.BulkJob("task1", user_id, "list.csv", EMAILS)))
+        await asyncio.sleep(0.15)
+        running.cancel()
+        await asyncio.gather(running, return_exceptions=True)
+        with open("validated_task1_list.csv", "a") as f:
+            f.write("half,written,row\n")  # Rows of the last batch, written but never committed
+
+        # Worker B starts while A's lease is live: nothing to take, A's task is left alone
+        main.WORKER_ID, main.bulk_jobs = "worker-b", BulkJobQueue()
+        assert await main.resume_bulk_jobs() == 0
+        async with main.AsyncSessionLocal() as db:
+            assert (await main._get_task(db, "task1")).status == PROCESSING
+            await db.execute(update(main.BulkJobCheckpoint).values(lease_until=main.datetime.utcnow()))  # Lease runs out
+            await db.commit()
+
+        # B claims the checkpoint and finishes the job; a racing worker C gets nothing
+        assert await main.resume_bulk_jobs() == 1
+        main.WORKER_ID = "worker-c"
+        assert await main.resume_bulk_jobs() == 0
+        main.WORKER_ID = "worker-b"
+        job = main.bulk_jobs.get("task1")
+        resumed_from = job.processed
+        await main.bulk_jobs.start(main.run_bulk_job)
+        await asyncio.wait_for(job.done.wait(), timeout=5)
+        await main.bulk_jobs.close()
+
+        async with main.AsyncSessionLocal() as db:
+            user = await db.get(main.User, user_id)
+            task = await main._get_task(db, "task1")
+            checkpoints = (await db.execute(select(main.BulkJobCheckpoint))).scalars().all()
+            records = (await db.execute(select(main.EmailRecord.email))).scalars().all()
+            charges = (await db.execute(select(main.CreditHistory.credits_change_instant))).scalars().all()
+        with open("validated_task1_list.csv", newline="") as f:
+            rows = [row["email"] for row in csv.DictReader(f)]
+        await main.engine.dispose()
+        return job, resumed_from, user, task, checkpoints, records, charges, rows
+
+    os.chdir(WORKDIR)
+    job, resumed_from, user, task, checkpoints, records, charges, rows = asyncio.run(run())
+    assert 0 < resumed_from < len(EMAILS)
+    assert len(engine_calls) == 2 and len(engine_calls[1]) == len(EMAILS) - resumed_from
+    assert sorted(rows) == sorted(EMAILS)  # No duplicated or half-written rows
+    assert sorted(records) == sorted(EMAILS)
+    assert charges == [-len(EMAILS)] and user.credits == 100 - len(EMAILS)  # Charged once
+    assert job.status == COMPLETED and task.status == COMPLETED and task.safe_count == len(EMAILS) // 2
+    assert checkpoints == []
+
+
+def test_results_landing_during_a_commit_are_kept():
+    emails = [f"{'good' if i % 2 else 'bad'}{i}@burst.example" for i in range(6)]
+    commit = main._commit_bulk_results
+
+    async def slow_commit(job, results, validated_filename):
+        await asyncio.sleep(0.2)  # The engine finishes while this commit is in flight
+        return await commit(job, results, validated_filename)
+
+    async def bursty_engine(emails, batch_id=None, validation_type="bulk", fresh=False, on_result=None):
+        results = []
+        for i, email in enumerate(emails):
+            if i == 1:
+                await asyncio.sleep(0.08)  # First verdict is committed alone, the rest land during that commit
+            result = {"email": email, "status": "valid" if email.startswith("good") else "invalid", "smtp": "accepted"}
+            on_result(result)
+            results.append(result)
+        return results, len(results), 0, 0, []
+
+    async def run():
+        main.process_emails_async, main._commit_bulk_results = bursty_engine, slow_commit
+        main.CHECKPOINT_INTERVAL = 0.05
+        user_id = await create_user("burst@corp.example")
+        await queue_task(user_id, "task2", "burst.csv", emails)
+        job = main.BulkJob("task2", user_id, "burst.csv", emails)
+        try:
+            await main.run_bulk_job(job)
+        finally:
+            main._commit_bulk_results = commit
+        async with main.AsyncSessionLocal() as db:
+            user = await db.get(main.User, user_id)
+            task = await main._get_task(db, "task2")
+            records = (await db.execute(select(main.EmailRecord.email).where(main.EmailRecord.user_id == user_id))).scalars().all()
+            charges = (await db.execute(
+                select(main.CreditHistory.credits_change_instant).where(main.CreditHistory.user_id == user_id)
+            )).scalars().all()
+        with open("validated_task2_burst.csv", newline="") as f:
+            rows = [row["email"] for row in csv.DictReader(f)]
+        await main.engine.dispose()
+        return job, user, task, records, charges, rows
+
+    os.chdir(WORKDIR)
+    job, user, task, records, charges, rows = asyncio.run(run())
+    assert sorted(rows) == sorted(emails) and sorted(records) == sorted(emails)
+    assert job.processed == 6 and job.valid == 3 and job.invalid == 3 and job.billable == 6
+    assert task.status == COMPLETED and task.progress == 100 and task.safe_count == 3 and task.invalid_count == 3
+    assert charges == [-6] and user.credits == 94
+
+
+if __name__ == "__main__":
+    for test in (test_killed_job_resumes_once, test_results_landing_during_a_commit_are_kept):
+        test()
+        print(f"✅ {test.__name__}")
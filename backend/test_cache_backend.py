@@ -0,0 +1,216 @@
+"""
+Test script for the shared cache backends
+Redis client runs against a local RESP stand-in - no Redis server needed
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+
+# Add validator to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from validator.cache_backend import (
+    InProcessCacheBackend,
+    SharedMemoryCacheBackend,
+    RedisCacheBackend,
+)
+from validator.cache_store import PersistentCacheStore
+from validator.circuit_breaker import REASON_PORT_25_BLOCKED
+from validator.dns_cache import DNSCache
+from validator.verdict_cache import VerdictCache, INCONCLUSIVE_SMTP_TTL, VERDICT_TTLS
+
+
+class FakeRedisServer:
+    """Speaks just enough RESP2 for GET / SET ... PX / DEL"""
+
+    def __init__(self):
+        self.data = {}
+        self.commands = []
+
+    async def read_command(self, reader):
+        header = await reader.readline()
+        if not header:
+            return None
+        args = []
+        for _ in range(int(header[1:-2])):
+            length = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2].decode())
+        return args
+
+    async def handle(self, reader, writer):
+        while True:
+            args = await self.read_command(reader)
+            if args is None:
+                break
+            self.commands.append(args)
+            verb = args[0].upper()
+            if verb == "GET":
+                entry = self.data.get(args[1])
+                if entry is None or entry[1] <= time.time():
+                    writer.write(b"$-1\r\n")
+                else:
+                    value = entry[0].encode()
+                    writer.write(b"$%d\r\n%s\r\n" % (len(value), value))
+            elif verb == "SET":
+                self.data[args[1]] = (args[2], time.time() + int(args[4]) / 1000)
+                writer.write(b"+OK\r\n")
+            elif verb == "DEL":
+                writer.write(b":%d\r\n" % (1 if self.data.pop(args[1], None) else 0))
+            else:
+                writer.write(b"-ERR unknown command\r\n")
+            await writer.drain()
+        writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+
+async def roundtrip(backend):
+    assert await backend.get("mx", "mx:missing.example") is None
+    await backend.set("mx", "mx:corp.example", {"mx_hosts": ["mx1.corp.example"], "provider": "custom"}, 60)
+    await backend.set("mx", "mx:nxdomain.example", None, 60)
+    value, expires_at = await backend.get("mx", "mx:corp.example")
+    assert value["mx_hosts"] == ["mx1.corp.example"]
+    assert expires_at > time.time()
+    # Cached negative answers are hits with a None value
+    negative = await backend.get("mx", "mx:nxdomain.example")
+    assert negative is not None and negative[0] is None
+    await backend.delete("mx", "mx:corp.example")
+    assert await backend.get("mx", "mx:corp.example") is None
+
+
+def test_in_process_backend():
+    asyncio.run(roundtrip(InProcessCacheBackend()))
+
+
+def test_shared_memory_backend_across_instances():
+    async def run():
+        name = f"ev_test_{os.getpid()}"
+        writer = SharedMemoryCacheBackend(name=name, slots=64)
+        reader = SharedMemoryCacheBackend(name=name, slots=64)  # Second worker attaching
+        try:
+            await roundtrip(writer)
+            await writer.set("catchall", "catchall:corp.example", True, 60)
+            assert (await reader.get("catchall", "catchall:corp.example"))[0] is True
+            await writer.set("catchall", "catchall:old.example", True, -1)
+            assert await reader.get("catchall", "catchall:old.example") is None
+        finally:
+            await reader.close()
+            writer.destroy()
+            await writer.close()
+    asyncio.run(run())
+
+
+def test_shared_memory_backend_fits_verdicts():
+    async def run():
+        from validator.async_validator import format_output_architect
+        verdict = format_output_architect(
+            "firstname.lastname@example-company.com",
+            {"syntax_valid": True, "is_disposable": False, "is_role": False},
+            {"mx_exists": True}, {"is_free_provider": False},
+            {"smtp_status": "accepted", "is_catch_all": False}, 12.3
+        )
+        name = f"ev_test_verdict_{os.getpid()}"
+        writer = SharedMemoryCacheBackend(name=name, slots=64)
+        reader = SharedMemoryCacheBackend(name=name, slots=64)
+        try:
+            await writer.set("verdict", verdict["email"], verdict, 60)
+            assert (await reader.get("verdict", verdict["email"]))[0] == verdict
+            await writer.set("verdict", "huge@example.com", os.urandom(2048).hex(), 60)
+            assert await reader.get("verdict", "huge@example.com") is None
+            assert writer.get_stats()["oversize"] == 1
+        finally:
+            await reader.close()
+            writer.destroy()
+            await writer.close()
+    asyncio.run(run())
+
+
+def test_shared_memory_backend_follows_segment_layout():
+    async def run():
+        name = f"ev_test_layout_{os.getpid()}"
+        writer = SharedMemoryCacheBackend(name=name, slots=64, slot_size=1024)
+        reader = SharedMemoryCacheBackend(name=name, slots=128, slot_size=512)  # Worker started with other settings
+        try:
+            assert (reader.slot_size, reader.slots) == (1024, 64)
+            await writer.set("catchall", "catchall:corp.example", True, 60)
+            await reader.set("mx", "mx:corp.example", {"mx_hosts": ["mx1.corp.example"]}, 60)
+            assert (await reader.get("catchall", "catchall:corp.example"))[0] is True
+            assert (await writer.get("mx", "mx:corp.example"))[0] == {"mx_hosts": ["mx1.corp.example"]}
+        finally:
+            await reader.close()
+            writer.destroy()
+            await writer.close()
+
+        foreign = shared_memory.SharedMemory(name=f"{name}_raw", create=True, size=4096)  # No layout header
+        try:
+            SharedMemoryCacheBackend(name=f"{name}_raw", slots=4)
+            raise AssertionError("attached to a segment without a layout")
+        except ValueError:
+            pass
+        finally:
+            resource_tracker.register(foreign._name, "shared_memory")  # The refused attach unregistered it
+            foreign.close()
+            foreign.unlink()
+    asyncio.run(run())
+
+
+def test_redis_backend_against_stand_in():
+    async def run():
+        server = FakeRedisServer()
+        port = await server.start()
+        backend = RedisCacheBackend(f"redis://127.0.0.1:{port}/0")
+        await roundtrip(backend)
+        assert server.commands[1][0] == "SET" and server.commands[1][3] == "PX"
+        server.server.close()
+        await backend.close()
+        # Server gone: errors become misses, never exceptions
+        assert await backend.get("mx", "mx:corp.example") is None
+        assert backend.errors >= 1
+    asyncio.run(run())
+
+
+def test_warm_start_keeps_catch_all_expiry():
+    store = PersistentCacheStore(os.path.join(tempfile.mkdtemp(), "cache.db"))
+    store.put("catchall", "catchall:soon.example", True, time.time() + 0.3)
+    store.put("catchall", "catchall:later.example", True, time.time() + 3600)
+    store.flush()
+
+    async def run():
+        cache = DNSCache(backend=InProcessCacheBackend())  # Its resolver needs a running loop
+        assert cache.load_persisted(store) == 2
+        before = await cache.peek_catch_all("soon.example")
+        await asyncio.sleep(0.4)
+        return before, await cache.peek_catch_all("soon.example"), await cache.peek_catch_all("later.example")
+
+    before, after, later = asyncio.run(run())
+    assert before is True and after is None  # Expires when the stored row does, not a full TTL after the restart
+    assert later is True
+
+
+def test_verdict_ttl_for_inconclusive_smtp():
+    cache = VerdictCache(backend=InProcessCacheBackend())
+
+    def verdict(smtp, status="valid", sub_status="deliverable"):
+        return {"status": status, "sub_status": sub_status, "checks": {"smtp": smtp}}
+
+    assert cache.ttl_for(verdict("accepted")) == VERDICT_TTLS["valid"]
+    assert cache.ttl_for(verdict("mailbox_not_found", "invalid", "mailbox_not_found")) == VERDICT_TTLS["invalid"]
+    # Scored deliverable, but the mailbox never confirmed it
+    for smtp in ("temporary", "timeout", "error", "pending", "code_421"):
+        assert cache.ttl_for(verdict(smtp)) == INCONCLUSIVE_SMTP_TTL, smtp
+    assert cache.ttl_for(verdict(REASON_PORT_25_BLOCKED)) == 0
+
+
+if __name__ == "__main__":
+    for test in (test_in_process_backend, test_shared_memory_backend_across_instances,
+                 test_shared_memory_backend_fits_verdicts, test_shared_memory_backend_follows_segment_layout,
+                 test_redis_backend_against_stand_in,
+                 test_warm_start_keeps_catch_all_expiry, test_verdict_ttl_for_inconclusive_smtp):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,111 @@
+"""
+Test script for the per-MX adaptive (AIMD) concurrency limiter
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Add validator to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from validator import concurrency
+from validator.concurrency import AdaptiveLimiter, SlotOutcome, get_limiter, get_limiter_stats, DECREASE_FACTOR
+
+
+def test_fast_replies_raise_the_limit():
+    limiter = AdaptiveLimiter("mx.fast.example", initial=3, max_limit=5)
+    for _ in range(3):
+        limiter.on_success(0.1)
+    assert limiter.current_limit == 3  # +1/limit per fast reply: about one step per `limit` replies
+    limiter.on_success(0.1)
+    assert limiter.current_limit == 4
+    for _ in range(100):
+        limiter.on_success(0.1)
+    assert limiter.current_limit == 5  # Capped at max_limit
+    assert limiter.stats()["latency_ms"] == 100.0
+
+
+def test_slow_replies_hold_the_limit():
+    limiter = AdaptiveLimiter("mx.slow.example", initial=3, latency_target=1.0)
+    for _ in range(20):
+        limiter.on_success(2.0)
+    assert limiter.current_limit == 3 and limiter.successes == 20
+
+
+def test_congestion_cuts_the_limit_once_per_cooldown():
+    limiter = AdaptiveLimiter("mx.busy.example", initial=8, min_limit=1)
+    limiter.record(421, 0.1)
+    assert limiter.current_limit == int(8 * DECREASE_FACTOR)
+    limiter.record(450, 0.1)
+    limiter.record(None, 0.1, timed_out=True)
+    assert limiter.current_limit == 4 and limiter.congestion_events == 3  # Same burst: one cut
+    limiter._last_decrease = 0.0  # Cooldown over
+    for _ in range(5):
+        limiter.on_congestion()
+        limiter._last_decrease = 0.0
+    assert limiter.current_limit == 1  # Never below min_limit
+    limiter.record(550, 0.1)  # Per-recipient refusal: a normal, fast reply
+    assert limiter.congestion_events == 8 and limiter.successes == 1
+
+
+def test_slots_cap_concurrency_and_report_outcomes():
+    async def run():
+        limiter = AdaptiveLimiter("mx.slots.example", initial=2, max_limit=2)
+        running, peak = 0, 0
+
+        async def probe(code):
+            nonlocal running, peak
+            async with limiter.slot() as slot:
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+                slot.code = code
+
+        await asyncio.gather(*[probe(250) for _ in range(6)])
+        try:
+            async with limiter.slot():
+                raise asyncio.TimeoutError
+        except asyncio.TimeoutError:
+            pass
+        return limiter, peak
+
+    limiter, peak = asyncio.run(run())
+    assert peak == 2 and limiter.in_flight == 0 and limiter.waiting == 0
+    assert limiter.successes == 6 and limiter.congestion_events == 1  # The timeout counts as congestion
+
+
+def test_worst_reply_of_a_transaction_decides():
+    outcome = SlotOutcome()
+    outcome.observe([250, 550, 450, 250])
+    assert outcome.code == 450
+    outcome.observe([0, 550, 250])
+    assert outcome.code == 550
+    outcome.observe([])
+    assert outcome.code is None
+
+
+def test_registry_shares_and_evicts_idle_limiters():
+    old_max = concurrency.MAX_LIMITERS
+    concurrency.MAX_LIMITERS = len(concurrency._limiters) + 2
+    try:
+        busy = get_limiter("MX.Busy-Registry.example")
+        assert get_limiter("mx.busy-registry.example") is busy
+        busy.in_flight = 1
+        before = concurrency.limiter_evictions
+        for i in range(5):
+            get_limiter(f"mx{i}.registry.example")
+        assert len(concurrency._limiters) <= concurrency.MAX_LIMITERS
+        assert concurrency.limiter_evictions > before
+        assert "mx.busy-registry.example" in get_limiter_stats()  # Busy limiters are never evicted
+        busy.in_flight = 0
+    finally:
+        concurrency.MAX_LIMITERS = old_max
+
+
+if __name__ == "__main__":
+    for test in (test_fast_replies_raise_the_limit, test_slow_replies_hold_the_limit,
+                 test_congestion_cuts_the_limit_once_per_cooldown, test_slots_cap_concurrency_and_report_outcomes,
+                 test_worst_reply_of_a_transaction_decides, test_registry_shares_and_evicts_idle_limiters):
+        test()
+        print(f"✅ {test.__name__}")
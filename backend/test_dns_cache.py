@@ -0,0 +1,179 @@
+"""
+Test script for the DNS / catch-all cache
+Runs against a stand-in resolver - no network needed
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import aiodns
+
+# Add validator to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from validator.cache_backend import InProcessCacheBackend
+from validator.dns_cache import DNSCache, MIN_DNS_TTL, MAX_DNS_TTL, NEGATIVE_DNS_TTL
+from validator.fast_validator import FastCache
+
+
+class Record:
+    def __init__(self, host, priority=10, ttl=None):
+        self.host = host
+        self.priority = priority
+        self.ttl = ttl
+
+
+class FakeResolver:
+    """Answers queries from a table after `delay` seconds, counting lookups"""
+
+    def __init__(self, answers, delay=0.05):
+        self.answers = answers  # domain or (domain, rtype) -> [Record] or an exception to raise
+        self.delay = delay
+        self.queries = []
+
+    async def query(self, domain, rtype):
+        self.queries.append((domain, rtype))
+        await asyncio.sleep(self.delay)
+        answer = self.answers.get((domain, rtype), self.answers.get(domain))
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+class FakeProbePool:
+    """Stand-in SMTP pool for the random-address catch-all probe"""
+
+    def __init__(self, is_catch_all, delay=0.05):
+        self.is_catch_all = is_catch_all
+        self.delay = delay
+        self.probes = 0
+
+    async def verify_fake_email(self, domain):
+        self.probes += 1
+        await asyncio.sleep(self.delay)
+        return self.is_catch_all
+
+
+def make_cache(answers, **kwargs):
+    cache = DNSCache(backend=InProcessCacheBackend(), **kwargs)
+    cache.resolver = FakeResolver(answers)
+    return cache
+
+
+def test_concurrent_mx_misses_share_one_lookup():
+    async def run():
+        cache = make_cache({"corp.example": [Record("mx2.corp.example", 20), Record("mx1.corp.example", 10)]})
+        answers = await asyncio.gather(*[cache.get_mx_records("corp.example") for _ in range(50)])
+        return cache, answers
+
+    cache, answers = asyncio.run(run())
+    assert cache.resolver.queries == [("corp.example", "MX")]
+    assert all(a == {"mx_hosts": ["mx1.corp.example", "mx2.corp.example"], "provider": "custom"} for a in answers)
+    assert cache.coalesced["mx"] == 49 and cache.get_cache_stats()["mx_lookups_coalesced"] == 49
+    assert cache.get_cache_stats()["inflight"] == 0
+
+
+def test_concurrent_catch_all_checks_share_one_probe():
+    async def run():
+        cache = make_cache({})
+        pool = FakeProbePool(is_catch_all=True)
+        verdicts = await asyncio.gather(*[cache.is_catch_all_domain("corp.example", pool) for _ in range(20)])
+        again = await cache.is_catch_all_domain("corp.example", pool)  # Cached now
+        return cache, pool, verdicts, again
+
+    cache, pool, verdicts, again = asyncio.run(run())
+    assert pool.probes == 1 and all(verdicts) and again is True
+    assert cache.coalesced["catchall"] == 19
+
+
+def test_cancelled_waiter_does_not_cancel_shared_lookup():
+    async def run():
+        cache = make_cache({"corp.example": [Record("mx1.corp.example")]})
+        impatient = asyncio.ensure_future(asyncio.wait_for(cache.get_mx_records("corp.example"), timeout=0.01))
+        patient = asyncio.ensure_future(cache.get_mx_records("corp.example"))
+        impatient_outcome = (await asyncio.gather(impatient, return_exceptions=True))[0]
+        return cache, impatient_outcome, await patient
+
+    cache, impatient_outcome, answer = asyncio.run(run())
+    assert isinstance(impatient_outcome, asyncio.TimeoutError)
+    assert answer["mx_hosts"] == ["mx1.corp.example"]
+    assert len(cache.resolver.queries) == 1
+
+
+def test_mx_answers_expire_on_record_ttl():
+    not_found = aiodns.error.DNSError(aiodns.error.ARES_ENOTFOUND, "not found")
+
+    async def run():
+        cache = make_cache({
+            "short.example": [Record("mx.short.example", ttl=5), Record("mx2.short.example", ttl=600)],
+            "normal.example": [Record("mx.normal.example", ttl=600)],
+            "untimed.example": [Record("mx.untimed.example")],
+            "gone.example": not_found,
+        })
+        for domain in ("short.example", "normal.example", "untimed.example", "gone.example"):
+            await cache.get_mx_records(domain)
+        now = time.time()
+        return {key: round(entry.expires_at - now) for key, entry in cache.cache.items()}, cache.cache["mx:gone.example"]
+
+    lifetimes, gone = asyncio.run(run())
+    assert lifetimes["mx:short.example"] == MIN_DNS_TTL  # Smallest TTL of the answer, raised to the floor
+    assert lifetimes["mx:normal.example"] == 600
+    assert lifetimes["mx:untimed.example"] == MAX_DNS_TTL
+    assert lifetimes["mx:gone.example"] == NEGATIVE_DNS_TTL and gone.value is None
+
+
+def test_expired_answer_served_stale_while_refreshing():
+    async def run():
+        cache = make_cache({"corp.example": [Record("old.corp.example", ttl=600)]})
+        await cache.get_mx_records("corp.example")
+        entry = cache.cache["mx:corp.example"]
+        entry.expires_at = entry.refresh_at = time.time() - 1  # Expired, still within the stale window
+        cache.resolver.answers["corp.example"] = [Record("new.corp.example", ttl=600)]
+        start = time.time()
+        stale = await cache.get_mx_records("corp.example")
+        waited = time.time() - start
+        await asyncio.sleep(cache.resolver.delay * 2)
+        return cache, stale, waited, await cache.get_mx_records("corp.example")
+
+    cache, stale, waited, fresh = asyncio.run(run())
+    assert stale["mx_hosts"] == ["old.corp.example"] and waited < cache.resolver.delay
+    assert fresh["mx_hosts"] == ["new.corp.example"]
+    assert cache.stale_served == 1 and cache.background_refreshes == 1 and len(cache.resolver.queries) == 2
+
+
+def test_hot_answer_refreshed_ahead_of_expiry():
+    async def run():
+        cache = make_cache({"corp.example": [Record("mx1.corp.example", ttl=600)]})
+        await cache.get_mx_records("corp.example")
+        cache.cache["mx:corp.example"].refresh_at = time.time() - 1  # In the last REFRESH_AHEAD of its TTL
+        answers = [await cache.get_mx_records("corp.example") for _ in range(5)]
+        await asyncio.sleep(cache.resolver.delay * 2)
+        return cache, answers
+
+    cache, answers = asyncio.run(run())
+    assert all(a["mx_hosts"] == ["mx1.corp.example"] for a in answers)
+    assert cache.background_refreshes == 1 and len(cache.resolver.queries) == 2  # One refresh, not one per hit
+    assert cache.stale_served == 0 and cache.cache["mx:corp.example"].refresh_at > time.time()
+
+
+def test_fast_cache_stale_reads():
+    cache = FastCache()
+    cache.set("corp.example", ["mx1.corp.example"], ttl=100, refresh_ahead=0.1)
+    assert cache.get_stale("corp.example", stale_ttl=60) == (["mx1.corp.example"], False)
+    value = cache._cache["corp.example"][0]
+    cache._cache["corp.example"] = (value, time.time() + 5, time.time() - 1)  # Refresh-ahead window
+    assert cache.get_stale("corp.example", stale_ttl=60) == (["mx1.corp.example"], True)
+    cache._cache["corp.example"] = (value, time.time() - 30, time.time() - 30)  # Expired, still stale-servable
+    assert cache.get_stale("corp.example", stale_ttl=60) == (["mx1.corp.example"], True)
+    assert cache.get_stale("corp.example", stale_ttl=10) == (None, False)  # Past the stale window: dropped
+    assert cache.size() == 0
+
+
+if __name__ == "__main__":
+    for test in (test_concurrent_mx_misses_share_one_lookup, test_concurrent_catch_all_checks_share_one_probe,
+                 test_cancelled_waiter_does_not_cancel_shared_lookup, test_mx_answers_expire_on_record_ttl,
+                 test_expired_answer_served_stale_while_refreshing, test_hot_answer_refreshed_ahead_of_expiry,
+                 test_fast_cache_stale_reads):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,109 @@
+"""
+Test script for learned domain / MX profiles
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add validator to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from validator.domain_profile import (
+    DomainProfile, ProfileRegistry, PROFILE_HALF_LIFE, CONNECT_TIMEOUT_BOUNDS, TARPIT_LATENCY, RECOVERY_PROBE_INTERVAL
+)
+from validator.async_validator import get_provider_rules, domain_profiles
+from validator.concurrency import get_limiter
+
+
+def test_profile_decays():
+    profile = DomainProfile("mx:mx.slow.example")
+    for _ in range(8):
+        profile.observe(250, 0.2)
+    profile.updated_at -= PROFILE_HALF_LIFE
+    profile.decay(time.time())
+    assert abs(profile.samples - 4.0) < 0.01
+    assert profile.rate("definitive") == 1.0
+    assert profile.latency_percentile(0.95) == 0.25
+
+
+def test_unreachable_mx_skips_smtp():
+    registry = ProfileRegistry()
+    for _ in range(6):
+        registry.record_smtp("mx.blocked.example", "blocked.example", None, 1.5, timed_out=True)
+    advice = registry.advise("other.example", ["mx.blocked.example"])
+    assert advice["skip_smtp"] and advice["reason"] == "mx_unreachable"
+    assert registry.get("domain:blocked.example").last_error == "timeout"
+    assert not registry.advise("fresh.example", ["mx.fresh.example"])["skip_smtp"]
+
+
+def test_skipped_mx_gets_recovery_probes():
+    registry = ProfileRegistry()
+    for _ in range(6):
+        registry.record_smtp("mx.down.example", None, None, 1.5, timed_out=True)
+    assert registry.advise("a.example", ["mx.down.example"])["skip_smtp"]
+    profile = registry.get("mx:mx.down.example")
+    profile.probe_at -= RECOVERY_PROBE_INTERVAL
+    assert not registry.advise("a.example", ["mx.down.example"])["skip_smtp"]  # One probe goes out
+    assert registry.advise("b.example", ["mx.down.example"])["skip_smtp"]  # The rest keep skipping
+    registry.record_smtp("mx.down.example", None, 250, 0.1)  # ...and the host answers
+    assert not registry.advise("b.example", ["mx.down.example"])["skip_smtp"]
+
+
+def test_throttling_and_cancellation_are_not_outages():
+    registry = ProfileRegistry()
+    for _ in range(8):
+        registry.record_smtp("mx.busy.example", "busy.example", 421, 0.1)
+        registry.record_smtp("mx.grey.example", "grey.example", 450, 0.1)
+    assert not registry.advise("busy.example", ["mx.busy.example"])["skip_smtp"]
+    assert not registry.advise("grey.example", ["mx.grey.example"])["skip_smtp"]  # Greylisting goes to the delay queue
+
+    async def cancelled_probe():
+        async with get_limiter("mx.cancelled.example").slot() as slot:
+            slot.domain = "cancelled.example"
+            raise asyncio.CancelledError()  # Outer wait_for deadline
+
+    for _ in range(3):
+        try:
+            asyncio.run(cancelled_probe())
+        except asyncio.CancelledError:
+            pass
+    assert domain_profiles.get("mx:mx.cancelled.example") is None
+
+
+def test_provider_rules_consult_profile():
+    for _ in range(10):
+        domain_profiles.record_smtp("mx.corp.example", "corp.example", 250, 0.08)
+        domain_profiles.record_latency("mx.corp.example", "banner", 0.2)
+        domain_profiles.record_latency("mx.corp.example", "command", 0.08)
+    domain_profiles.record_catch_all("corp.example", True)
+    rules = get_provider_rules("corp.example", "custom", ["mx.corp.example"])
+    assert rules["smtp_check"] and rules["known_catch_all"] is True
+    assert rules["smtp_timeout"] < 12.0
+    # Static provider rules are never overridden
+    assert get_provider_rules("gmail.com", "google", ["mx.corp.example"])["smtp_check"] is False
+
+
+def test_adaptive_timeouts_and_tarpit():
+    registry = ProfileRegistry()
+    assert registry.timeouts("mx.new.example", 2.0, 2.0) == (2.0, 2.0)
+    for _ in range(10):
+        registry.record_latency("mx.slow.example", "banner", 3.0)  # Slow but legitimate banner
+        registry.record_latency("mx.slow.example", "command", 0.2)
+    connect, command = registry.timeouts("mx.slow.example", 2.0, 2.0)
+    assert connect == CONNECT_TIMEOUT_BOUNDS[1] and command == 0.75
+    assert not registry.is_tarpit("mx.slow.example")
+    
+    for _ in range(3):
+        registry.record_latency("mx.tarpit.example", "tarpit", 2.0)
+    registry.record_latency("mx.tarpit.example", "banner", TARPIT_LATENCY + 1)
+    assert registry.is_tarpit("mx.tarpit.example")
+    assert registry.advise("victim.example", ["mx.tarpit.example"])["reason"] == "tarpit"
+
+
+if __name__ == "__main__":
+    for test in (test_profile_decays, test_unreachable_mx_skips_smtp, test_skipped_mx_gets_recovery_probes,
+                 test_throttling_and_cancellation_are_not_outages, test_provider_rules_consult_profile,
+                 test_adaptive_timeouts_and_tarpit):
+        test()
+        print(f"✅ {test.__name__}")
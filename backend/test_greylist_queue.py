@@ -0,0 +1,105 @@
+"""
+Test script for the deferred greylisting re-check queue
+"""
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add validator to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from validator import greylist_queue as gq
+from validator.greylist_queue import GreylistQueue, parse_retry_after, is_greylisted
+from validator.cache_store import PersistentCacheStore
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("4.7.1 Greylisted, please try again in 300 seconds") == 300
+    assert parse_retry_after("451 Try again later (5 minutes)") == 300
+    assert parse_retry_after("450 retry after 60s") == 60
+    assert parse_retry_after("450 mailbox busy") is None
+    assert GreylistQueue.delay_for(0, 5) == gq.GREYLIST_MIN_DELAY
+    assert GreylistQueue.delay_for(1) == gq.GREYLIST_DEFAULT_DELAY * 2
+
+
+def test_recheck_until_verdict():
+    async def run():
+        gq.GREYLIST_MIN_DELAY = gq.GREYLIST_DEFAULT_DELAY = 0.01
+        queue = GreylistQueue()
+        replies = iter([{"email": "a@grey.example", "smtp_code": 451},
+                        {"email": "a@grey.example", "smtp_code": 250, "status": "valid"}])
+        verdicts = []
+
+        async def recheck(email):
+            return next(replies)
+
+        async def on_verdict(context, result):
+            verdicts.append((context, result))
+
+        await queue.start(recheck, on_verdict)
+        assert is_greylisted({"checks": {"smtp": "temporary"}})
+        assert queue.schedule("a@grey.example", {"smtp_code": 450}, {"user_id": 1, "task_id": "t1"})
+        for _ in range(100):
+            if verdicts:
+                break
+            await asyncio.sleep(0.01)
+        await queue.close()
+        assert verdicts == [({"user_id": 1, "task_id": "t1"}, {"email": "a@grey.example", "smtp_code": 250, "status": "valid"})]
+        stats = queue.get_stats()
+        assert stats["rechecks"] == 2 and stats["resolved"] == 1 and stats["pending"] == 0
+
+    saved = gq.GREYLIST_MIN_DELAY, gq.GREYLIST_DEFAULT_DELAY
+    try:
+        asyncio.run(run())
+    finally:
+        gq.GREYLIST_MIN_DELAY, gq.GREYLIST_DEFAULT_DELAY = saved
+
+
+def test_workers_sharing_store_recheck_once():
+    async def run():
+        path = str(Path(tempfile.mkdtemp()) / "cache.db")
+        seed = PersistentCacheStore(path)
+        item = {"email": "b@grey.example", "attempt": 0, "due_at": time.time() - 1, "context": {"user_id": 1}}
+        seed.put("greylist", "1:b@grey.example", item, time.time() + 60)
+        seed.flush()
+        rechecks, verdicts = [], []
+
+        async def recheck(email):
+            rechecks.append(email)
+            await asyncio.sleep(0.05)
+            return {"email": email, "smtp_code": 250, "status": "valid"}
+
+        async def on_verdict(context, result):
+            verdicts.append(result)
+
+        # Two worker processes load the same pending check at startup
+        queues = [GreylistQueue(), GreylistQueue()]
+        stores = [PersistentCacheStore(path), PersistentCacheStore(path)]
+        for queue, store in zip(queues, stores):
+            assert queue.load_persisted(store) == 1
+            await queue.start(recheck, on_verdict)
+        await asyncio.sleep(0.3)
+        # The other worker looks again later (in case the winner died mid-check): settled, so it drops it
+        loser = next(queue for queue in queues if len(queue))
+        assert loser._items["1:b@grey.example"]["due_at"] > time.time() + 60
+        loser._items["1:b@grey.example"]["due_at"] = 0.0
+        loser._heap = [(0.0, "1:b@grey.example")]
+        loser._wakeup.set()
+        await asyncio.sleep(0.1)
+        for queue, store in zip(queues, stores):
+            await queue.close()
+            await store.close()
+        seed._conn.close()
+        return rechecks, verdicts, queues
+
+    rechecks, verdicts, queues = asyncio.run(run())
+    assert rechecks == ["b@grey.example"] and len(verdicts) == 1
+    assert sum(len(queue) for queue in queues) == 0
+
+
+if __name__ == "__main__":
+    for test in (test_parse_retry_after, test_recheck_until_verdict, test_workers_sharing_store_recheck_once):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,101 @@
+"""
+Test script for interactive / bulk priority lanes
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Add validator to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from validator.priority import PrioritySemaphore, priority_lane, fair_share, get_job_stats, LANE_BULK, LANE_INTERACTIVE
+
+
+def test_reserved_interactive_capacity():
+    async def run():
+        sem = PrioritySemaphore("test_reserved", 4, reserved=1)
+        release = asyncio.Event()
+        order = []
+
+        async def worker(name):
+            async with sem.slot() as lane:
+                order.append((name, lane))
+                await release.wait()
+
+        with priority_lane(LANE_BULK):
+            bulk = [asyncio.create_task(worker(f"bulk{i}")) for i in range(5)]
+        await asyncio.sleep(0.01)
+        bulk_running = len(order)
+        single = asyncio.create_task(worker("single"))  # Default lane: interactive
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(single, *bulk)
+        return sem, bulk_running, order
+
+    sem, bulk_running, order = asyncio.run(run())
+    assert bulk_running == 3  # The 4th slot is reserved
+    assert order[3] == ("single", LANE_INTERACTIVE)
+    stats = sem.stats()["lanes"]
+    assert stats[LANE_INTERACTIVE]["queued"] == 0
+    assert stats[LANE_BULK]["queued"] == 2 and stats[LANE_BULK]["in_use"] == 0
+
+
+def test_interactive_waiters_served_first():
+    async def run():
+        sem = PrioritySemaphore("test_order", 1)
+        order = []
+        gate = asyncio.Event()
+
+        async def worker(name):
+            async with sem.slot():
+                order.append(name)
+                await gate.wait()
+
+        with priority_lane(LANE_BULK):
+            tasks = [asyncio.create_task(worker(f"bulk{i}")) for i in range(3)]
+        await asyncio.sleep(0.01)
+        tasks.append(asyncio.create_task(worker("single")))
+        await asyncio.sleep(0.01)
+        gate.set()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(run()) == ["bulk0", "single", "bulk1", "bulk2"]
+
+
+def test_fair_share_round_robin_across_users():
+    async def run(weight_b):
+        sem = PrioritySemaphore("test_fair", 1)
+        order = []
+        gate = asyncio.Event()
+
+        async def worker(name):
+            async with sem.slot():
+                order.append(name)
+                await gate.wait()
+
+        tasks = []
+        with priority_lane(LANE_BULK):
+            with fair_share("user:a", "job-a"):
+                tasks += [asyncio.create_task(worker(f"a{i}")) for i in range(8)]
+            await asyncio.sleep(0.01)
+            with fair_share("user:b", "job-b", weight=weight_b):
+                tasks += [asyncio.create_task(worker(f"b{i}")) for i in range(4)]
+        await asyncio.sleep(0.01)
+        gate.set()
+        await asyncio.gather(*tasks)
+        return order
+
+    # The small job arrives behind the large one but is not served after it
+    order = asyncio.run(run(1.0))
+    assert order.index("b3") < order.index("a5")
+    weighted = asyncio.run(run(2.0))
+    assert weighted.index("b3") < order.index("b3")
+    assert get_job_stats()["job-b"]["queued"] == 8  # Every b slot waited, in both runs
+
+
+if __name__ == "__main__":
+    for test in (test_reserved_interactive_capacity, test_interactive_waiters_served_first,
+                 test_fair_share_round_robin_across_users):
+        test()
+        print(f"✅ {test.__name__}")
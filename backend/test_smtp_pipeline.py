@@ -0,0 +1,512 @@
+"""
+Test script for the SMTP probe path (multi-RCPT + PIPELINING)
+Runs against a local fake SMTP server - no network or port 25 needed
+"""
+import asyncio
+import sys
+import time
+import warnings
+from pathlib import Path
+
+# Add validator to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from validator import smtp_pool
+from validator.smtp_pool import SMTPConnectionPool, SMTPPoolRegistry, MAX_RCPT_PER_TRANSACTION
+from validator.domain_profile import domain_profiles, COMMAND_TIMEOUT_BOUNDS
+from validator.circuit_breaker import smtp_breaker, GLOBAL_FAILURE_THRESHOLD, GLOBAL_MIN_HOSTS
+from validator.pending_checks import PendingChecks
+from validator.rate_limit import mx_rate_limiter, rate_for, TokenBucket
+
+
+class FakeSMTPServer:
+    """Tiny SMTP server: 'good' local parts exist, 'grey' ones are greylisted, everything else is 550"""
+
+    def __init__(self, pipelining=False, max_rcpt=100, drop_after_rset=False, drop_at_rcpt=None, silent_noop=False):
+        self.pipelining = pipelining
+        self.max_rcpt = max_rcpt
+        self.drop_after_rset = drop_after_rset  # Simulate a server-side idle timeout
+        self.drop_at_rcpt = drop_at_rcpt  # Hang up once, mid-transaction, at this RCPT
+        self.silent_noop = silent_noop  # Session went dead on the server side: NOOP is never answered
+        self.commands = []
+        self.flushes = 0
+
+    async def handle(self, reader, writer):
+        writer.write(b"220 fake ESMTP\r\n")
+        await writer.drain()
+        rcpts = 0
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            cmd = line.decode().strip()
+            self.commands.append(cmd)
+            verb = cmd[:4].upper()
+            if verb == "EHLO":
+                ext = ["250-fake"] + (["250-PIPELINING"] if self.pipelining else []) + ["250 8BITMIME"]
+                writer.write(("\r\n".join(ext) + "\r\n").encode())
+            elif verb == "NOOP" and self.silent_noop:
+                continue
+            elif verb in ("HELO", "RSET", "NOOP"):
+                writer.write(b"250 OK\r\n")
+                if verb == "RSET" and self.drop_after_rset:
+                    await writer.drain()
+                    break
+            elif verb == "MAIL":
+                rcpts = 0
+                writer.write(b"250 OK\r\n")
+            elif verb == "RCPT":
+                rcpts += 1
+                if rcpts == self.drop_at_rcpt:
+                    self.drop_at_rcpt = None
+                    break
+                local = cmd.split(":", 1)[1].strip("<> ").split("@")[0]
+                if rcpts > self.max_rcpt:
+                    writer.write(b"452 4.5.3 Too many recipients\r\n")
+                elif local == "good":
+                    writer.write(b"250 OK\r\n")
+                elif local == "grey":
+                    writer.write(b"450 4.7.1 Greylisted, please try again later\r\n")
+                else:
+                    writer.write(b"550 5.1.1 No such user\r\n")
+            elif verb == "QUIT":
+                writer.write(b"221 bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"500 unknown\r\n")
+            # Replies are flushed only once the client's buffered commands are consumed
+            if not reader._buffer:
+                self.flushes += 1
+                await writer.drain()
+        writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+
+async def run_batch(pipelining, max_rcpt, emails=None, drop_at_rcpt=None):
+    server = FakeSMTPServer(pipelining=pipelining, max_rcpt=max_rcpt, drop_at_rcpt=drop_at_rcpt)
+    smtp_pool.SMTP_PORT = await server.start()
+    pool = SMTPConnectionPool("127.0.0.1", ["127.0.0.1"])
+    emails = emails or ["good@corp.example"] + [f"user{i}@corp.example" for i in range(7)]
+    results = await pool.verify_batch(emails)
+    await pool.close_all()
+    server.server.close()
+    return server, pool, results
+
+
+def test_multi_rcpt_maps_codes():
+    server, pool, results = asyncio.run(run_batch(pipelining=False, max_rcpt=100))
+    assert results["good@corp.example"]["code"] == 250
+    assert all(r["code"] == 550 for e, r in results.items() if e != "good@corp.example")
+    assert sum(1 for c in server.commands if c.startswith("MAIL")) == 1
+    assert pool.rcpt_limit == MAX_RCPT_PER_TRANSACTION
+
+
+def test_multi_rcpt_fallback_on_limit():
+    server, pool, results = asyncio.run(run_batch(pipelining=False, max_rcpt=3))
+    assert pool.rcpt_limit == 3  # Learned as a count, batching goes on in groups of 3
+    assert sum(1 for c in server.commands if c.startswith("MAIL")) == 3  # 3 answered, then 3 + 2
+    assert len(results) == 8
+    assert all(r["code"] in (250, 550) for r in results.values())
+    pool._rcpt_limit_until = time.time() - 1  # Learned limit expired
+    assert pool.rcpt_limit == MAX_RCPT_PER_TRANSACTION
+
+
+def test_dropped_session_keeps_rcpt_limit():
+    server, pool, results = asyncio.run(run_batch(pipelining=False, max_rcpt=100, drop_at_rcpt=2))
+    assert results["good@corp.example"]["code"] == 250  # Chunk retried per address
+    assert all(r["code"] == 550 for e, r in results.items() if e != "good@corp.example")
+    assert sum(1 for c in server.commands if c.startswith("MAIL")) == 1 + len(results)
+    assert pool.rcpt_limit == MAX_RCPT_PER_TRANSACTION  # A broken session is not a recipient limit
+
+
+def test_greylist_reply_keeps_batching():
+    emails = ["good@corp.example", "grey@corp.example"] + [f"user{i}@corp.example" for i in range(4)]
+    server, pool, results = asyncio.run(run_batch(pipelining=False, max_rcpt=100, emails=emails))
+    assert results["grey@corp.example"]["status"] == "temporary"
+    assert all(r["code"] == 550 for e, r in results.items() if e.startswith("user"))
+    assert sum(1 for c in server.commands if c.startswith("MAIL")) == 1
+    assert pool.rcpt_limit == MAX_RCPT_PER_TRANSACTION
+
+
+def test_quit_runs_outside_pool_lock():
+    class RecordingConnection:
+        is_connected = True
+        last_used = 0.0
+
+        def __init__(self, pool):
+            self.pool = pool
+            self.lock_held = None
+
+        async def quit(self):
+            self.lock_held = self.pool.lock.locked()
+
+    async def run():
+        pool = SMTPConnectionPool("127.0.0.1", ["127.0.0.1"])
+        conns = [RecordingConnection(pool) for _ in range(3)]
+        pool.pool, pool.in_use = conns[:2], 1
+        await pool.close_all()
+        await pool._release_connection(conns[2])  # Pool closed: QUIT instead of pooling
+        return pool, conns
+
+    pool, conns = asyncio.run(run())
+    assert [c.lock_held for c in conns] == [False, False, False]
+    assert pool.pool == [] and pool.in_use == 0
+
+
+def test_pipelining_single_flush():
+    lockstep, _, _ = asyncio.run(run_batch(pipelining=False, max_rcpt=100))
+    pipelined, _, results = asyncio.run(run_batch(pipelining=True, max_rcpt=100))
+    assert results["good@corp.example"]["code"] == 250
+    assert pipelined.flushes < lockstep.flushes
+
+
+def test_pipelining_fallback_on_limit():
+    _, pool, results = asyncio.run(run_batch(pipelining=True, max_rcpt=3))
+    assert pool.rcpt_limit == 3
+    assert all(r["code"] in (250, 550) for r in results.values())
+
+
+def test_happy_eyeballs_skips_dead_primary():
+    async def run():
+        server = FakeSMTPServer()
+        smtp_pool.SMTP_PORT = await server.start()
+        
+        # Primary MX accepts TCP but never sends a banner (black-holed)
+        async def silent(reader, writer):
+            await reader.read()  # Until the client gives up
+            writer.close()
+        dead = await asyncio.start_server(silent, "127.0.0.2", smtp_pool.SMTP_PORT)
+        
+        pool = SMTPConnectionPool("127.0.0.2", ["127.0.0.2", "127.0.0.1"])
+        start = time.time()
+        result = await pool.verify_email("good@corp.example")
+        elapsed = time.time() - start
+        winner = pool.preferred
+        candidates = await pool._connect_candidates()
+        await pool.close_all()
+        dead.close()
+        server.server.close()
+        return result, elapsed, winner, candidates
+    
+    result, elapsed, winner, candidates = asyncio.run(run())
+    assert result["code"] == 250
+    assert elapsed < 1.0  # Backup raced after the attempt delay, not after the 2 s connect timeout
+    assert winner == ("127.0.0.1", "127.0.0.1")
+    assert candidates[0] == winner
+
+
+def test_race_connect_closes_silent_sockets():
+    from validator.smtp_client import race_connect
+
+    async def run():
+        server = FakeSMTPServer()
+        port = await server.start()
+        closed = []
+
+        async def silent(reader, writer):
+            await reader.read()  # EOF once the client closes its socket
+            closed.append(True)
+            writer.close()
+        dead = await asyncio.start_server(silent, "127.0.0.2", port)
+
+        # Tarpit: TCP up, banner never comes
+        try:
+            await race_connect([("tarpit", "127.0.0.2")], port=port, timeout=0.2)
+        except Exception:
+            pass
+        await asyncio.sleep(0.1)
+        tarpit_closed = len(closed)
+
+        # Loser cancelled after TCP came up, when the backup wins
+        smtp, winner, _ = await race_connect([("tarpit", "127.0.0.2"), ("good", "127.0.0.1")],
+                                             port=port, timeout=2.0, attempt_delay=0.05)
+        smtp.close()
+        await asyncio.sleep(0.1)
+        dead.close()
+        server.server.close()
+        return tarpit_closed, len(closed), winner
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", ResourceWarning)  # Raised when a leaked writer is garbage-collected
+        tarpit_closed, total_closed, winner = asyncio.run(run())
+    assert not [w for w in caught if issubclass(w.category, ResourceWarning)]
+    assert tarpit_closed == 1 and total_closed == 2
+    assert winner == ("good", "127.0.0.1")
+
+
+def test_dead_pooled_connection_is_retried():
+    async def run():
+        server = FakeSMTPServer(drop_after_rset=True)
+        smtp_pool.SMTP_PORT = await server.start()
+        pool = SMTPConnectionPool("127.0.0.1", ["127.0.0.1"])
+        first = await pool.verify_email("good@corp.example")
+        # Pooled session is fresh, so no NOOP - the dead socket is found on use and replaced
+        second = await pool.verify_email("good@corp.example")
+        await pool.close_all()
+        server.server.close()
+        return pool, first, second, server
+    
+    pool, first, second, server = asyncio.run(run())
+    assert first["code"] == 250 and second["code"] == 250
+    assert pool.broken_retries == 1
+    assert "NOOP" not in server.commands
+
+
+def test_dead_idle_connection_closed_without_quit():
+    async def run():
+        server = FakeSMTPServer(silent_noop=True)
+        smtp_pool.SMTP_PORT = await server.start()
+        pool = SMTPConnectionPool("127.0.0.1", ["127.0.0.1"])
+        await pool.verify_email("good@corp.example")
+        pool.pool[0].last_used = 0.0  # Idle long enough for the NOOP check
+        start = time.time()
+        second = await pool.verify_email("good@corp.example")
+        elapsed = time.time() - start
+        commands = list(server.commands)
+        await pool.close_all()
+        server.server.close()
+        return second, elapsed, commands
+
+    second, elapsed, commands = asyncio.run(run())
+    assert second["code"] == 250
+    assert "NOOP" in commands and "QUIT" not in commands  # Dead session dropped, not QUIT
+    assert elapsed < 1.0 + smtp_pool.COMMAND_TIMEOUT  # No second wait for a QUIT reply
+
+
+def test_pool_registry_evicts_lru_and_reaps_idle():
+    async def run():
+        server = FakeSMTPServer()
+        smtp_pool.SMTP_PORT = await server.start()
+        registry = SMTPPoolRegistry(max_pools=2, idle_timeout=0.05, pool_expiry=0.15)
+        first = registry.get(["127.0.0.1"])
+        await first.verify_email("good@corp.example")
+        second = registry.get(["mx.second.example"])
+        assert registry.get(["127.0.0.1"]) is first  # Touch: now the most recently used
+        registry.get(["mx.third.example"])
+        await asyncio.sleep(0)  # Evicted pool is closed in the background
+        evicted = ("mx.second.example" not in registry, second.closed, "127.0.0.1" in registry)
+        before_reap = registry.stats()
+
+        await asyncio.sleep(0.1)
+        await registry.reap()  # Idle connection QUIT, pools still within their expiry
+        after_idle = (registry.stats(), list(server.commands))
+        await asyncio.sleep(0.1)
+        await registry.reap()  # Nothing open and quiet past pool_expiry: forgotten
+        after_expiry = registry.stats()
+        await registry.close_all()
+        server.server.close()
+        return evicted, before_reap, after_idle, after_expiry
+
+    evicted, before_reap, (after_idle, commands), after_expiry = asyncio.run(run())
+    assert evicted == (True, True, True)
+    assert before_reap["pools"] == 2 and before_reap["evictions"] == 1
+    assert before_reap["open_sockets"] == before_reap["idle_sockets"] == 1
+    assert after_idle["reaped_connections"] == 1 and after_idle["open_sockets"] == 0 and after_idle["pools"] == 2
+    assert commands[-1] == "QUIT"
+    assert after_expiry["pools"] == 0 and after_expiry["expired_pools"] == 2
+
+
+def test_pool_learns_timeouts_and_tarpits_from_sessions():
+    async def run():
+        server = FakeSMTPServer()
+        live = await asyncio.start_server(server.handle, "127.0.0.5", 0)
+        smtp_pool.SMTP_PORT = live.sockets[0].getsockname()[1]
+
+        async def tarpit(reader, writer):
+            await reader.read()  # TCP up, banner never comes
+            writer.close()
+        dead = await asyncio.start_server(tarpit, "127.0.0.6", smtp_pool.SMTP_PORT)
+
+        pool = SMTPConnectionPool("127.0.0.5", ["127.0.0.5"])
+        defaults = pool.timeouts
+        for i in range(4):
+            await pool.verify_email(f"user{i}@corp.example")
+        learned = pool.timeouts
+        session_timeout = pool.pool[0].timeout
+
+        connect_timeout, smtp_pool.CONNECT_TIMEOUT = smtp_pool.CONNECT_TIMEOUT, 0.1
+        tarpit_pool = SMTPConnectionPool("127.0.0.6", ["127.0.0.6"])
+        try:
+            replies = [await tarpit_pool.verify_email(f"user{i}@corp.example") for i in range(4)]
+        finally:
+            smtp_pool.CONNECT_TIMEOUT = connect_timeout
+        await pool.close_all()
+        await tarpit_pool.close_all()
+        live.close()
+        dead.close()
+        return defaults, learned, session_timeout, replies
+
+    defaults, learned, session_timeout, replies = asyncio.run(run())
+    assert defaults == (smtp_pool.CONNECT_TIMEOUT, smtp_pool.COMMAND_TIMEOUT)
+    # Fast local replies: command timeout down to its floor; one banner is too few samples to learn from
+    assert learned == (smtp_pool.CONNECT_TIMEOUT, COMMAND_TIMEOUT_BOUNDS[0])
+    assert session_timeout == COMMAND_TIMEOUT_BOUNDS[0]  # Pooled session picked up the learned value
+    profile = domain_profiles.get("mx:127.0.0.5")
+    assert round(sum(profile.banner_hist)) == 1 and sum(profile.command_hist) >= 5  # Counts decay continuously
+    assert all(r["status"] in ("error", "timeout") for r in replies)
+    assert domain_profiles.is_tarpit("127.0.0.6")
+    assert domain_profiles.advise("victim.example", ["127.0.0.6"])["reason"] == "tarpit"
+
+
+def test_circuit_breaker_short_circuits_blocked_port():
+    async def run():
+        server = FakeSMTPServer()
+        smtp_pool.SMTP_PORT = await server.start()
+        # Nothing listens on the other loopback addresses: every connect is refused
+        dead_hosts = [f"127.0.0.{i}" for i in range(3, 3 + GLOBAL_MIN_HOSTS)]
+        for i in range(GLOBAL_FAILURE_THRESHOLD):
+            host = dead_hosts[i % len(dead_hosts)]
+            await SMTPConnectionPool(host, [host]).verify_email("good@corp.example")
+        tripped = smtp_breaker.global_open
+        
+        pool = SMTPConnectionPool("127.0.0.1", ["127.0.0.1"])
+        blocked = await pool.verify_email("good@corp.example")
+        commands_while_open = len(server.commands)
+        
+        # Canary reaches the port again: breaker closes and probes resume
+        canary_ok = await smtp_breaker.probe_canary(port=smtp_pool.SMTP_PORT)
+        smtp_breaker.reset()
+        after = await pool.verify_email("good@corp.example")
+        await smtp_breaker.close()
+        await pool.close_all()
+        server.server.close()
+        return tripped, blocked, commands_while_open, canary_ok, after
+    
+    smtp_breaker.canary_hosts = ["127.0.0.1"]
+    tripped, blocked, commands_while_open, canary_ok, after = asyncio.run(run())
+    assert tripped
+    assert blocked["status"] == "error" and "outbound_port_25_blocked" in blocked["message"]
+    assert commands_while_open == 0
+    assert canary_ok and after["code"] == 250
+
+
+def test_instant_verdict_then_deep_smtp():
+    async def fake_mx(domain):
+        return {"mx_hosts": ["127.0.0.1"], "provider": "custom"}
+
+    async def run():
+        from validator import async_validator  # Its DNS resolver needs a running loop
+        server = FakeSMTPServer()
+        smtp_pool.SMTP_PORT = await server.start()
+        async_validator.dns_cache.get_mx_records = fake_mx
+        preliminary, deep = await async_validator.validate_email_instant("good@instant.example", fresh=True)
+        commands_before_deep = len(server.commands)
+        
+        checks = PendingChecks()
+        check = checks.get(checks.submit(preliminary, deep, owner=1))
+        finished = await checks.wait(check, timeout=5)
+        await async_validator.smtp_pools.close_all()
+        server.server.close()
+        return preliminary, commands_before_deep, finished, check
+    
+    preliminary, commands_before_deep, finished, check = asyncio.run(run())
+    assert preliminary["checks"]["smtp"] == "pending" and commands_before_deep == 0
+    assert preliminary["status"] == "unknown" and preliminary["sub_status"] == "pending"
+    assert not preliminary["safe_to_send"] and preliminary["smtp_valid"] == "Pending"
+    assert finished and not check.pending
+    assert check.current()["checks"]["smtp"] == "accepted" and check.current()["status"] == "valid"
+
+
+def test_disposable_domain_skips_smtp_on_both_paths():
+    async def fake_mx(domain):
+        return {"mx_hosts": ["127.0.0.1"], "provider": "custom"}
+
+    async def run():
+        from validator import async_validator
+        server = FakeSMTPServer()
+        smtp_pool.SMTP_PORT = await server.start()
+        async_validator.dns_cache.get_mx_records = fake_mx
+        async_validator.DISPOSABLE_DOMAINS.add("trash.example")
+        try:
+            single = await async_validator.validate_email_async("good@trash.example", fresh=True)
+            bulk = await async_validator.validate_bulk_async(["good@trash.example", "other@trash.example"], fresh=True)
+        finally:
+            async_validator.DISPOSABLE_DOMAINS.discard("trash.example")
+        await async_validator.smtp_pools.close_all()
+        server.server.close()
+        return server, single, bulk
+
+    server, single, bulk = asyncio.run(run())
+    assert server.commands == []  # Neither path opened an SMTP session
+    assert single["checks"]["smtp"] == "not_checked" and all(r["checks"]["smtp"] == "not_checked" for r in bulk)
+    assert (single["status"], single["sub_status"]) == (bulk[0]["status"], bulk[0]["sub_status"])
+
+
+def test_fast_catch_all_probe_shares_first_session():
+    from validator import fast_validator
+
+    async def run():
+        server = FakeSMTPServer(pipelining=True)
+        fast_validator.SMTP_PORT = await server.start()
+        verifier = fast_validator.FastSMTPVerifier()
+        is_catchall, result = await verifier.verify_with_catch_all_probe("good@strict.example", ["127.0.0.1"], "strict.example")
+        await asyncio.sleep(0.05)  # Let the fire-and-forget QUIT land
+        server.server.close()
+        return server, is_catchall, result
+
+    server, is_catchall, result = asyncio.run(run())
+    assert is_catchall is False and result["valid"] and "probe_code" not in result
+    assert sum(1 for c in server.commands if c.startswith("MAIL")) == 1
+    rcpts = [c for c in server.commands if c.startswith("RCPT")]
+    assert len(rcpts) == 2 and rcpts[1] == "RCPT TO:<good@strict.example>"  # Probe first, same transaction
+    assert fast_validator._catchall_cache.get("strict.example") is False
+
+
+def test_rate_limit_spaces_rcpt_probes():
+    assert rate_for("alt1.gmail-smtp-in.l.google.com") == (50.0, 100.0)
+    assert rate_for("mx.notgoogle.com")[0] != 50.0
+
+    async def run():
+        server = FakeSMTPServer()
+        smtp_pool.SMTP_PORT = await server.start()
+        mx_rate_limiter._buckets["127.0.0.2"] = TokenBucket(rate=20.0, burst=2.0)
+        pool = SMTPConnectionPool("127.0.0.2", ["127.0.0.1"])
+        start = time.time()
+        for i in range(6):
+            await pool.verify_email(f"user{i}@corp.example")
+        elapsed = time.time() - start
+        await pool.close_all()
+        server.server.close()
+        return elapsed
+
+    elapsed = asyncio.run(run())
+    assert elapsed >= (6 - 2) / 20.0 * 0.9  # Burst of 2, then one probe per 50 ms
+    assert mx_rate_limiter.get_stats()["throttled"] >= 4
+
+
+def test_rate_tokens_follow_sent_rcpts():
+    async def run(pipelining):
+        server = FakeSMTPServer(pipelining=pipelining, max_rcpt=3)
+        smtp_pool.SMTP_PORT = await server.start()
+        host = f"127.0.0.{3 + pipelining}"
+        bucket = mx_rate_limiter._buckets[host] = TokenBucket(rate=1e-6, burst=100.0)
+        pool = SMTPConnectionPool(host, ["127.0.0.1"])
+        results = await pool.verify_batch(["good@corp.example"] + [f"user{i}@corp.example" for i in range(7)])
+        await pool.close_all()
+        server.server.close()
+        return server, results, bucket
+
+    for pipelining in (False, True):
+        server, results, bucket = asyncio.run(run(pipelining))
+        assert len(results) == 8
+        rcpts = sum(1 for c in server.commands if c.startswith("RCPT"))
+        assert round(bucket.burst - bucket.tokens) == rcpts, (pipelining, bucket.tokens, rcpts)  # Unsent RCPTs refunded
+
+
+if __name__ == "__main__":
+    for test in (test_multi_rcpt_maps_codes, test_multi_rcpt_fallback_on_limit, test_dropped_session_keeps_rcpt_limit,
+                 test_greylist_reply_keeps_batching,
+                 test_quit_runs_outside_pool_lock, test_pipelining_single_flush, test_pipelining_fallback_on_limit,
+                 test_happy_eyeballs_skips_dead_primary, test_race_connect_closes_silent_sockets,
+                 test_dead_pooled_connection_is_retried, test_dead_idle_connection_closed_without_quit,
+                 test_pool_registry_evicts_lru_and_reaps_idle, test_pool_learns_timeouts_and_tarpits_from_sessions,
+                 test_circuit_breaker_short_circuits_blocked_port, test_instant_verdict_then_deep_smtp,
+                 test_disposable_domain_skips_smtp_on_both_paths,
+                 test_fast_catch_all_probe_shares_first_session, test_rate_limit_spaces_rcpt_probes,
+                 test_rate_tokens_follow_sent_rcpts):
+        test()
+        print(f"✅ {test.__name__}")
@@ -1,20 +1,30 @@
 import asyncio
 import time
-from typing import Dict, Any, List, Optional
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple
 from email_validator import validate_email as validate_email_syntax, EmailNotValidError
 
 from .dns_cache import DNSCache
-from .smtp_pool import SMTPConnectionPool
+from .smtp_pool import SMTPConnectionPool, SMTPPoolRegistry, MAX_RCPT_PER_TRANSACTION, CONNECT_TIMEOUT, COMMAND_TIMEOUT
+from .verdict_cache import VerdictCache
+from .domain_profile import domain_profiles
+from .circuit_breaker import smtp_breaker
+from .greylist_queue import parse_retry_after
+from .priority import PrioritySemaphore
 
 from pathlib import Path
 
 # Global Instances & Concurrency Control
 dns_cache = DNSCache()
-smtp_pools: Dict[str, SMTPConnectionPool] = {}
-smtp_semaphore = asyncio.Semaphore(150)  # Max concurrent SMTP checks
-worker_semaphore = asyncio.Semaphore(500) # Max total concurrent validation tasks
-MAX_CONNECTIONS_PER_DOMAIN = 3
+verdict_cache = VerdictCache()
+worker_semaphore = PrioritySemaphore("workers", 500, reserved=50) # Max total concurrent validation tasks; 50 kept for interactive checks
+MAX_CONNECTIONS_PER_MX = 3 # Idle sessions kept per MX; concurrency itself is set by the MX's AIMD limiter
+smtp_pools = SMTPPoolRegistry(MAX_CONNECTIONS_PER_MX)  # Keyed by primary MX host, LRU-bounded, idle connections reaped
 TOTAL_EMAIL_TIMEOUT = 12.0 # Max time for a single email validation
+BATCH_TIMEOUT_PER_RCPT = 2.0 # Extra budget per recipient in a multi-RCPT transaction
+SMTP_ROUND_TRIPS = 4 # Connect, EHLO, MAIL, RCPT - turns an MX's learned timeouts into a per-email budget
+MAX_ADAPTIVE_EMAIL_TIMEOUT = 30.0 # Ceiling for that budget (slow but legitimate servers may need more than TOTAL_EMAIL_TIMEOUT)
+CATCH_ALL_FIRST_MIN_ADDRESSES = 2 # Domains with at least this many addresses in a bulk run are probed for catch-all first
 
 # Constants (Architect Intelligence)
 FREE_PROVIDERS = {
@@ -175,8 +185,12 @@ async def phase_2_dns(domain: str) -> Dict[str, Any]:
 
 # ======================= PHASE 4: PROVIDER OVERRIDE =======================
 
-def get_provider_rules(domain: str, provider_name: str) -> Dict[str, Any]:
-    """Combine domain and provider intelligence to determine behavior"""
+def get_provider_rules(domain: str, provider_name: str, mx_hosts: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Combine domain and provider intelligence to determine behavior.
+    For SMTP-checked domains the learned profile may skip SMTP (MX never answers or tarpits),
+    supply a known catch-all verdict or a timeout budget from the MX's learned latency.
+    """
     rule_key = PROVIDER_MAPPING.get(domain.lower())
     if not rule_key:
         # Fallback to provider fingerprinting from MX
@@ -185,32 +199,154 @@ def get_provider_rules(domain: str, provider_name: str) -> Dict[str, Any]:
         elif "yahoo" in provider_name.lower(): rule_key = "yahoo"
         else: rule_key = "custom"
         
-    return PROVIDER_RULES.get(rule_key, PROVIDER_RULES["custom"])
+    rules = PROVIDER_RULES.get(rule_key, PROVIDER_RULES["custom"])
+    if not rules["smtp_check"]:
+        return rules
+    
+    advice = domain_profiles.advise(domain, mx_hosts)
+    rules = dict(rules, known_catch_all=advice["catch_all"])
+    if advice["skip_smtp"]:
+        rules.update(smtp_check=False, catch_all=False, default_status="unknown", skip_reason=advice["reason"])
+    if advice["connect_timeout"] or advice["command_timeout"]:
+        budget = (advice["connect_timeout"] or CONNECT_TIMEOUT) + (SMTP_ROUND_TRIPS - 1) * (advice["command_timeout"] or COMMAND_TIMEOUT)
+        rules["smtp_timeout"] = min(MAX_ADAPTIVE_EMAIL_TIMEOUT, budget)
+    return rules
+
+def _skipped_status(rules: Dict[str, Any]) -> str:
+    return f"skipped_{rules.get('skip_reason', 'free_provider')}"
+
+def _domain_is_final(domain: str, p2: Dict[str, Any]) -> bool:
+    """No MX, disposable or blacklisted: the verdict is the same for every address, no SMTP probe needed"""
+    return not p2["mx_exists"] or domain in DISPOSABLE_DOMAINS or domain in BLACKLIST_DOMAINS
+
+# ======================= PHASE 5 & 6: SMTP & CATCH-ALL =======================
+
+def get_smtp_pool(mx_hosts: List[str]) -> SMTPConnectionPool:
+    """
+    Get or create the SMTP pool for the primary MX host.
+    Domains hosted on the same MX (Workspace, Mimecast, Proofpoint...) share warm sessions.
+    """
+    return smtp_pools.get(mx_hosts)
+
+async def phase_5_smtp(email: str, domain: str, p2: Dict[str, Any], rules: Dict[str, Any]) -> Dict[str, Any]:
+    """Phase 5 & 6: RCPT probe through the MX pool, then catch-all (cached per recipient domain)"""
+    p4 = {
+        "smtp_status": "not_checked",
+        "smtp_code": 0,
+        "is_catch_all": False
+    }
+    if rules.get("known_catch_all"):
+        # Learned catch-all: the RCPT reply would be 250 regardless
+        return {"smtp_status": "catch_all", "smtp_code": 250, "is_catch_all": True}
+    breaker_reason = smtp_breaker.check(p2["mx_hosts"][0])
+    if breaker_reason:
+        p4["smtp_status"] = breaker_reason
+        return p4
+    pool = get_smtp_pool(p2["mx_hosts"])
+    try:
+        smtp_res = await asyncio.wait_for(pool.verify_email(email), timeout=rules.get("smtp_timeout", TOTAL_EMAIL_TIMEOUT))
+        p4["smtp_code"] = smtp_res.get("code", 0)
+        p4["smtp_status"] = smtp_res.get("status", "unknown")
+        if p4["smtp_status"] == "temporary":
+            p4["retry_after"] = parse_retry_after(smtp_res.get("message"))
+        
+        # Phase 6: Catch-all detection
+        if p4["smtp_code"] == 250 and rules["catch_all"] and rules.get("known_catch_all") is not False:
+            p4["is_catch_all"] = await dns_cache.is_catch_all_domain(domain, pool)
+    except Exception as e:
+        p4["smtp_status"] = "error"
+    return p4
+
+async def phase_5_smtp_batch(emails: List[str], domain: str, p2: Dict[str, Any], rules: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Phase 5 & 6 for several addresses of one domain in a single multi-RCPT transaction"""
+    breaker_reason = smtp_breaker.check(p2["mx_hosts"][0])
+    p4s = {email: {"smtp_status": breaker_reason or "not_checked", "smtp_code": 0, "is_catch_all": False} for email in emails}
+    if breaker_reason:
+        return p4s
+    pool = get_smtp_pool(p2["mx_hosts"])
+    try:
+        timeout = rules.get("smtp_timeout", TOTAL_EMAIL_TIMEOUT) + BATCH_TIMEOUT_PER_RCPT * len(emails)
+        smtp_results = await asyncio.wait_for(pool.verify_batch(emails), timeout=timeout)
+        for email, smtp_res in smtp_results.items():
+            p4s[email]["smtp_code"] = smtp_res.get("code", 0)
+            p4s[email]["smtp_status"] = smtp_res.get("status", "unknown")
+            if smtp_res.get("status") == "temporary":
+                p4s[email]["retry_after"] = parse_retry_after(smtp_res.get("message"))
+        
+        # Phase 6: Catch-all detection (once per domain, applied to every accepted address)
+        accepted = [p4 for p4 in p4s.values() if p4["smtp_code"] == 250]
+        if accepted and rules["catch_all"] and rules.get("known_catch_all") is not False:
+            is_catch_all = await dns_cache.is_catch_all_domain(domain, pool)
+            for p4 in accepted:
+                p4["is_catch_all"] = is_catch_all
+    except Exception as e:
+        for p4 in p4s.values():
+            if p4["smtp_status"] == "not_checked":
+                p4["smtp_status"] = "error"
+    return p4s
 
 # ======================= MAIN PIPELINE =======================
 
-async def validate_email_async(email: str) -> Dict[str, Any]:
+async def validate_email_async(email: str, fresh: bool = False) -> Dict[str, Any]:
+    """Single email validation; served from the verdict cache unless fresh=True"""
+    if not fresh:
+        cached = await verdict_cache.get(email)
+        if cached is not None:
+            return cached
+    async with worker_semaphore.slot():
+        result = await _validate_email_uncached(email)
+    verdict_cache.put(email, result)
+    return result
+
+async def validate_email_instant(email: str, fresh: bool = False) -> Tuple[Dict[str, Any], Optional[Awaitable[Dict[str, Any]]]]:
+    """
+    Two-tier validation: the syntax / DNS / disposable / role verdict right away, plus an
+    awaitable that finishes SMTP & catch-all and returns the final result (None when the
+    first verdict is already final). The final result goes to the verdict cache.
+    """
+    if not fresh:
+        cached = await verdict_cache.get(email)
+        if cached is not None:
+            return cached, None
+    preliminary, deep = await _validate_email_tiered(email)
+    if deep is None:
+        verdict_cache.put(email, preliminary)
+        return preliminary, None
+    
+    async def finish() -> Dict[str, Any]:
+        async with worker_semaphore.slot():
+            result = await deep
+        verdict_cache.put(email, result)
+        return result
+    return preliminary, finish()
+
+async def _validate_email_uncached(email: str) -> Dict[str, Any]:
     """Principal Architect Production-Grade Pipeline"""
+    preliminary, deep = await _validate_email_tiered(email)
+    return await deep if deep is not None else preliminary
+
+async def _validate_email_tiered(email: str) -> Tuple[Dict[str, Any], Optional[Awaitable[Dict[str, Any]]]]:
+    """Phases 1-4 now; phases 5 & 6 (SMTP, catch-all) as an awaitable when the provider rules need them"""
     start_time = time.time()
     email = email.strip() # Keep original casing for output, but internal compare is lower
     
     # 1. PHASE 1: SYNTAX (ABSOLUTE)
     p1 = phase_1_syntax(email)
     if not p1["syntax_valid"]:
-        return format_output_architect(email, p1, None, None, None, (time.time()-start_time)*1000)
+        return format_output_architect(email, p1, None, None, None, (time.time()-start_time)*1000), None
 
     domain = email.split('@')[1].lower()
     
     # 2. PHASE 2: DOMAIN & MX
     p2 = await phase_2_dns(domain)
     if not p2["mx_exists"]:
-        return format_output_architect(email, p1, p2, None, None, (time.time()-start_time)*1000)
+        return format_output_architect(email, p1, p2, None, None, (time.time()-start_time)*1000), None
         
     # 3. PHASE 3: DISPOSABLE / ROLE / BLACKLIST (Already checked in P1 results object)
     p3 = {"is_free_provider": domain in FREE_PROVIDERS}
     
     # 4. PHASE 4: PROVIDER OVERRIDES
-    rules = get_provider_rules(domain, p2.get("provider_name", "unknown"))
+    rules = get_provider_rules(domain, p2.get("provider_name", "unknown"), p2["mx_hosts"])
     
     p4 = {
         "smtp_status": "not_checked",
@@ -218,28 +354,17 @@ async def validate_email_async(email: str) -> Dict[str, Any]:
         "is_catch_all": False
     }
     
+    if not rules["smtp_check"] or _domain_is_final(domain, p2):
+        p4["smtp_status"] = "not_checked" if rules["smtp_check"] else _skipped_status(rules)
+        return format_output_architect(email, p1, p2, p3, p4, (time.time() - start_time) * 1000), None
+    
     # 5. PHASE 5 & 6: SMTP & CATCH-ALL (Selective)
-    if rules["smtp_check"]:
-        async with smtp_semaphore:
-            if domain not in smtp_pools:
-                smtp_pools[domain] = SMTPConnectionPool(domain, p2["mx_hosts"], MAX_CONNECTIONS_PER_DOMAIN)
-            
-            pool = smtp_pools[domain]
-            try:
-                smtp_res = await asyncio.wait_for(pool.verify_email(email), timeout=TOTAL_EMAIL_TIMEOUT)
-                p4["smtp_code"] = smtp_res.get("code", 0)
-                p4["smtp_status"] = smtp_res.get("status", "unknown")
-                
-                # Phase 6: Catch-all detection
-                if p4["smtp_code"] == 250 and rules["catch_all"]:
-                    p4["is_catch_all"] = await dns_cache.is_catch_all_domain(domain, pool)
-            except Exception as e:
-                p4["smtp_status"] = "error"
-    else:
-        p4["smtp_status"] = "skipped_free_provider"
-
-    exec_ms = (time.time() - start_time) * 1000
-    return format_output_architect(email, p1, p2, p3, p4, exec_ms)
+    async def deep() -> Dict[str, Any]:
+        p4 = await phase_5_smtp(email, domain, p2, rules)
+        return format_output_architect(email, p1, p2, p3, p4, (time.time() - start_time) * 1000)
+    
+    p4["smtp_status"] = "pending"
+    return format_output_architect(email, p1, p2, p3, p4, (time.time() - start_time) * 1000), deep()
 
 # ======================= FINAL RESPONSE OBJECT (EXACT FORMAT) =======================
 
@@ -248,6 +373,10 @@ def format_output_architect(email, p1, p2, p3, p4, ms) -> Dict[str, Any]:
     from .scoring_engine import classify_status_reoon
     
     status, reason, score = classify_status_reoon(p1, p2, p3, p4)
+    smtp_pending = bool(p4) and p4["smtp_status"] == "pending"
+    if smtp_pending:
+        # Preliminary verdict of an instant check: nothing is final until SMTP answers
+        status, reason = "unknown", "pending"
     
     # Required Format
     res = {
@@ -277,34 +406,178 @@ def format_output_architect(email, p1, p2, p3, p4, ms) -> Dict[str, Any]:
         "is_disabled": reason == "disabled",
         "regex": "Valid" if p1 and p1["syntax_valid"] else "Not Valid",
         "mx_record_exists": "Valid" if p2 and p2["mx_exists"] else "Not Valid",
-        "smtp_valid": "Valid" if status == "valid" else "Not Valid",
+        "smtp_valid": "Pending" if smtp_pending else ("Valid" if status == "valid" else "Not Valid"),
         "reason": reason,
         "disposable": "Yes" if p1.get("is_disposable") else "No",
         "role_based": "Yes" if p1.get("is_role") else "No",
         "catch_all": "Yes" if p4 and p4.get("is_catch_all") else "No"
     })
+    if p4 and p4.get("retry_after"):
+        res["retry_after"] = p4["retry_after"]  # Greylisting delay suggested by the server
     
     return res
 
-async def validate_bulk_async(emails: List[str], batch_id: str = None) -> List[Dict[str, Any]]:
-    """Bulk validation using the architect-level pipeline"""
+# ======================= BULK ENGINE (DOMAIN-GROUPED) =======================
+
+async def _validate_domain_group(domain: str, items: List[Tuple[str, Dict[str, Any]]], out: Dict[str, Dict[str, Any]]):
+    """
+    Validate every address of one domain.
+    DNS is resolved once; domain-level verdicts are applied to all addresses in one pass;
+    SMTP domains drain their queue in order through their MX pool
+    (one worker per session the MX's adaptive limiter allows, not one task per email), sending
+    up to MAX_RCPT_PER_TRANSACTION recipients per MAIL FROM.
+    """
+    start_time = time.time()
+    p2 = await phase_2_dns(domain)
+    
+    if not p2["mx_exists"]:
+        ms = (time.time() - start_time) * 1000
+        for email, p1 in items:
+            out[email] = format_output_architect(email, p1, p2, None, None, ms)
+        return
+    
+    p3 = {"is_free_provider": domain in FREE_PROVIDERS}
+    rules = get_provider_rules(domain, p2.get("provider_name", "unknown"), p2["mx_hosts"])
+    
+    smtp_needed = rules["smtp_check"] and not _domain_is_final(domain, p2)
+    # Circuit open (port 25 blocked / MX refusing connects): answer now instead of waiting out timeouts
+    breaker_reason = smtp_breaker.check(p2["mx_hosts"][0]) if smtp_needed else None
+    if not smtp_needed or breaker_reason:
+        p4 = {
+            "smtp_status": breaker_reason or ("not_checked" if rules["smtp_check"] else _skipped_status(rules)),
+            "smtp_code": 0,
+            "is_catch_all": False
+        }
+        ms = (time.time() - start_time) * 1000
+        for email, p1 in items:
+            out[email] = format_output_architect(email, p1, p2, p3, dict(p4), ms)
+        return
+    
+    if rules["catch_all"] and (len(items) >= CATCH_ALL_FIRST_MIN_ADDRESSES or rules.get("known_catch_all")):
+        items = await _catch_all_first(domain, items, p2, p3, rules, out)
+        if not items:
+            return
+    
+    queue = deque(items)
+    limiter = get_smtp_pool(p2["mx_hosts"]).limiter
+    workers: set = set()
+    
+    def scale_workers():
+        # One worker per session the MX's AIMD limiter currently allows (grows as the limit rises)
+        while len(workers) < min(limiter.current_limit, -(-len(queue) // MAX_RCPT_PER_TRANSACTION)):
+            task = asyncio.ensure_future(drain())
+            workers.add(task)
+            task.add_done_callback(workers.discard)
+    
+    async def drain():
+        while queue:
+            batch = [queue.popleft() for _ in range(min(MAX_RCPT_PER_TRANSACTION, len(queue)))]
+            batch_start = time.time()
+            p4s = await phase_5_smtp_batch([email for email, _ in batch], domain, p2, rules)
+            ms = (time.time() - batch_start) * 1000 / len(batch)
+            for email, p1 in batch:
+                out[email] = format_output_architect(email, p1, p2, p3, p4s[email], ms)
+            scale_workers()
+    
+    scale_workers()
+    while workers:
+        await asyncio.gather(*list(workers))
+
+async def _catch_all_first(domain: str, items: List[Tuple[str, Dict[str, Any]]], p2: Dict[str, Any],
+                           p3: Dict[str, Any], rules: Dict[str, Any],
+                           out: Dict[str, Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Decide catch-all before per-address probing. The random-address probe rides in the
+    same transaction as the first real RCPT. A catch-all domain classifies every address
+    without further RCPTs; otherwise the first address is already answered.
+    Returns the addresses still needing the normal SMTP path.
+    """
     start_time = time.time()
-    unique_emails = list(set([e.strip() for e in emails if e.strip()]))
-    
-    # Concurrency control
-    async def task_wrapper(email):
-        async with worker_semaphore:
-            return await validate_email_async(email)
-            
-    tasks = [task_wrapper(email) for email in unique_emails]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-    
-    final = []
-    for i, res in enumerate(results):
-        if isinstance(res, Exception):
-            final.append({"email": unique_emails[i], "status": "unknown", "sub_status": "error"})
+    is_catch_all = await dns_cache.peek_catch_all(domain)
+    if is_catch_all is None:
+        is_catch_all = rules.get("known_catch_all")
+    
+    if is_catch_all is None:
+        first_email, first_p1 = items[0]
+        pool = get_smtp_pool(p2["mx_hosts"])
+        try:
+            is_catch_all, first_res = await asyncio.wait_for(
+                pool.verify_with_catch_all_probe(domain, first_email), timeout=rules.get("smtp_timeout", TOTAL_EMAIL_TIMEOUT)
+            )
+        except Exception:
+            return items  # Undecided - normal path (catch-all checked after the first 250)
+        if is_catch_all is not None:
+            dns_cache.record_catch_all(domain, is_catch_all)
+        if first_res is not None and not is_catch_all:
+            p4 = {"smtp_status": first_res.get("status", "unknown"), "smtp_code": first_res.get("code", 0), "is_catch_all": False}
+            out[first_email] = format_output_architect(first_email, first_p1, p2, p3, p4, (time.time() - start_time) * 1000)
+            items = items[1:]
+    
+    if not is_catch_all:
+        return items
+    
+    # Accepts everything: the RCPT reply would be 250 for every address
+    ms = (time.time() - start_time) * 1000 / len(items)
+    for email, p1 in items:
+        p4 = {"smtp_status": "catch_all", "smtp_code": 250, "is_catch_all": True}
+        out[email] = format_output_architect(email, p1, p2, p3, p4, ms)
+    return []
+
+class _ResultSink(dict):
+    """email -> verdict map that finishes each verdict as it lands (cache it, tag it, report it)"""
+
+    def __init__(self, batch_id: Optional[str], on_result: Optional[Callable[[Dict[str, Any]], None]]):
+        super().__init__()
+        self.batch_id = batch_id
+        self.on_result = on_result
+
+    def __setitem__(self, email: str, res: Dict[str, Any]):
+        if email in self:
+            return  # First verdict wins
+        if not res.get("cached") and "checks" in res:
+            verdict_cache.put(email, res)
+        if self.batch_id:
+            res["batch_id"] = self.batch_id
+        super().__setitem__(email, res)
+        if self.on_result:
+            self.on_result(res)
+
+async def validate_bulk_async(emails: List[str], batch_id: str = None, fresh: bool = False,
+                              on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Bulk validation using the architect-level pipeline.
+    Addresses with a live cached verdict are answered from the verdict cache (unless fresh=True);
+    the rest are grouped by domain so each domain is resolved once
+    and probes to the same MX host share one pool.
+    on_result is called with each verdict as soon as it is final (bulk job progress / checkpoints).
+    """
+    unique_emails = list(dict.fromkeys(e.strip() for e in emails if e.strip()))
+    
+    results = _ResultSink(batch_id, on_result)
+    if not fresh:
+        for email, res in (await verdict_cache.get_many(unique_emails)).items():
+            results[email] = res
+    
+    # Phase 1 is pure CPU: run it inline and group survivors by domain
+    groups: Dict[str, List[Tuple[str, Dict[str, Any]]]] = defaultdict(list)
+    for email in unique_emails:
+        if email in results:
+            continue
+        p1 = phase_1_syntax(email)
+        if not p1["syntax_valid"]:
+            results[email] = format_output_architect(email, p1, None, None, None, 0.0)
         else:
-            if batch_id: res["batch_id"] = batch_id
-            final.append(res)
-            
-    return final
+            groups[email.split('@')[1].lower()].append((email, p1))
+    
+    # Concurrency control: one task per domain
+    async def group_wrapper(domain, items):
+        async with worker_semaphore.slot():
+            await _validate_domain_group(domain, items, results)
+    
+    # A failed domain group leaves its addresses without a verdict - they are reported as errors below
+    await asyncio.gather(*[group_wrapper(d, items) for d, items in groups.items()], return_exceptions=True)
+    
+    for email in unique_emails:
+        if email not in results:
+            results[email] = {"email": email, "status": "unknown", "sub_status": "error"}
+    return [results[email] for email in unique_emails]
@@ -0,0 +1,407 @@
+"""
+Cache Backends
+Pluggable second-level cache shared by uvicorn workers.
+Each cache keeps its in-process first level; on a local miss it asks the
+backend before doing DNS / SMTP work, and publishes what it learns.
+
+VALIDATOR_CACHE_BACKEND:
+    memory - in-process only (default, nothing shared)
+    shm    - shared-memory hash table for all workers on one host
+    redis  - any Redis-protocol server (VALIDATOR_REDIS_URL)
+"""
+import asyncio
+import fcntl
+import json
+import os
+import struct
+import tempfile
+import time
+import zlib
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+CACHE_BACKEND = os.getenv("VALIDATOR_CACHE_BACKEND", "memory").lower()
+REDIS_URL = os.getenv("VALIDATOR_REDIS_URL", "redis://127.0.0.1:6379/0")
+SHM_NAME = os.getenv("VALIDATOR_SHM_NAME", "email_validator_cache")
+SHM_SLOTS = int(os.getenv("VALIDATOR_SHM_SLOTS", "32768"))
+SHM_SLOT_SIZE = int(os.getenv("VALIDATOR_SHM_SLOT_SIZE", "1024"))  # Bytes per entry, header included
+
+# (value, expires_at) - value may legitimately be None (cached negative answer)
+CacheHit = Tuple[Any, float]
+
+
+class CacheBackend(ABC):
+    """
+    Async key/value interface used by the MX, catch-all and verdict caches.
+    Backend failures are reported as misses - a cache outage must never fail a validation.
+    """
+
+    shared = False  # True when other worker processes see our writes
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._publishing: Set[asyncio.Future] = set()  # Strong refs so pending writes are not collected
+
+    @abstractmethod
+    async def get(self, namespace: str, key: str) -> Optional[CacheHit]:
+        ...
+
+    @abstractmethod
+    async def set(self, namespace: str, key: str, value: Any, ttl: float):
+        ...
+
+    @abstractmethod
+    async def delete(self, namespace: str, key: str):
+        ...
+
+    def publish(self, namespace: str, key: str, value: Any, ttl: float):
+        """Fire-and-forget set from synchronous cache code (shared backends only)"""
+        if self.shared and ttl > 0:
+            task = asyncio.ensure_future(self.set(namespace, key, value, ttl))
+            self._publishing.add(task)
+            task.add_done_callback(self._publishing.discard)
+
+    async def close(self):
+        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self).__name__,
+            "shared": self.shared,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors
+        }
+
+    def _record(self, hit: Optional[CacheHit]) -> Optional[CacheHit]:
+        if hit is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return hit
+
+
+# ======================= IN-PROCESS =======================
+
+class InProcessCacheBackend(CacheBackend):
+    """Plain dict with per-key expiry (single worker / tests)"""
+
+    def __init__(self, max_size: int = 50000):
+        super().__init__()
+        self._data: Dict[str, CacheHit] = {}
+        self._max_size = max_size
+
+    async def get(self, namespace: str, key: str) -> Optional[CacheHit]:
+        full_key = f"{namespace}:{key}"
+        hit = self._data.get(full_key)
+        if hit is not None and hit[1] <= time.time():
+            del self._data[full_key]
+            hit = None
+        return self._record(hit)
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: float):
+        if len(self._data) >= self._max_size:
+            for k in list(self._data.keys())[:self._max_size // 10]:
+                del self._data[k]
+        self._data[f"{namespace}:{key}"] = (value, time.time() + ttl)
+
+    async def delete(self, namespace: str, key: str):
+        self._data.pop(f"{namespace}:{key}", None)
+
+
+# ======================= SHARED MEMORY =======================
+
+class SharedMemoryCacheBackend(CacheBackend):
+    """
+    Fixed-size open-addressing hash table in a named shared-memory segment.
+    The segment starts with its layout [magic][u32 slot_size][u32 slots], written
+    by the worker that creates it; workers attaching later follow that layout
+    (and refuse a segment without one) instead of their own settings.
+    Slot: [u32 crc][f64 expires_at][u16 length][zlib json payload]; the payload
+    carries the full key so crc collisions are detected. A lock file (flock)
+    serialises writers across processes. When all probe slots are live the
+    home slot is overwritten - it is a cache, losing an entry only costs a lookup.
+    Entries too big for a slot stay local and are counted as oversize.
+    The blocking lock and memory I/O run on one helper thread, off the event loop.
+    """
+
+    shared = True
+    LAYOUT = struct.Struct("<4sII")
+    MAGIC = b"EVC1"
+    HEADER = struct.Struct("<IdH")
+    MAX_PROBES = 8
+
+    def __init__(self, name: str = SHM_NAME, slots: int = SHM_SLOTS, slot_size: int = SHM_SLOT_SIZE):
+        super().__init__()
+        self.name = name
+        self.slots = slots
+        self.slot_size = slot_size
+        self.oversize = 0
+        self._lock_fd = os.open(os.path.join(tempfile.gettempdir(), f"{name}.lock"), os.O_CREAT | os.O_RDWR)
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)  # The creator writes the layout before anyone reads it
+        try:
+            try:
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=self.LAYOUT.size + slots * slot_size)
+                self.LAYOUT.pack_into(self._shm.buf, 0, self.MAGIC, slot_size, slots)
+            except FileExistsError:
+                self._shm = shared_memory.SharedMemory(name=name)
+            magic, self.slot_size, self.slots = self.LAYOUT.unpack_from(self._shm.buf, 0)
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+        # Workers attach to a segment that outlives any one of them - don't let
+        # the resource tracker unlink it when this process exits
+        try:
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+        except Exception:
+            pass
+        if (magic != self.MAGIC or self.slot_size <= self.HEADER.size or not self.slots
+                or self._shm.size < self.LAYOUT.size + self.slots * self.slot_size):
+            self._shm.close()
+            os.close(self._lock_fd)
+            raise ValueError(f"shared memory segment {name} has no valid slot layout")
+        if (self.slot_size, self.slots) != (slot_size, slots):
+            print(f"[CACHE BACKEND] {name} has {self.slots} slots of {self.slot_size} bytes, using its layout")
+        self.max_payload = self.slot_size - self.HEADER.size
+        # One thread: flock is per open file, so calls from this process must not overlap
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shm-cache")
+
+    def _probe(self, full_key: str):
+        crc = zlib.crc32(full_key.encode())
+        home = crc % self.slots
+        for i in range(self.MAX_PROBES):
+            yield crc, (home + i) % self.slots
+
+    def _read_slot(self, slot: int) -> Tuple[int, float, bytes]:
+        offset = self.LAYOUT.size + slot * self.slot_size
+        crc, expires_at, length = self.HEADER.unpack_from(self._shm.buf, offset)
+        start = offset + self.HEADER.size
+        return crc, expires_at, bytes(self._shm.buf[start:start + length])
+
+    def _write_slot(self, slot: int, crc: int, expires_at: float, payload: bytes):
+        offset = self.LAYOUT.size + slot * self.slot_size
+        self.HEADER.pack_into(self._shm.buf, offset, crc, expires_at, len(payload))
+        start = offset + self.HEADER.size
+        self._shm.buf[start:start + len(payload)] = payload
+
+    def _get(self, full_key: str) -> Optional[CacheHit]:
+        now = time.time()
+        fcntl.flock(self._lock_fd, fcntl.LOCK_SH)
+        try:
+            for crc, slot in self._probe(full_key):
+                slot_crc, expires_at, payload = self._read_slot(slot)
+                if expires_at == 0:
+                    return None  # Never-used slot ends the probe chain
+                if slot_crc != crc or expires_at <= now:
+                    continue
+                stored_key, value = json.loads(zlib.decompress(payload))
+                if stored_key == full_key:
+                    return value, expires_at
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+        return None
+
+    def _set(self, full_key: str, value: Any, expires_at: float):
+        payload = zlib.compress(json.dumps([full_key, value], separators=(",", ":")).encode(), 1)
+        if len(payload) > self.max_payload:
+            self.oversize += 1  # Too big for a slot - stays local only
+            return
+        now = time.time()
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            target = None
+            for crc, slot in self._probe(full_key):
+                slot_crc, slot_expires, slot_payload = self._read_slot(slot)
+                if slot_crc == crc and slot_expires > 0 and json.loads(zlib.decompress(slot_payload))[0] == full_key:
+                    target = slot
+                    break
+                if target is None and slot_expires <= now:
+                    target = slot
+            if target is None:
+                target = zlib.crc32(full_key.encode()) % self.slots
+            self._write_slot(target, zlib.crc32(full_key.encode()), expires_at, payload)
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _delete(self, full_key: str):
+        # Expire in place so the probe chain stays intact
+        if self._get(full_key) is not None:
+            self._set(full_key, None, time.time() - 1)
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def get(self, namespace: str, key: str) -> Optional[CacheHit]:
+        try:
+            return self._record(await self._run(self._get, f"{namespace}:{key}"))
+        except Exception:
+            self.errors += 1
+            return None
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: float):
+        try:
+            await self._run(self._set, f"{namespace}:{key}", value, time.time() + ttl)
+        except Exception:
+            self.errors += 1
+
+    async def delete(self, namespace: str, key: str):
+        try:
+            await self._run(self._delete, f"{namespace}:{key}")
+        except Exception:
+            self.errors += 1
+
+    async def close(self):
+        self._executor.shutdown(wait=True)
+        self._shm.close()
+        os.close(self._lock_fd)
+    
+    def destroy(self):
+        """Remove the segment itself (last worker / tests)"""
+        resource_tracker.register(self._shm._name, "shared_memory")  # unlink() unregisters it again
+        self._shm.unlink()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**super().get_stats(), "slot_size": self.slot_size, "oversize": self.oversize}
+
+
+# ======================= REDIS PROTOCOL =======================
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Minimal RESP2 client over asyncio streams (GET / SET PX / DEL).
+    One connection, requests serialised by a lock; reconnects on the next
+    call after a failure. Values are JSON [value, expires_at].
+    """
+
+    shared = True
+
+    def __init__(self, url: str = REDIS_URL, timeout: float = 0.5, prefix: str = "ev"):
+        super().__init__()
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self.prefix = prefix
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), timeout=self.timeout
+        )
+        if self.password:
+            await self._roundtrip("AUTH", self.password)
+        if self.db:
+            await self._roundtrip("SELECT", str(self.db))
+
+    async def _roundtrip(self, *args: str) -> Any:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg.encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._writer.write(b"".join(parts))
+        await self._writer.drain()
+        return await asyncio.wait_for(self._read_reply(), timeout=self.timeout)
+
+    async def _read_reply(self) -> Any:
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode()
+        if kind == b"-":
+            raise RuntimeError(body.decode())
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2].decode()
+        if kind == b"*":
+            count = int(body)
+            return None if count < 0 else [await self._read_reply() for _ in range(count)]
+        raise RuntimeError(f"Unexpected Redis reply: {line!r}")
+
+    async def execute(self, *args: str) -> Any:
+        async with self._lock:
+            try:
+                if self._writer is None or self._writer.is_closing():
+                    await self._connect()
+                return await self._roundtrip(*args)
+            except Exception:
+                self._drop()
+                raise
+
+    def _drop(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def get(self, namespace: str, key: str) -> Optional[CacheHit]:
+        try:
+            raw = await self.execute("GET", f"{self.prefix}:{namespace}:{key}")
+        except Exception:
+            self.errors += 1
+            return None
+        if raw is None:
+            return self._record(None)
+        value, expires_at = json.loads(raw)
+        return self._record((value, expires_at))
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: float):
+        payload = json.dumps([value, time.time() + ttl], separators=(",", ":"))
+        try:
+            await self.execute("SET", f"{self.prefix}:{namespace}:{key}", payload, "PX", str(max(1, int(ttl * 1000))))
+        except Exception:
+            self.errors += 1
+
+    async def delete(self, namespace: str, key: str):
+        try:
+            await self.execute("DEL", f"{self.prefix}:{namespace}:{key}")
+        except Exception:
+            self.errors += 1
+
+    async def close(self):
+        async with self._lock:
+            self._drop()
+
+
+# ======================= FACTORY =======================
+
+_backend: Optional[CacheBackend] = None
+
+
+def create_cache_backend(kind: str = CACHE_BACKEND) -> CacheBackend:
+    if kind == "redis":
+        return RedisCacheBackend(REDIS_URL)
+    if kind == "shm":
+        return SharedMemoryCacheBackend()
+    return InProcessCacheBackend()
+
+
+def get_cache_backend() -> CacheBackend:
+    """Process-wide backend selected by VALIDATOR_CACHE_BACKEND"""
+    global _backend
+    if _backend is None:
+        try:
+            _backend = create_cache_backend()
+        except Exception as e:
+            print(f"[CACHE BACKEND] {CACHE_BACKEND} unavailable ({e}), using in-process cache")
+            _backend = InProcessCacheBackend()
+    return _backend
+
+
+def set_cache_backend(backend: CacheBackend):
+    """Swap the process-wide backend (tests, custom deployments)"""
+    global _backend
+    _backend = backend
@@ -0,0 +1,166 @@
+"""
+Persistent Cache Store
+SQLite snapshot of the MX / catch-all caches, learned domain profiles and
+pending greylist re-checks, so a restart starts warm and loses no re-checks.
+Stored at VALIDATOR_CACHE_PATH (set it empty to disable); writes are queued in
+memory and flushed in the background (write-behind), so cache updates never
+wait on disk. Workers sharing the file coordinate through claims, which are
+written through.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Empty path = persistence disabled
+CACHE_STORE_PATH = os.getenv("VALIDATOR_CACHE_PATH", "validator_cache.db")
+CACHE_FLUSH_INTERVAL = float(os.getenv("VALIDATOR_CACHE_FLUSH_INTERVAL", "5"))
+
+
+class PersistentCacheStore:
+    """
+    SQLite-backed key/value snapshot: (namespace, key) -> (json value, expires_at)
+    Only unexpired rows are loaded back; expired rows are purged on flush.
+    """
+
+    def __init__(self, path: str, flush_interval: float = CACHE_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._pending: Dict[Tuple[str, str], Tuple[Any, float]] = {}
+        self._db_lock = threading.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        self.writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._db_lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT,"
+                " expires_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_claims ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, owner TEXT NOT NULL,"
+                " until REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            self._conn.commit()
+
+    def load(self, namespace: str) -> List[Tuple[str, Any, float]]:
+        """Unexpired (key, value, expires_at) rows for one namespace"""
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT key, value, expires_at FROM cache_entries WHERE namespace = ? AND expires_at > ?",
+                (namespace, time.time())
+            ).fetchall()
+        return [(key, json.loads(value), expires_at) for key, value, expires_at in rows]
+
+    def put(self, namespace: str, key: str, value: Any, expires_at: float):
+        """Queue a write (latest value per key wins); flushed by the background task"""
+        self._pending[(namespace, key)] = (value, expires_at)
+
+    def claim(self, namespace: str, key: str, owner: str, until: float) -> str:
+        """
+        Take (namespace, key) for `owner` until `until`, unless another owner holds an unexpired
+        claim - one atomic upsert, so of several workers racing exactly one wins.
+        Returns the holder afterwards ("" = settled for good). Blocking - run via to_thread.
+        """
+        with self._db_lock:
+            self._conn.execute(
+                "INSERT INTO cache_claims (namespace, key, owner, until) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (namespace, key) DO UPDATE SET owner = excluded.owner, until = excluded.until"
+                " WHERE cache_claims.until <= ? OR cache_claims.owner = excluded.owner",
+                (namespace, key, owner, until, time.time())
+            )
+            self._conn.commit()
+            row = self._conn.execute(
+                "SELECT owner FROM cache_claims WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        return row[0]
+
+    def settle(self, namespace: str, key: str, until: float):
+        """Mark a claimed key done: nobody can claim it again before `until` (blocking)"""
+        with self._db_lock:
+            self._conn.execute(
+                "UPDATE cache_claims SET owner = '', until = ? WHERE namespace = ? AND key = ?",
+                (until, namespace, key)
+            )
+            self._conn.commit()
+
+    def flush(self) -> int:
+        """Write queued entries and purge expired rows (blocking - run via to_thread)"""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        rows = [(ns, key, json.dumps(value), expires_at) for (ns, key), (value, expires_at) in pending.items()]
+        with self._db_lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+            self._conn.execute("DELETE FROM cache_claims WHERE until <= ?", (time.time(),))
+            self._conn.commit()
+        self.writes += len(rows)
+        return len(rows)
+
+    async def start(self):
+        """Start the write-behind flusher"""
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                print(f"[CACHE STORE] Flush failed: {e}")
+
+    async def close(self):
+        """Stop the flusher and write whatever is still queued"""
+        if self._flusher:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await asyncio.to_thread(self.flush)
+        with self._db_lock:
+            self._conn.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "pending_writes": len(self._pending), "rows_written": self.writes}
+
+
+# ======================= GLOBAL STORE =======================
+
+_store: Optional[PersistentCacheStore] = None
+
+
+def open_cache_store(path: str = CACHE_STORE_PATH) -> Optional[PersistentCacheStore]:
+    """Open the process-wide store (None when persistence is disabled)"""
+    global _store
+    if _store is None and path:
+        _store = PersistentCacheStore(path)
+    return _store
+
+
+def get_cache_store() -> Optional[PersistentCacheStore]:
+    return _store
+
+
+def persist(namespace: str, key: str, value: Any, expires_at: float):
+    """Write-behind hook for the caches - no-op when persistence is disabled"""
+    if _store is not None:
+        _store.put(namespace, key, value, expires_at)
+
+
+async def close_cache_store():
+    global _store
+    if _store is not None:
+        await _store.close()
+        _store = None
@@ -0,0 +1,196 @@
+"""
+SMTP Circuit Breakers
+Connect failures feed a breaker per MX host and one global breaker.
+A misbehaving MX is skipped for a cooldown; when connects fail across many
+MX hosts with no success in between, outbound port 25 is assumed blocked and
+every SMTP probe is short-circuited until a background canary gets through.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Per-MX: consecutive connect failures that open the breaker, and how long it stays open
+MX_FAILURE_THRESHOLD = 5
+MX_OPEN_SECONDS = 60.0
+MAX_BREAKERS = 5000
+
+# Global: consecutive connect failures (spread over at least GLOBAL_MIN_HOSTS MX hosts) with no success
+GLOBAL_FAILURE_THRESHOLD = 20
+GLOBAL_MIN_HOSTS = 5
+
+# Canary: port-25 hosts that always accept connections, re-probed while the global breaker is open
+CANARY_HOSTS = [h.strip() for h in os.getenv(
+    "VALIDATOR_CANARY_HOSTS",
+    "gmail-smtp-in.l.google.com,hotmail-com.olc.protection.outlook.com,mta5.am0.yahoodns.net"
+).split(",") if h.strip()]
+CANARY_INTERVAL = 30.0
+CANARY_TIMEOUT = 5.0
+
+# Reasons reported in results when SMTP was short-circuited
+REASON_PORT_25_BLOCKED = "outbound_port_25_blocked"
+REASON_MX_CIRCUIT_OPEN = "mx_circuit_open"
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker: closed -> open after `failure_threshold` failures,
+    half-open once `open_seconds` have passed (traffic is let through again),
+    closed on the next success or re-opened on the next failure.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = MX_FAILURE_THRESHOLD,
+                 open_seconds: float = MX_OPEN_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.last_used = time.time()
+
+    def allows(self) -> bool:
+        self.last_used = time.time()
+        if self.state == OPEN and time.time() - self.opened_at >= self.open_seconds:
+            self.state = HALF_OPEN
+        return self.state != OPEN
+
+    def record_success(self):
+        self.failures = 0
+        self.state = CLOSED
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self._open()
+
+    def _open(self):
+        if self.state != OPEN:
+            self.trips += 1
+        self.state = OPEN
+        self.opened_at = time.time()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "failures": self.failures, "trips": self.trips}
+
+
+class SMTPCircuitBreaker:
+    """
+    Global port-25 breaker plus per-MX breakers.
+    The global breaker only opens on failures spread over several MX hosts (one dead
+    host never trips it) and only closes when a canary connect succeeds.
+    """
+
+    def __init__(self, canary_hosts: Optional[List[str]] = None, max_breakers: int = MAX_BREAKERS):
+        self.canary_hosts = canary_hosts if canary_hosts is not None else CANARY_HOSTS
+        self.max_breakers = max_breakers
+        self.global_open = False
+        self.opened_at = 0.0
+        self.trips = 0
+        self.short_circuited = 0
+        self.canary_probes = 0
+        self._failures = 0
+        self._failed_hosts: set = set()
+        self._breakers: "OrderedDict[str, CircuitBreaker]" = OrderedDict()
+        self._canary: Optional[asyncio.Task] = None
+
+    def _breaker(self, mx_host: str) -> CircuitBreaker:
+        key = mx_host.lower()
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker(key)
+            while len(self._breakers) > self.max_breakers:
+                self._breakers.popitem(last=False)
+        else:
+            self._breakers.move_to_end(key)
+        return breaker
+
+    def check(self, mx_host: str) -> Optional[str]:
+        """Reason to skip SMTP for this (primary) MX host, or None to go ahead"""
+        if self.global_open:
+            self.short_circuited += 1
+            return REASON_PORT_25_BLOCKED
+        if not self._breaker(mx_host).allows():
+            self.short_circuited += 1
+            return REASON_MX_CIRCUIT_OPEN
+        return None
+
+    def record_connect(self, mx_host: str, ok: bool):
+        """Outcome of one connect attempt (TCP + banner) to an MX host"""
+        breaker = self._breaker(mx_host)
+        if ok:
+            breaker.record_success()
+            self._failures = 0
+            self._failed_hosts.clear()
+            return
+        breaker.record_failure()
+        self._failures += 1
+        self._failed_hosts.add(mx_host.lower())
+        if (not self.global_open and self._failures >= GLOBAL_FAILURE_THRESHOLD
+                and len(self._failed_hosts) >= GLOBAL_MIN_HOSTS):
+            self._trip()
+
+    def _trip(self):
+        self.global_open = True
+        self.opened_at = time.time()
+        self.trips += 1
+        print(f"[SMTP BREAKER] Open: {self._failures} connect failures across "
+              f"{len(self._failed_hosts)} MX hosts - outbound port 25 looks blocked")
+        if self._canary is None or self._canary.done():
+            self._canary = asyncio.ensure_future(self._canary_loop())
+
+    def reset(self):
+        """Close the global breaker (canary got through)"""
+        self.global_open = False
+        self._failures = 0
+        self._failed_hosts.clear()
+
+    async def _canary_loop(self):
+        while self.global_open:
+            await asyncio.sleep(CANARY_INTERVAL)
+            if await self.probe_canary():
+                print(f"[SMTP BREAKER] Closed: canary reached port 25 after {time.time() - self.opened_at:.0f}s")
+                self.reset()
+
+    async def probe_canary(self, port: int = 25) -> bool:
+        """True if any canary host accepts a TCP connection on port 25"""
+        self.canary_probes += 1
+
+        async def connect(host: str) -> bool:
+            try:
+                _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=CANARY_TIMEOUT)
+            except (OSError, asyncio.TimeoutError):
+                return False
+            writer.close()
+            return True
+
+        return any(await asyncio.gather(*[connect(host) for host in self.canary_hosts]))
+
+    async def close(self):
+        """Stop the canary (app shutdown)"""
+        if self._canary is not None:
+            self._canary.cancel()
+            try:
+                await self._canary
+            except asyncio.CancelledError:
+                pass
+            self._canary = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "global_state": OPEN if self.global_open else CLOSED,
+            "global_trips": self.trips,
+            "consecutive_connect_failures": self._failures,
+            "short_circuited": self.short_circuited,
+            "canary_probes": self.canary_probes,
+            "open_mx_hosts": [key for key, b in self._breakers.items() if b.state != CLOSED]
+        }
+
+
+# ======================= GLOBAL BREAKER =======================
+
+smtp_breaker = SMTPCircuitBreaker()
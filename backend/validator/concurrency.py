@@ -0,0 +1,215 @@
+"""
+Adaptive Concurrency
+Per-MX-host AIMD limiter: the number of concurrent SMTP sessions to one
+MX grows by one per window of fast replies and is cut on 421/450/451 or
+timeouts, so big providers get parallelism and small servers get backoff.
+Waiters on an MX and on the global session pool are served interactive lane
+first, then round-robin across users (see priority.py).
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Iterable, Optional
+
+from .domain_profile import domain_profiles
+from .priority import PrioritySemaphore, FairQueue, LANES, current_lane, current_share, record_job_wait
+
+# AIMD tuning
+INITIAL_LIMIT = 3
+MIN_LIMIT = 1
+MAX_LIMIT = 20
+LATENCY_TARGET = 1.5  # Seconds; slower replies stop additive increase
+DECREASE_FACTOR = 0.5
+DECREASE_COOLDOWN = 2.0  # One cut per burst of congestion signals
+
+# Ceiling on SMTP sessions across all MX hosts (sockets / source-IP reputation)
+GLOBAL_SMTP_LIMIT = 150
+GLOBAL_SMTP_INTERACTIVE_RESERVED = 20  # Sessions bulk jobs can never take
+
+# Limiters kept for MX hosts not seen recently (LRU; busy limiters are never evicted)
+MAX_LIMITERS = 5000
+
+# Replies that mean "you are hitting me too hard"
+CONGESTION_CODES = {421, 450, 451}
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit for one MX host (AIMD).
+    Use `async with limiter.slot() as slot:` and report the reply code via
+    slot.code (or slot.timed_out); latency is measured automatically and also
+    feeds the MX / recipient-domain profiles.
+    """
+
+    def __init__(self, key: str, initial: int = INITIAL_LIMIT, min_limit: int = MIN_LIMIT,
+                 max_limit: int = MAX_LIMIT, latency_target: float = LATENCY_TARGET):
+        self.key = key
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self.latency_ewma: Optional[float] = None
+        self.successes = 0
+        self.congestion_events = 0
+        self.last_used = time.time()
+        self._last_decrease = 0.0
+        self._waiters: Dict[str, FairQueue] = {lane: FairQueue() for lane in LANES}
+
+    @property
+    def current_limit(self) -> int:
+        return max(self.min_limit, int(self.limit))
+    
+    @property
+    def busy(self) -> bool:
+        return self.in_flight > 0 or self.waiting > 0
+    
+    @property
+    def waiting(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    async def acquire(self):
+        self.last_used = time.time()
+        if self.in_flight < self.current_limit and not self.waiting:
+            self.in_flight += 1
+            return
+        start = time.time()
+        waiters, share = self._waiters[current_lane.get()], current_share.get()
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter, share)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was handed over as we were cancelled - pass it on
+                self.release()
+            else:
+                waiters.remove(waiter, share)
+            raise
+        record_job_wait(time.time() - start)
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        for lane in LANES:  # Interactive waiters first
+            waiters = self._waiters[lane]
+            while waiters and self.in_flight < self.current_limit:
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    self.in_flight += 1
+                    waiter.set_result(None)
+
+    def on_success(self, latency: float):
+        """Fast reply: additive increase (+1 per `limit` successes)"""
+        self.successes += 1
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+        if self.latency_ewma <= self.latency_target and self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._wake()
+
+    def on_congestion(self):
+        """421/450/timeout: multiplicative decrease (at most once per cooldown)"""
+        self.congestion_events += 1
+        now = time.time()
+        if now - self._last_decrease >= DECREASE_COOLDOWN:
+            self.limit = max(float(self.min_limit), self.limit * DECREASE_FACTOR)
+            self._last_decrease = now
+
+    def record(self, code: Optional[int], latency: float, timed_out: bool = False):
+        if timed_out or code in CONGESTION_CODES:
+            self.on_congestion()
+        elif code:
+            self.on_success(latency)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Per-MX slot first, then a global session - waiting on a slow MX never holds a global one"""
+        await self.acquire()
+        try:
+            async with global_smtp_sessions.slot():
+                outcome = SlotOutcome()
+                start = time.time()
+                try:
+                    yield outcome
+                except asyncio.TimeoutError:
+                    outcome.timed_out = True
+                    raise
+                except asyncio.CancelledError:
+                    outcome.cancelled = True  # Our own deadline / shutdown: says nothing about the host
+                    raise
+                finally:
+                    latency = (time.time() - start) / outcome.round_trips
+                    self.record(outcome.code, latency, outcome.timed_out)
+                    if not outcome.cancelled:
+                        domain_profiles.record_smtp(self.key, outcome.domain, outcome.code, latency,
+                                                    outcome.timed_out, outcome.error)
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.current_limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "latency_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "successes": self.successes,
+            "congestion_events": self.congestion_events
+        }
+
+
+class SlotOutcome:
+    """Filled in by the caller inside a limiter slot"""
+
+    __slots__ = ("code", "timed_out", "cancelled", "round_trips", "domain", "error")
+
+    def __init__(self):
+        self.code: Optional[int] = None
+        self.timed_out = False
+        self.cancelled = False
+        self.round_trips = 1  # Latency is judged per round trip (lock-step multi-RCPT is many)
+        self.domain: Optional[str] = None  # Recipient domain, for its learned profile
+        self.error: Optional[str] = None
+
+    def observe(self, codes: Iterable[int]):
+        """Worst reply of a multi-RCPT transaction decides the signal"""
+        codes = [c for c in codes if c]
+        congested = [c for c in codes if c in CONGESTION_CODES]
+        self.code = congested[0] if congested else (codes[0] if codes else None)
+
+
+# ======================= REGISTRY =======================
+
+_limiters: "OrderedDict[str, AdaptiveLimiter]" = OrderedDict()
+global_smtp_sessions = PrioritySemaphore("smtp_sessions", GLOBAL_SMTP_LIMIT, reserved=GLOBAL_SMTP_INTERACTIVE_RESERVED)
+limiter_evictions = 0
+
+
+def get_limiter(mx_host: str) -> AdaptiveLimiter:
+    key = mx_host.lower()
+    limiter = _limiters.get(key)
+    if limiter is None:
+        limiter = _limiters[key] = AdaptiveLimiter(key)
+        if len(_limiters) > MAX_LIMITERS:
+            _evict_idle_limiters()
+    else:
+        _limiters.move_to_end(key)
+    return limiter
+
+
+def _evict_idle_limiters():
+    """Drop least-recently-used limiters that have nothing in flight"""
+    global limiter_evictions
+    for key in list(_limiters):
+        if len(_limiters) <= MAX_LIMITERS:
+            break
+        if not _limiters[key].busy:
+            del _limiters[key]
+            limiter_evictions += 1
+
+
+def get_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """Current limit / latency per MX host (for /api/metrics)"""
+    return {key: limiter.stats() for key, limiter in _limiters.items()}
@@ -1,28 +1,101 @@
 """
 DNS Cache Layer
 Async DNS resolution with TTL-based caching and provider fingerprinting
+MX answers live for the TTL the record returned (clamped to a floor/ceiling);
+hot entries are refreshed in the background and served stale meanwhile
 """
 import asyncio
 import time
-from typing import Dict, List, Optional, Any
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, Awaitable, Callable
 import aiodns
-from cachetools import TTLCache
+from cachetools import LRUCache, TLRUCache
+
+from .cache_backend import CacheBackend, get_cache_backend
+from .cache_store import PersistentCacheStore, persist
+from .domain_profile import domain_profiles
+
+# MX answer lifetime: record TTL clamped to [MIN_DNS_TTL, MAX_DNS_TTL]
+MIN_DNS_TTL = 60
+MAX_DNS_TTL = 86400
+NEGATIVE_DNS_TTL = 300      # NXDOMAIN / no MX and no A record
+STALE_DNS_TTL = 3600        # How long past expiry an entry may still be served while refreshing
+REFRESH_AHEAD = 0.1         # Entries requested in the last 10% of their TTL are refreshed early
+
+
+@dataclass
+class DNSCacheEntry:
+    """Cached MX answer (value is None for a negative answer)"""
+    value: Optional[Dict[str, Any]]
+    expires_at: float
+    refresh_at: float
+    stale_until: float
+
 
 class DNSCache:
     """
     Async DNS resolver with intelligent caching
-    Resolves each domain only once
+    Resolves each domain only once: concurrent misses for the same key
+    share one in-flight lookup (single-flight)
+    Expiry follows the record TTL; a hot domain is re-resolved in the
+    background before it expires, so callers never wait on a re-resolve
     """
     
-    def __init__(self, cache_ttl: int = 3600):
+    def __init__(self, cache_ttl: int = 3600, min_ttl: int = MIN_DNS_TTL, max_ttl: int = MAX_DNS_TTL,
+                 negative_ttl: int = NEGATIVE_DNS_TTL, stale_ttl: int = STALE_DNS_TTL,
+                 refresh_ahead: float = REFRESH_AHEAD, backend: Optional[CacheBackend] = None):
         """
         Args:
-            cache_ttl: Cache time-to-live in seconds (default 1 hour)
+            cache_ttl: Catch-all verdict time-to-live in seconds (default 1 hour)
+            min_ttl / max_ttl: Floor and ceiling applied to MX record TTLs
+            negative_ttl: Lifetime of "no MX / no A record" answers
+            stale_ttl: Grace period during which an expired answer is served while it refreshes
+            refresh_ahead: Fraction of the TTL before expiry in which a hit triggers a background refresh
+            backend: Shared second-level cache (default: VALIDATOR_CACHE_BACKEND)
         """
-        self.cache = TTLCache(maxsize=10000, ttl=cache_ttl)
-        self.catchall_cache = TTLCache(maxsize=5000, ttl=cache_ttl)
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.refresh_ahead = refresh_ahead
+        self.cache: LRUCache = LRUCache(maxsize=10000)  # cache_key -> DNSCacheEntry
+        self.catchall_ttl = cache_ttl
+        # cache_key -> (is_catchall, expires_at): each verdict keeps its own expiry (warm start, shared backend)
+        self.catchall_cache = TLRUCache(maxsize=5000, ttu=lambda _key, entry, _now: entry[1], timer=time.time)
         self.resolver = aiodns.DNSResolver(timeout=2.0)
-        self.lock = asyncio.Lock()
+        self._backend = backend
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.coalesced = {"mx": 0, "catchall": 0}  # Lookups saved by single-flight
+        self.stale_served = 0
+        self.background_refreshes = 0
+    
+    @property
+    def backend(self) -> CacheBackend:
+        return self._backend or get_cache_backend()
+    
+    def _start_flight(self, cache_key: str, kind: str, factory: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """
+        Join the in-flight lookup for cache_key or start one.
+        The lookup runs as its own task, so a caller that times out or is
+        cancelled does not cancel it for the other waiters.
+        """
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda t: self._finish_flight(cache_key, t))
+        else:
+            self.coalesced[kind] += 1
+        return task
+    
+    def _single_flight(self, cache_key: str, kind: str, factory: Callable[[], Awaitable[Any]]) -> Awaitable[Any]:
+        """Await the shared lookup without letting our cancellation reach it"""
+        return asyncio.shield(self._start_flight(cache_key, kind, factory))
+    
+    def _finish_flight(self, cache_key: str, task: asyncio.Task):
+        self._inflight.pop(cache_key, None)
+        if not task.cancelled():
+            task.exception()  # Mark retrieved even if every waiter gave up
     
     async def get_mx_records(self, domain: str) -> Optional[Dict[str, Any]]:
         """
@@ -31,11 +104,83 @@ class DNSCache:
         """
         cache_key = f"mx:{domain}"
         
-        # Check cache
-        if cache_key in self.cache:
-            return self.cache[cache_key]
+        # Check cache (stale-while-revalidate)
+        entry = self.cache.get(cache_key)
+        if entry is not None:
+            now = time.time()
+            if now < entry.expires_at:
+                if now >= entry.refresh_at:
+                    self._refresh_in_background(domain, cache_key)
+                return entry.value
+            if now < entry.stale_until:
+                self.stale_served += 1
+                self._refresh_in_background(domain, cache_key)
+                return entry.value
+            self.cache.pop(cache_key, None)
+        
+        return await self._single_flight(cache_key, "mx", lambda: self._resolve_mx(domain, cache_key, use_shared=True))
+    
+    def _refresh_in_background(self, domain: str, cache_key: str):
+        """Re-resolve without blocking the caller (joins any lookup already running)"""
+        if cache_key in self._inflight:
+            return
+        self.background_refreshes += 1
+        self._start_flight(cache_key, "mx", lambda: self._resolve_mx(domain, cache_key))
+    
+    def _store(self, cache_key: str, value: Optional[Dict[str, Any]], ttl: float, persisted: bool = False):
+        now = time.time()
+        self.cache[cache_key] = DNSCacheEntry(
+            value=value,
+            expires_at=now + ttl,
+            refresh_at=now + ttl * (1 - self.refresh_ahead),
+            stale_until=now + ttl + self.stale_ttl
+        )
+        if not persisted:
+            persist("mx", cache_key, value, now + ttl)
+            self.backend.publish("mx", cache_key, value, ttl)
+    
+    def _store_catch_all(self, cache_key: str, is_catchall: bool):
+        self.catchall_cache[cache_key] = (is_catchall, time.time() + self.catchall_ttl)
+        persist("catchall", cache_key, is_catchall, time.time() + self.catchall_ttl)
+        domain_profiles.record_catch_all(cache_key.split(":", 1)[1], is_catchall)
+        self.backend.publish("catchall", cache_key, is_catchall, self.catchall_ttl)
+    
+    def load_persisted(self, store: PersistentCacheStore) -> int:
+        """Warm start: load unexpired MX answers and catch-all verdicts from the store"""
+        now = time.time()
+        loaded = 0
+        for cache_key, value, expires_at in store.load("mx"):
+            self._store(cache_key, value, expires_at - now, persisted=True)
+            loaded += 1
+        for cache_key, is_catchall, expires_at in store.load("catchall"):
+            self.catchall_cache[cache_key] = (is_catchall, expires_at)
+            loaded += 1
+        return loaded
+    
+    def _clamp_ttl(self, records) -> float:
+        """Smallest TTL in the answer, clamped; the ceiling when the resolver gives none"""
+        ttls = [r.ttl for r in records if getattr(r, "ttl", None) is not None]
+        if not ttls:
+            return self.max_ttl
+        return max(self.min_ttl, min(self.max_ttl, min(ttls)))
+    
+    def _has_stale_answer(self, cache_key: str) -> bool:
+        entry = self.cache.get(cache_key)
+        return entry is not None and entry.value is not None
+    
+    async def _resolve_mx(self, domain: str, cache_key: str, use_shared: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Resolve MX records (A record fallback) and cache the answer
+        A cold miss first asks the shared backend - another worker may have resolved it already
+        (background refreshes skip it, the shared copy is the one expiring)
+        """
+        if use_shared and self.backend.shared:
+            hit = await self.backend.get("mx", cache_key)
+            if hit is not None:
+                value, expires_at = hit
+                self._store(cache_key, value, expires_at - time.time(), persisted=True)
+                return value
         
-        # Resolve MX records
         try:
             # Try MX records first
             mx_records = await self.resolver.query(domain, 'MX')
@@ -53,27 +198,33 @@ class DNSCache:
             }
             
             # Cache result
-            self.cache[cache_key] = result
+            self._store(cache_key, result, self._clamp_ttl(mx_records))
             return result
             
         except aiodns.error.DNSError as e:
+            if e.args and e.args[0] == aiodns.error.ARES_ETIMEOUT and self._has_stale_answer(cache_key):
+                # Resolver timed out during a refresh - keep serving the last good answer
+                return self.cache[cache_key].value
+            
             # Try A record fallback
             try:
-                await self.resolver.query(domain, 'A')
+                a_records = await self.resolver.query(domain, 'A')
                 # Domain exists but has no MX, use domain itself
                 result = {
                     "mx_hosts": [domain],
                     "provider": "custom"
                 }
-                self.cache[cache_key] = result
+                self._store(cache_key, result, self._clamp_ttl(a_records))
                 return result
             except:
                 # No MX and no A record
-                self.cache[cache_key] = None
+                self._store(cache_key, None, self.negative_ttl)
                 return None
         
         except Exception as e:
             print(f"[DNS ERROR] {domain}: {e}")
+            if self._has_stale_answer(cache_key):
+                return self.cache[cache_key].value
             return None
     
     def _detect_provider(self, mx_host: str) -> str:
@@ -123,22 +274,55 @@ class DNSCache:
         cache_key = f"catchall:{domain}"
         
         # Check cache
-        if cache_key in self.catchall_cache:
-            return self.catchall_cache[cache_key]
+        cached = self.catchall_cache.get(cache_key)
+        if cached is not None:
+            return cached[0]
+        
+        return await self._single_flight(cache_key, "catchall", lambda: self._probe_catch_all(domain, smtp_pool, cache_key))
+    
+    async def peek_catch_all(self, domain: str) -> Optional[bool]:
+        """Cached catch-all verdict (local, then shared backend) without probing; None if unknown"""
+        cache_key = f"catchall:{domain}"
+        cached = self.catchall_cache.get(cache_key)
+        if cached is not None:
+            return cached[0]
+        if self.backend.shared:
+            hit = await self.backend.get("catchall", cache_key)
+            if hit is not None:
+                self.catchall_cache[cache_key] = hit
+                return hit[0]
+        return None
+    
+    def record_catch_all(self, domain: str, is_catchall: bool):
+        """Store a verdict learned outside is_catch_all_domain (probe sent with a real RCPT)"""
+        self._store_catch_all(f"catchall:{domain}", is_catchall)
+    
+    async def _probe_catch_all(self, domain: str, smtp_pool, cache_key: str) -> bool:
+        """Send one random-address probe and cache the verdict (unless another worker already has)"""
+        if self.backend.shared:
+            hit = await self.backend.get("catchall", cache_key)
+            if hit is not None:
+                self.catchall_cache[cache_key] = hit
+                return hit[0]
         
-        # Test with fake email
         try:
-            is_catchall = await smtp_pool.verify_fake_email()
-            self.catchall_cache[cache_key] = is_catchall
+            is_catchall = await smtp_pool.verify_fake_email(domain)
+            self._store_catch_all(cache_key, is_catchall)
             return is_catchall
         except:
-            # If test fails, assume not catch-all (conservative)
-            self.catchall_cache[cache_key] = False
+            # If test fails, assume not catch-all (conservative) - not persisted
+            self.catchall_cache[cache_key] = (False, time.time() + self.catchall_ttl)
             return False
     
     def get_cache_stats(self) -> Dict[str, int]:
         """Get cache statistics"""
         return {
             "mx_cache_size": len(self.cache),
-            "catchall_cache_size": len(self.catchall_cache)
+            "catchall_cache_size": len(self.catchall_cache),
+            "mx_lookups_coalesced": self.coalesced["mx"],
+            "catchall_probes_coalesced": self.coalesced["catchall"],
+            "inflight": len(self._inflight),
+            "stale_served": self.stale_served,
+            "background_refreshes": self.background_refreshes,
+            "shared_backend": self.backend.get_stats()
         }
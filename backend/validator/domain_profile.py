@@ -0,0 +1,350 @@
+"""
+Domain Profiles
+Learned per-domain and per-MX facts: reply latency, how often a probe gets a
+definitive answer, greylisting, catch-all status and the last error.
+MX profiles also track banner / command latency (the source of each host's
+adaptive timeouts) and flag tarpits.
+Updated after every SMTP interaction, decayed over time and persisted through
+the cache store, so the next run starts with what the last one learned.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache_store import PersistentCacheStore, persist
+
+# Observations halve in weight every PROFILE_HALF_LIFE; unseen profiles are forgotten after PROFILE_RETENTION
+PROFILE_HALF_LIFE = 3 * 86400
+PROFILE_RETENTION = 30 * 86400
+MAX_PROFILES = 20000
+
+# Decayed observations needed before a profile changes strategy
+MIN_SAMPLES = 5.0
+
+# Share of attempts that must time out / fail to connect before SMTP is skipped
+UNREACHABLE_RATE = 0.9
+
+# While SMTP is skipped, one probe per interval still goes out; any reply clears the unreachable record
+RECOVERY_PROBE_INTERVAL = 900
+
+# A learned catch-all verdict is trusted this long
+CATCH_ALL_FRESHNESS = 86400
+
+# Latency histograms (seconds; the last bucket is open-ended)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0)
+
+# Adaptive timeouts = learned p95 * factor, clamped; the caller's default until MIN_SAMPLES replies
+TIMEOUT_FACTOR = 3.0
+CONNECT_TIMEOUT_BOUNDS = (1.0, 15.0)  # TCP connect + 220 banner
+COMMAND_TIMEOUT_BOUNDS = (0.5, 10.0)  # One command round trip
+
+# Tarpit: banner / reply slower than TARPIT_LATENCY, or TCP up but no banner before the timeout.
+# Flagged once there are TARPIT_MIN_HITS such sessions and they are TARPIT_RATE of all sessions
+TARPIT_LATENCY = 8.0
+TARPIT_MIN_HITS = 3.0
+TARPIT_RATE = 0.5
+
+GREYLIST_CODES = {450, 451}
+
+
+class DomainProfile:
+    """Decaying SMTP statistics for one recipient domain or one MX host"""
+
+    COUNTERS = ("attempts", "definitive", "timeouts", "errors", "throttled", "greylisted", "sessions", "tarpit_hits")
+    HISTOGRAMS = ("latency_hist", "banner_hist", "command_hist")
+
+    def __init__(self, key: str):
+        self.key = key
+        self.attempts = 0.0
+        self.definitive = 0.0  # Any 2xx/5xx RCPT reply
+        self.timeouts = 0.0
+        self.errors = 0.0  # Connect failures, dropped sessions
+        self.throttled = 0.0  # 421: reachable, just busy
+        self.greylisted = 0.0
+        self.sessions = 0.0  # Connects that got a banner or stalled waiting for one
+        self.tarpit_hits = 0.0
+        self.latency_hist = [0.0] * (len(LATENCY_BUCKETS) + 1)  # Per round trip, whole transaction
+        self.banner_hist = [0.0] * (len(LATENCY_BUCKETS) + 1)  # Connect -> 220
+        self.command_hist = [0.0] * (len(LATENCY_BUCKETS) + 1)  # Single command round trip
+        self.catch_all: Optional[bool] = None
+        self.catch_all_at = 0.0
+        self.last_error: Optional[str] = None
+        self.last_error_at = 0.0
+        self.probe_at = 0.0  # While skipped: when the last recovery probe went out (or the skip began)
+        self.updated_at = time.time()
+
+    def decay(self, now: float):
+        """Scale every observation down by the time passed since the last update"""
+        factor = 0.5 ** (max(0.0, now - self.updated_at) / PROFILE_HALF_LIFE)
+        for name in self.COUNTERS:
+            setattr(self, name, getattr(self, name) * factor)
+        for name in self.HISTOGRAMS:
+            setattr(self, name, [count * factor for count in getattr(self, name)])
+        self.updated_at = now
+
+    def observe(self, code: Optional[int], latency: float, timed_out: bool = False, error: Optional[str] = None):
+        """One SMTP interaction: reply code (0/None = no reply) and per-round-trip latency"""
+        now = time.time()
+        self.decay(now)
+        if code and not timed_out and self.unreachable_rate >= UNREACHABLE_RATE:
+            # The host answers again (recovery probe): forget the outage
+            self.timeouts = self.errors = 0.0
+            self.probe_at = 0.0
+        self.attempts += 1
+        if timed_out:
+            self.timeouts += 1
+            self._error("timeout", now)
+        elif not code:
+            self.errors += 1
+            self._error(error or "connect_failed", now)
+        elif code == 421:
+            self.throttled += 1
+            self._error("smtp_421", now)
+        elif code in GREYLIST_CODES:
+            self.greylisted += 1
+        else:
+            self.definitive += 1
+        if code and not timed_out:
+            self.latency_hist[self._bucket(latency)] += 1
+
+    def observe_latency(self, kind: str, seconds: float):
+        """
+        kind: "banner" (connect -> 220), "command" (one round trip) or
+        "tarpit" (TCP connected, no banner before the timeout)
+        """
+        now = time.time()
+        self.decay(now)
+        if kind != "command":
+            self.sessions += 1
+        if kind == "tarpit" or seconds >= TARPIT_LATENCY:
+            self.tarpit_hits += 1
+            self._error("tarpit", now)
+        if kind != "tarpit":
+            hist = self.banner_hist if kind == "banner" else self.command_hist
+            hist[self._bucket(seconds)] += 1
+
+    def observe_catch_all(self, is_catch_all: bool):
+        self.catch_all = is_catch_all
+        self.catch_all_at = time.time()
+
+    def _error(self, error: str, now: float):
+        self.last_error = error
+        self.last_error_at = now
+
+    @staticmethod
+    def _bucket(latency: float) -> int:
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                return i
+        return len(LATENCY_BUCKETS)
+
+    @property
+    def samples(self) -> float:
+        return self.attempts
+
+    def rate(self, counter: str) -> float:
+        return getattr(self, counter) / self.attempts if self.attempts else 0.0
+
+    @property
+    def unreachable_rate(self) -> float:
+        return (self.timeouts + self.errors) / self.attempts if self.attempts else 0.0
+
+    def latency_percentile(self, q: float, hist: Optional[List[float]] = None) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th percentile (None without replies)"""
+        hist = self.latency_hist if hist is None else hist
+        total = sum(hist)
+        if not total:
+            return None
+        seen = 0.0
+        for i, count in enumerate(hist):
+            seen += count
+            if seen >= q * total:
+                return LATENCY_BUCKETS[min(i, len(LATENCY_BUCKETS) - 1)]
+        return LATENCY_BUCKETS[-1]
+
+    def known_catch_all(self) -> Optional[bool]:
+        if self.catch_all is not None and time.time() - self.catch_all_at < CATCH_ALL_FRESHNESS:
+            return self.catch_all
+        return None
+
+    @property
+    def is_tarpit(self) -> bool:
+        return self.tarpit_hits >= TARPIT_MIN_HITS and self.tarpit_hits >= TARPIT_RATE * self.sessions
+
+    def _timeout(self, hist: List[float], bounds: Tuple[float, float]) -> Optional[float]:
+        if sum(hist) < MIN_SAMPLES:
+            return None
+        return min(bounds[1], max(bounds[0], self.latency_percentile(0.95, hist) * TIMEOUT_FACTOR))
+
+    def connect_timeout(self) -> Optional[float]:
+        """Connect + banner timeout from the learned p95 (None until there are enough samples)"""
+        return self._timeout(self.banner_hist, CONNECT_TIMEOUT_BOUNDS)
+
+    def command_timeout(self) -> Optional[float]:
+        """Per-command timeout from the learned p95 (None until there are enough samples)"""
+        return self._timeout(self.command_hist, COMMAND_TIMEOUT_BOUNDS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in self.COUNTERS + self.HISTOGRAMS}
+        data.update(
+            catch_all=self.catch_all, catch_all_at=self.catch_all_at,
+            last_error=self.last_error, last_error_at=self.last_error_at, probe_at=self.probe_at,
+            updated_at=self.updated_at
+        )
+        return data
+
+    @classmethod
+    def from_dict(cls, key: str, data: Dict[str, Any]) -> "DomainProfile":
+        profile = cls(key)
+        for name, value in data.items():
+            if hasattr(profile, name):
+                setattr(profile, name, value)
+        for name in cls.HISTOGRAMS:
+            if len(getattr(profile, name)) != len(LATENCY_BUCKETS) + 1:
+                setattr(profile, name, [0.0] * (len(LATENCY_BUCKETS) + 1))  # Bucket layout changed
+        return profile
+
+    def stats(self) -> Dict[str, Any]:
+        p50 = self.latency_percentile(0.5)
+        p95 = self.latency_percentile(0.95)
+        banner_p95 = self.latency_percentile(0.95, self.banner_hist)
+        command_p95 = self.latency_percentile(0.95, self.command_hist)
+        return {
+            "samples": round(self.attempts, 1),
+            "definitive_rate": round(self.rate("definitive"), 3),
+            "unreachable_rate": round(self.unreachable_rate, 3),
+            "greylist_rate": round(self.rate("greylisted"), 3),
+            "latency_p50_ms": p50 * 1000 if p50 is not None else None,
+            "latency_p95_ms": p95 * 1000 if p95 is not None else None,
+            "banner_p95_ms": banner_p95 * 1000 if banner_p95 is not None else None,
+            "command_p95_ms": command_p95 * 1000 if command_p95 is not None else None,
+            "connect_timeout": self.connect_timeout(),
+            "command_timeout": self.command_timeout(),
+            "tarpit": self.is_tarpit,
+            "catch_all": self.catch_all,
+            "last_error": self.last_error
+        }
+
+
+class ProfileRegistry:
+    """
+    Bounded LRU of profiles keyed "domain:<name>" / "mx:<host>".
+    Every update is queued for the persistent store (namespace "profile").
+    """
+
+    def __init__(self, max_size: int = MAX_PROFILES):
+        self.max_size = max_size
+        self._profiles: "OrderedDict[str, DomainProfile]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+    def get(self, key: str) -> Optional[DomainProfile]:
+        profile = self._profiles.get(key)
+        if profile is not None:
+            self._profiles.move_to_end(key)
+        return profile
+
+    def _get_or_create(self, key: str) -> DomainProfile:
+        profile = self.get(key)
+        if profile is None:
+            profile = self._profiles[key] = DomainProfile(key)
+            while len(self._profiles) > self.max_size:
+                self._profiles.popitem(last=False)
+        return profile
+
+    def _persist(self, profile: DomainProfile):
+        persist("profile", profile.key, profile.to_dict(), profile.updated_at + PROFILE_RETENTION)
+
+    def record_smtp(self, mx_host: str, domain: Optional[str], code: Optional[int], latency: float,
+                    timed_out: bool = False, error: Optional[str] = None):
+        """Update the MX profile and (when known) the recipient domain's profile"""
+        keys = [f"mx:{mx_host.lower()}"]
+        if domain:
+            keys.append(f"domain:{domain.lower()}")
+        for key in keys:
+            profile = self._get_or_create(key)
+            profile.observe(code, latency, timed_out, error)
+            self._persist(profile)
+
+    def record_latency(self, mx_host: str, kind: str, seconds: float):
+        """Banner / command latency of one MX host (see DomainProfile.observe_latency)"""
+        profile = self._get_or_create(f"mx:{mx_host.lower()}")
+        profile.observe_latency(kind, seconds)
+        self._persist(profile)
+
+    def timeouts(self, mx_host: str, default_connect: float, default_command: float) -> Tuple[float, float]:
+        """(connect, command) timeouts for an MX host: learned when possible, else the caller's defaults"""
+        profile = self.get(f"mx:{mx_host.lower()}")
+        if profile is None:
+            return default_connect, default_command
+        return profile.connect_timeout() or default_connect, profile.command_timeout() or default_command
+
+    def is_tarpit(self, mx_host: str) -> bool:
+        profile = self.get(f"mx:{mx_host.lower()}")
+        if profile is None:
+            return False
+        profile.decay(time.time())
+        return profile.is_tarpit
+
+    def record_catch_all(self, domain: str, is_catch_all: bool):
+        profile = self._get_or_create(f"domain:{domain.lower()}")
+        profile.observe_catch_all(is_catch_all)
+        self._persist(profile)
+
+    def advise(self, domain: str, mx_hosts: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Strategy hints for one domain:
+        skip_smtp / reason - probes to this domain or its primary MX practically never get an answer
+            (except one recovery probe every RECOVERY_PROBE_INTERVAL), or the primary MX is a tarpit
+        catch_all - fresh learned catch-all verdict (None = unknown)
+        connect_timeout / command_timeout - learned from the primary MX's latency (None = use the default)
+        """
+        domain_profile = self.get(f"domain:{domain.lower()}")
+        mx_profile = self.get(f"mx:{mx_hosts[0].lower()}") if mx_hosts else None
+        advice = {"skip_smtp": False, "reason": None, "catch_all": None,
+                  "connect_timeout": None, "command_timeout": None}
+
+        now = time.time()
+        unreachable = []
+        for profile in (domain_profile, mx_profile):
+            if profile is None:
+                continue
+            profile.decay(now)
+            if profile.samples >= MIN_SAMPLES and profile.unreachable_rate >= UNREACHABLE_RATE:
+                unreachable.append(profile)
+        if unreachable:
+            if all(p.probe_at and now - p.probe_at >= RECOVERY_PROBE_INTERVAL for p in unreachable):
+                for profile in unreachable:
+                    profile.probe_at = now  # This caller probes; everyone else keeps skipping
+            else:
+                for profile in unreachable:
+                    profile.probe_at = profile.probe_at or now
+                advice.update(skip_smtp=True, reason="mx_unreachable")
+
+        if domain_profile is not None:
+            advice["catch_all"] = domain_profile.known_catch_all()
+        if mx_profile is not None:
+            if mx_profile.is_tarpit:
+                advice.update(skip_smtp=True, reason="tarpit")
+            advice["connect_timeout"] = mx_profile.connect_timeout()
+            advice["command_timeout"] = mx_profile.command_timeout()
+        return advice
+
+    def load_persisted(self, store: PersistentCacheStore) -> int:
+        """Warm start from the store (decay catches up on the next update)"""
+        loaded = 0
+        for key, data, _ in store.load("profile"):
+            self._profiles[key] = DomainProfile.from_dict(key, data)
+            loaded += 1
+        return loaded
+
+    def get_stats(self, top: int = 20) -> Dict[str, Any]:
+        """Size plus the most-sampled profiles (for /api/metrics)"""
+        busiest = sorted(self._profiles.values(), key=lambda p: p.attempts, reverse=True)[:top]
+        return {"profiles": len(self._profiles), "top": {p.key: p.stats() for p in busiest}}
+
+
+# ======================= GLOBAL REGISTRY =======================
+
+domain_profiles = ProfileRegistry()
@@ -14,20 +14,27 @@ Key Optimizations:
 
 import asyncio
 import aiodns
-import aiosmtplib
 import time
 import random
 import string
 import re
-from typing import Dict, Any, List, Tuple, Optional, Set
+from typing import Callable, Dict, Any, List, Tuple, Optional, Set
 from dataclasses import dataclass, field
-from collections import defaultdict
+from collections import Counter, defaultdict
 from pathlib import Path
-from functools import lru_cache
+from functools import lru_cache, partial
 import hashlib
 
 # Import scoring module
 from .scoring import calculate_full_score, calculate_score, get_quality_grade
+from .smtp_client import ProbeSMTP, SMTPProbeError, SMTPConnectFailed, quote_address
+from .cache_store import PersistentCacheStore, persist
+from .cache_backend import get_cache_backend
+from .concurrency import get_limiter
+from .rate_limit import mx_rate_limiter
+from .domain_profile import domain_profiles
+from .circuit_breaker import smtp_breaker, REASON_PORT_25_BLOCKED, REASON_MX_CIRCUIT_OPEN
+from .greylist_queue import parse_retry_after
 
 # ======================= AGGRESSIVE CONFIGURATION =======================
 
@@ -40,7 +47,6 @@ SMTP_COMMAND_TIMEOUT_TRUSTED = 0.3  # 0.3s for trusted providers (skip anyway)
 
 # Concurrency - maximize parallelism
 MAX_CONCURRENT_VALIDATIONS = 200  # High concurrency
-MAX_CONCURRENT_SMTP_PER_DOMAIN = 5  # Limit per domain to avoid blocking
 BATCH_CHUNK_SIZE = 100  # Process in chunks
 
 # Connection pool settings
@@ -48,14 +54,22 @@ MAX_POOL_SIZE = 50  # Max connections to keep
 CONNECTION_TTL = 120  # 2 minutes
 
 # Cache TTL (longer = more cache hits)
-MX_CACHE_TTL = 600  # 10 minutes for MX records
+MX_CACHE_TTL = 600  # 10 minutes for MX records (when the answer carries no TTL)
+MX_CACHE_TTL_MIN = 60  # Floor for the record TTL
+MX_CACHE_TTL_MAX = 3600  # Ceiling for the record TTL
+MX_NEGATIVE_TTL = 300  # No MX / lookup failed
+MX_STALE_TTL = 600  # Expired MX answers are served this long while a background refresh runs
+MX_REFRESH_AHEAD = 0.1  # Hits in the last 10% of the TTL trigger an early refresh
 CATCHALL_CACHE_TTL = 600  # 10 minutes for catch-all status
+CATCH_ALL_FIRST_MIN_ADDRESSES = 2  # Bulk domains with this many addresses are probed for catch-all before any RCPT
 
 # ======================= GREYLISTING & RETRY CONFIG =======================
-# Greylisting handling - DISABLED FOR SPEED
+# Greylisting handling - no inline retries for speed; main.py hands 450/451 results
+# to the deferred re-check queue (validator/greylist_queue.py) instead
 GREYLISTING_RETRY_DELAY = 0.0  # No retry delay (disabled)
 GREYLISTING_MAX_RETRIES = 0  # NO retries for speed
 MAX_MX_HOSTS_TO_TRY = 1  # Try only 1 MX host for speed
+SMTP_PORT = 25
 
 # Greylisting response codes (temporary failures that may succeed on retry)
 GREYLISTING_CODES = {450, 451, 421}
@@ -137,46 +151,93 @@ ROLE_EMAILS = frozenset({
 # ======================= FAST CACHES =======================
 
 class FastCache:
-    """Ultra-fast in-memory cache with TTL"""
+    """Ultra-fast in-memory cache with TTL (and stale-while-revalidate reads)"""
     
-    __slots__ = ('_cache', '_max_size')
+    __slots__ = ('_cache', '_max_size', '_namespace')
     
-    def __init__(self, max_size: int = 10000):
-        self._cache: Dict[str, Tuple[Any, float]] = {}
+    def __init__(self, max_size: int = 10000, namespace: Optional[str] = None):
+        self._cache: Dict[str, Tuple[Any, float, float]] = {}  # key -> (value, expires_at, refresh_at)
         self._max_size = max_size
+        self._namespace = namespace  # Persistent store namespace (None = memory only)
     
     def get(self, key: str) -> Optional[Any]:
         """Get value if exists and not expired"""
         entry = self._cache.get(key)
         if entry:
-            value, expires_at = entry
+            value, expires_at, _ = entry
             if time.time() < expires_at:
                 return value
             # Expired - remove it
             del self._cache[key]
         return None
     
-    def set(self, key: str, value: Any, ttl: float):
-        """Set value with TTL"""
+    def get_stale(self, key: str, stale_ttl: float) -> Tuple[Optional[Any], bool]:
+        """
+        Stale-while-revalidate read.
+        Returns (value, needs_refresh): value may be up to stale_ttl past expiry;
+        needs_refresh is set once the entry is in its refresh-ahead window or stale.
+        """
+        entry = self._cache.get(key)
+        if not entry:
+            return None, False
+        value, expires_at, refresh_at = entry
+        now = time.time()
+        if now < expires_at + stale_ttl:
+            return value, now >= refresh_at
+        del self._cache[key]
+        return None, False
+    
+    def set(self, key: str, value: Any, ttl: float, refresh_ahead: float = 0.0):
+        """Set value with TTL (refresh_ahead: fraction of the TTL flagged for early refresh)"""
         # Simple eviction if too large
-        if len(self._cache) >= self._max_size:
+        if key not in self._cache and len(self._cache) >= self._max_size:
             # Remove oldest 10%
             to_remove = list(self._cache.keys())[:self._max_size // 10]
             for k in to_remove:
                 del self._cache[k]
         
-        self._cache[key] = (value, time.time() + ttl)
+        now = time.time()
+        self._cache[key] = (value, now + ttl, now + ttl * (1 - refresh_ahead))
+        if self._namespace:
+            persist(self._namespace, key, value, now + ttl)
+            get_cache_backend().publish(self._namespace, key, value, ttl)
+    
+    async def get_shared(self, key: str) -> Optional[Any]:
+        """Local miss: ask the shared cache backend (other workers' answers)"""
+        backend = get_cache_backend()
+        if not self._namespace or not backend.shared:
+            return None
+        hit = await backend.get(self._namespace, key)
+        if hit is None:
+            return None
+        value, expires_at = hit
+        self._cache[key] = (value, expires_at, expires_at)
+        return value
+    
+    def load_persisted(self, store: PersistentCacheStore) -> int:
+        """Warm start from the persistent store (unexpired entries only)"""
+        if not self._namespace:
+            return 0
+        rows = store.load(self._namespace)
+        for key, value, expires_at in rows[:self._max_size]:
+            self._cache[key] = (value, expires_at, expires_at)
+        return min(len(rows), self._max_size)
     
     def size(self) -> int:
         return len(self._cache)
 
 
 # Global caches (shared across all validators)
-_mx_cache = FastCache(max_size=50000)
-_catchall_cache = FastCache(max_size=10000)
+_mx_cache = FastCache(max_size=50000, namespace="fast_mx")
+_catchall_cache = FastCache(max_size=10000, namespace="fast_catchall")
 _domain_validity_cache = FastCache(max_size=50000)
 
 
+def load_persisted_caches(store: PersistentCacheStore) -> int:
+    """Warm the MX and catch-all caches from the persistent store"""
+    return _mx_cache.load_persisted(store) + _catchall_cache.load_persisted(store)
+
+
 # ======================= SYNTAX VALIDATION (COMPILED REGEX) =======================
 
 # Pre-compiled regex patterns for maximum speed
@@ -395,6 +456,7 @@ class FastDNSResolver:
     def __init__(self):
         self._resolver: Optional[aiodns.DNSResolver] = None
         self._initialized = False
+        self._refreshing: Dict[str, asyncio.Task] = {}  # Background MX refreshes by domain
     
     async def initialize(self):
         """Initialize the resolver"""
@@ -406,12 +468,27 @@ class FastDNSResolver:
             self._initialized = True
     
     async def resolve_mx(self, domain: str) -> List[str]:
-        """Resolve MX records with caching"""
+        """
+        Resolve MX records with caching
+        Hot or just-expired entries are returned immediately and refreshed in the background
+        """
         # Check cache first
-        cached = _mx_cache.get(domain)
+        cached, needs_refresh = _mx_cache.get_stale(domain, MX_STALE_TTL)
         if cached is not None:
+            if needs_refresh and domain not in self._refreshing:
+                task = asyncio.ensure_future(self._lookup_mx(domain))
+                self._refreshing[domain] = task
+                task.add_done_callback(lambda t: self._refreshing.pop(domain, None))
             return cached
         
+        shared = await _mx_cache.get_shared(domain)
+        if shared is not None:
+            return shared
+        
+        return await self._lookup_mx(domain)
+    
+    async def _lookup_mx(self, domain: str) -> List[str]:
+        """Query MX and cache the answer for its record TTL"""
         if not self._initialized:
             await self.initialize()
         
@@ -424,15 +501,18 @@ class FastDNSResolver:
             mx_hosts = sorted(result, key=lambda x: x.priority)
             mx_list = [str(mx.host).rstrip('.') for mx in mx_hosts]
             
-            # Cache result
-            _mx_cache.set(domain, mx_list, MX_CACHE_TTL)
+            # Cache result for the record TTL (clamped)
+            ttls = [mx.ttl for mx in result if getattr(mx, 'ttl', None) is not None]
+            ttl = max(MX_CACHE_TTL_MIN, min(MX_CACHE_TTL_MAX, min(ttls))) if ttls else MX_CACHE_TTL
+            _mx_cache.set(domain, mx_list, ttl, MX_REFRESH_AHEAD)
             return mx_list
             
-        except asyncio.TimeoutError:
-            _mx_cache.set(domain, [], MX_CACHE_TTL // 2)  # Cache negative result shorter
-            return []
         except Exception:
-            _mx_cache.set(domain, [], MX_CACHE_TTL // 2)
+            stale, _ = _mx_cache.get_stale(domain, MX_STALE_TTL)
+            if stale:
+                # Failed refresh - keep serving the last good answer
+                return stale
+            _mx_cache.set(domain, [], MX_NEGATIVE_TTL)  # Cache negative result shorter
             return []
     
     async def resolve_mx_batch(self, domains: List[str]) -> Dict[str, List[str]]:
@@ -445,9 +525,9 @@ class FastDNSResolver:
         results = {}
         
         for domain in domains:
-            cached = _mx_cache.get(domain)
+            cached, _ = _mx_cache.get_stale(domain, MX_STALE_TTL)
             if cached is not None:
-                results[domain] = cached
+                results[domain] = await self.resolve_mx(domain)
             else:
                 uncached.append(domain)
         
@@ -476,11 +556,6 @@ class FastSMTPVerifier:
     4. Improved catch-all detection
     """
     
-    def __init__(self):
-        self._domain_semaphores: Dict[str, asyncio.Semaphore] = defaultdict(
-            lambda: asyncio.Semaphore(MAX_CONCURRENT_SMTP_PER_DOMAIN)
-        )
-    
     async def verify_smtp(
         self, 
         email: str, 
@@ -496,82 +571,122 @@ class FastSMTPVerifier:
         - Tries multiple MX hosts if first fails
         - Retries on greylisting (450/451) responses
         - Enhanced response code interpretation
+        - Per-MX connect / command timeouts learned from the host's latency; tarpits are skipped
         
         Returns: {"valid": bool, "status": str, "code": int, "greylisted": bool}
         """
         if not mx_hosts:
             return {"valid": False, "status": "no_mx", "code": 0, "greylisted": False}
         
+        # Circuit open (port 25 blocked / MX refusing connects): answer now instead of waiting out the connect timeout
+        breaker_reason = smtp_breaker.check(mx_hosts[0])
+        if breaker_reason:
+            return {"valid": False, "status": breaker_reason, "code": 0, "greylisted": False}
+        
         # Use shorter timeouts for trusted providers
-        connect_timeout = SMTP_CONNECT_TIMEOUT_TRUSTED if is_trusted else SMTP_CONNECT_TIMEOUT
-        command_timeout = SMTP_COMMAND_TIMEOUT_TRUSTED if is_trusted else SMTP_COMMAND_TIMEOUT
-        
-        # Rate limit per domain
-        async with self._domain_semaphores[domain]:
-            # Try multiple MX hosts (up to MAX_MX_HOSTS_TO_TRY)
-            hosts_to_try = mx_hosts[:MAX_MX_HOSTS_TO_TRY]
-            last_result = None
+        default_connect = SMTP_CONNECT_TIMEOUT_TRUSTED if is_trusted else SMTP_CONNECT_TIMEOUT
+        default_command = SMTP_COMMAND_TIMEOUT_TRUSTED if is_trusted else SMTP_COMMAND_TIMEOUT
+        
+        # Concurrency is limited per MX host (adaptive) inside _verify_single_mx
+        # Try multiple MX hosts (up to MAX_MX_HOSTS_TO_TRY)
+        hosts_to_try = mx_hosts[:MAX_MX_HOSTS_TO_TRY]
+        last_result = None
+        
+        for mx_host in hosts_to_try:
+            if domain_profiles.is_tarpit(mx_host):
+                last_result = {"valid": False, "status": "tarpit", "code": 0, "greylisted": False}
+                continue
+            connect_timeout, command_timeout = (
+                (default_connect, default_command) if is_trusted
+                else domain_profiles.timeouts(mx_host, default_connect, default_command)
+            )
+            result = await self._verify_single_mx(
+                email, mx_host, connect_timeout, command_timeout
+            )
+            last_result = result
             
-            for mx_host in hosts_to_try:
-                result = await self._verify_single_mx(
-                    email, mx_host, connect_timeout, command_timeout
+            # If we got a definitive answer, return it
+            if result["code"] in VALID_CODES:
+                return result
+            
+            # Definitive rejection - no need to try other MX hosts
+            if result["code"] in [550, 551, 553, 554]:
+                return result
+            
+            # Greylisting detected - handle with retry
+            if result["code"] in GREYLISTING_CODES and retry_greylisting:
+                # Wait and retry once
+                await asyncio.sleep(GREYLISTING_RETRY_DELAY)
+                retry_result = await self._verify_single_mx(
+                    email, mx_host, connect_timeout * 1.5, command_timeout * 1.5
                 )
-                last_result = result
                 
-                # If we got a definitive answer, return it
-                if result["code"] in VALID_CODES:
-                    return result
+                if retry_result["code"] in VALID_CODES:
+                    retry_result["greylisted"] = True
+                    return retry_result
                 
-                # Definitive rejection - no need to try other MX hosts
-                if result["code"] in [550, 551, 553, 554]:
-                    return result
+                # If retry still fails with greylisting, mark as unknown
+                if retry_result["code"] in GREYLISTING_CODES:
+                    return {
+                        "valid": False, 
+                        "status": "greylisted", 
+                        "code": retry_result["code"],
+                        "greylisted": True
+                    }
                 
-                # Greylisting detected - handle with retry
-                if result["code"] in GREYLISTING_CODES and retry_greylisting:
-                    # Wait and retry once
-                    await asyncio.sleep(GREYLISTING_RETRY_DELAY)
-                    retry_result = await self._verify_single_mx(
-                        email, mx_host, connect_timeout * 1.5, command_timeout * 1.5
-                    )
-                    
-                    if retry_result["code"] in VALID_CODES:
-                        retry_result["greylisted"] = True
-                        return retry_result
-                    
-                    # If retry still fails with greylisting, mark as unknown
-                    if retry_result["code"] in GREYLISTING_CODES:
-                        return {
-                            "valid": False, 
-                            "status": "greylisted", 
-                            "code": retry_result["code"],
-                            "greylisted": True
-                        }
-                    
-                    last_result = retry_result
-                
-                # Connection failed - try next MX host
-                if result["status"] in ["connect_timeout", "connect_failed", "error"]:
-                    continue
-                
-                # Got a valid response (even if negative), return it
-                if result["code"] > 0:
-                    return result
+                last_result = retry_result
+            
+            # Connection failed - try next MX host
+            if result["status"] in ["connect_timeout", "connect_failed", "error"]:
+                continue
             
-            # Return last result if we exhausted all MX hosts
-            return last_result or {"valid": False, "status": "all_mx_failed", "code": 0, "greylisted": False}
+            # Got a valid response (even if negative), return it
+            if result["code"] > 0:
+                return result
+        
+        # Return last result if we exhausted all MX hosts
+        return last_result or {"valid": False, "status": "all_mx_failed", "code": 0, "greylisted": False}
     
     async def _verify_single_mx(
         self, 
         email: str, 
         mx_host: str, 
         connect_timeout: float,
-        command_timeout: float
+        command_timeout: float,
+        probe_first: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Verify email against a single MX host."""
+        """
+        Verify email against a single MX host (within its RCPT rate budget and AIMD limiter slot).
+        probe_first: an extra recipient sent first in the same transaction (catch-all probe);
+        its reply code is returned as "probe_code".
+        """
+        await mx_rate_limiter.acquire(mx_host, 2 if probe_first else 1)
+        async with get_limiter(mx_host).slot() as slot:
+            result = await self._probe_single_mx(email, mx_host, connect_timeout, command_timeout, probe_first)
+            slot.code = result["code"]
+            slot.domain = email.rpartition("@")[2]
+            slot.error = result.get("error_detail") or (result["status"] if not result["code"] else None)
+            slot.round_trips = 5 if probe_first else 4  # Fresh session: connect, EHLO, MAIL, RCPT(s)
+            slot.timed_out = result["status"] in ("timeout", "connect_timeout")
+        if result["status"] in ("connect_timeout", "connect_failed"):
+            smtp_breaker.record_connect(mx_host, ok=False)
+        elif result["code"] or result["status"] == "timeout":
+            smtp_breaker.record_connect(mx_host, ok=True)  # Banner seen; a later command timed out or replied
+        return result
+    
+    async def _probe_single_mx(
+        self, 
+        email: str, 
+        mx_host: str, 
+        connect_timeout: float,
+        command_timeout: float,
+        probe_first: Optional[str] = None
+    ) -> Dict[str, Any]:
+        recipients = ([probe_first] if probe_first else []) + [email]
         try:
-            smtp = aiosmtplib.SMTP(
+            smtp = ProbeSMTP(
                 hostname=mx_host,
-                port=25,
+                port=SMTP_PORT,
                 timeout=connect_timeout,
             )
             
@@ -580,6 +695,9 @@ class FastSMTPVerifier:
                 smtp.connect(),
                 timeout=connect_timeout
             )
+            domain_profiles.record_latency(mx_host, "banner", smtp.banner_latency)
+            smtp.timeout = command_timeout
+            smtp.on_round_trip = partial(domain_profiles.record_latency, mx_host, "command")
             
             try:
                 # EHLO first (more modern), fallback to HELO
@@ -588,42 +706,57 @@ class FastSMTPVerifier:
                         smtp.ehlo(),
                         timeout=command_timeout
                     )
-                except Exception:
+                except SMTPProbeError:
                     await asyncio.wait_for(
                         smtp.helo(),
                         timeout=command_timeout
                     )
                 
-                # MAIL FROM
-                await asyncio.wait_for(
-                    smtp.mail('verify@mail-validator.com'),
-                    timeout=command_timeout
-                )
-                
-                # RCPT TO - the actual check
-                try:
-                    response = await asyncio.wait_for(
-                        smtp.rcpt(email),
+                if smtp.supports_extension("pipelining"):
+                    # MAIL FROM + RCPT TO in a single flush (one round trip)
+                    (mail_code, mail_message), *replies = await asyncio.wait_for(
+                        smtp.pipeline(
+                            [f"MAIL FROM:{quote_address('verify@mail-validator.com')}"]
+                            + [f"RCPT TO:{quote_address(r)}" for r in recipients]
+                        ),
                         timeout=command_timeout
                     )
-                    code = response[0]
-                    message = response[1] if len(response) > 1 else ""
-                except aiosmtplib.SMTPRecipientRefused as e:
-                    code = e.code
-                    message = str(e.message) if hasattr(e, 'message') else ""
+                    if mail_code != 250:
+                        raise SMTPProbeError(mail_code, mail_message)
+                else:
+                    # MAIL FROM
+                    await asyncio.wait_for(
+                        smtp.mail('verify@mail-validator.com'),
+                        timeout=command_timeout
+                    )
+                    
+                    # RCPT TO - the actual check (after the catch-all probe, if any)
+                    replies = []
+                    for recipient in recipients:
+                        replies.append(await asyncio.wait_for(
+                            smtp.rcpt(recipient),
+                            timeout=command_timeout
+                        ))
                 
                 # Close connection (fire-and-forget)
                 asyncio.create_task(self._close_smtp(smtp))
                 
-                return self._interpret_code(code, message)
+                code, message = replies[-1]
+                result = self._interpret_code(code, message)
+                if probe_first:
+                    result["probe_code"] = replies[0][0]
+                return result
                 
             except asyncio.TimeoutError:
                 asyncio.create_task(self._close_smtp(smtp))
                 return {"valid": False, "status": "timeout", "code": 0, "greylisted": False}
                 
         except asyncio.TimeoutError:
+            if smtp.tcp_connected:
+                # TCP up but no banner in time - tarpit signal for the MX profile
+                domain_profiles.record_latency(mx_host, "tarpit", connect_timeout)
             return {"valid": False, "status": "connect_timeout", "code": 0, "greylisted": False}
-        except aiosmtplib.SMTPConnectError:
+        except SMTPConnectFailed:
             return {"valid": False, "status": "connect_failed", "code": 0, "greylisted": False}
         except Exception as e:
             # Log the actual error for debugging
@@ -633,7 +766,7 @@ class FastSMTPVerifier:
             print(f"Traceback: {traceback.format_exc()}")
             return {"valid": False, "status": "error", "code": 0, "greylisted": False, "error_detail": error_details}
     
-    async def _close_smtp(self, smtp: aiosmtplib.SMTP):
+    async def _close_smtp(self, smtp: ProbeSMTP):
         """Close SMTP connection (fire-and-forget)"""
         try:
             await smtp.quit()
@@ -676,7 +809,8 @@ class FastSMTPVerifier:
         
         # Greylisting / temporary failure
         elif code in GREYLISTING_CODES:  # 450, 451, 421
-            return {"valid": False, "status": "temp_failure", "code": code, "greylisted": True}
+            return {"valid": False, "status": "temp_failure", "code": code, "greylisted": True,
+                    "retry_after": parse_retry_after(message)}
         
         # Rate limiting
         elif code == 452:
@@ -688,6 +822,36 @@ class FastSMTPVerifier:
         else:
             return {"valid": False, "status": f"code_{code}", "code": code, "greylisted": False}
     
+    async def verify_with_catch_all_probe(self, email: str, mx_hosts: List[str], domain: str) -> Tuple[Optional[bool], Dict[str, Any]]:
+        """
+        Catch-all probe and a real address in ONE session: MAIL FROM, RCPT <random>@domain, RCPT email.
+        Returns (is_catch_all - None when the probe got no definitive reply, SMTP result for email).
+        A definitive catch-all verdict is cached like check_catchall's.
+        """
+        if not mx_hosts:
+            return None, {"valid": False, "status": "no_mx", "code": 0, "greylisted": False}
+        breaker_reason = smtp_breaker.check(mx_hosts[0])
+        if breaker_reason:
+            return None, {"valid": False, "status": breaker_reason, "code": 0, "greylisted": False}
+        
+        fake_email = f"{''.join(random.choices(string.ascii_lowercase + string.digits, k=15))}@{domain}"
+        result = {"valid": False, "status": "all_mx_failed", "code": 0, "greylisted": False}
+        for mx_host in mx_hosts[:MAX_MX_HOSTS_TO_TRY]:
+            if domain_profiles.is_tarpit(mx_host):
+                result = {"valid": False, "status": "tarpit", "code": 0, "greylisted": False}
+                continue
+            connect_timeout, command_timeout = domain_profiles.timeouts(mx_host, SMTP_CONNECT_TIMEOUT, SMTP_COMMAND_TIMEOUT)
+            result = await self._verify_single_mx(email, mx_host, connect_timeout, command_timeout, probe_first=fake_email)
+            if result["status"] not in ("connect_timeout", "connect_failed", "error"):
+                break
+        
+        probe_code = result.pop("probe_code", 0)
+        is_catchall = True if probe_code in VALID_CODES else False if probe_code in (550, 551, 553) else None
+        if is_catchall is not None:
+            _catchall_cache.set(domain, is_catchall, CATCHALL_CACHE_TTL)
+            domain_profiles.record_catch_all(domain, is_catchall)
+        return is_catchall, result
+    
     async def check_catchall(self, domain: str, mx_hosts: List[str]) -> bool:
         """
         Enhanced catch-all detection using multiple random test emails.
@@ -695,6 +859,8 @@ class FastSMTPVerifier:
         """
         # Check cache
         cached = _catchall_cache.get(domain)
+        if cached is None:
+            cached = await _catchall_cache.get_shared(domain)
         if cached is not None:
             return cached
         
@@ -722,6 +888,7 @@ class FastSMTPVerifier:
         
         # Cache result
         _catchall_cache.set(domain, is_catchall, CATCHALL_CACHE_TTL)
+        domain_profiles.record_catch_all(domain, is_catchall)
         
         return is_catchall
 
@@ -753,13 +920,13 @@ class FastEmailValidator:
             self._initialized = True
             print(f"FastEmailValidator initialized. Cache size: {_mx_cache.size()}")
     
-    async def validate_email(self, email: str) -> Dict[str, Any]:
+    async def validate_email(self, email: str, smtp_result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Validate a single email - ultra fast"""
         async with self._semaphore:
-            return await self._validate_single(email)
+            return await self._validate_single(email, smtp_result)
     
-    async def _validate_single(self, email: str) -> Dict[str, Any]:
-        """Internal validation logic"""
+    async def _validate_single(self, email: str, smtp_result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Internal validation logic (smtp_result: RCPT reply already probed by the bulk catch-all pass)"""
         # Clean email
         email = email.strip().lower()
         
@@ -853,10 +1020,42 @@ class FastEmailValidator:
             result["smtp"] = "Skipped (Free Provider)"
             return calculate_full_score(result)
         
+        # Step 4b: Learned profile - MX that never answers probes (port 25 blocked, tarpit)
+        advice = domain_profiles.advise(domain, mx_hosts)
+        if advice["skip_smtp"]:
+            result["status"] = "unknown"
+            result["is_unknown"] = True
+            result["reason"] = "SMTP verification skipped (mail server does not answer probes)"
+            result["smtp_status"] = f"skipped_{advice['reason']}"
+            result["smtp_valid"] = "Skipped"
+            result["smtp"] = "Unknown"
+            return calculate_full_score(result)
+        
+        # Step 5a: Known catch-all domain - every RCPT would be accepted, skip the probe
+        known_catch_all = _catchall_cache.get(domain)
+        if known_catch_all is None:
+            known_catch_all = advice["catch_all"]
+        if known_catch_all:
+            result["smtp_status"] = "catch_all"
+            result["smtp_code"] = 250
+            result["smtp_valid"] = "Valid"
+            result["smtp"] = "Valid"
+            result["is_valid"] = True
+            result["is_deliverable"] = True
+            result["is_catch_all"] = True
+            result["catch_all"] = "Yes"
+            result["status"] = "catch_all"
+            result["reason"] = "Domain accepts all emails (catch-all)"
+            result["is_safe_to_send"] = False
+            return calculate_full_score(result)
+        
         # Step 5: SMTP verification ONLY for non-trusted domains
-        smtp_result = await self._smtp.verify_smtp(email, mx_hosts, domain, is_trusted=False, retry_greylisting=False)
+        if smtp_result is None:
+            smtp_result = await self._smtp.verify_smtp(email, mx_hosts, domain, is_trusted=False, retry_greylisting=False)
         result["smtp_status"] = smtp_result["status"]
         result["smtp_code"] = smtp_result.get("code", 0)
+        if smtp_result.get("retry_after"):
+            result["retry_after"] = smtp_result["retry_after"]  # Server's greylisting delay, for the re-check queue
         
         # Interpret SMTP result
         code = smtp_result.get("code", 0)
@@ -911,6 +1110,16 @@ class FastEmailValidator:
             result["reason"] = "Role-based email (admin@, info@, etc.)" if is_role else "Valid email address"
             return calculate_full_score(result)
         
+        # SMTP short-circuited by the circuit breaker - unknown, with the cause
+        if status in (REASON_PORT_25_BLOCKED, REASON_MX_CIRCUIT_OPEN):
+            result["status"] = "unknown"
+            result["is_unknown"] = True
+            result["reason"] = ("SMTP skipped: outbound port 25 is blocked on this host" if status == REASON_PORT_25_BLOCKED
+                                else "SMTP skipped: mail server is refusing connections")
+            result["smtp_valid"] = "Skipped"
+            result["smtp"] = "Unknown"
+            return calculate_full_score(result)
+        
         # SMTP failed or inconclusive - mark as unknown
         if code in [450, 451] or "timeout" in status or "unavailable" in status or "connect" in status or "error" in status:
             # For greylisting (450, 451) - mark as unknown since we can't verify (Reoon lowercase)
@@ -974,7 +1183,8 @@ class FastEmailValidator:
         self, 
         emails: List[str], 
         batch_id: str = None,
-        check_catchall: bool = False
+        check_catchall: bool = False,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None
     ) -> List[Dict[str, Any]]:
         """
         Validate multiple emails with maximum speed.
@@ -984,6 +1194,8 @@ class FastEmailValidator:
         2. Group by domain for efficiency
         3. Skip SMTP for trusted providers
         4. Process in parallel chunks
+        
+        on_result is called with each result as soon as it is ready.
         """
         if not self._initialized:
             await self.initialize()
@@ -1002,27 +1214,47 @@ class FastEmailValidator:
                 domains.add(email.split('@')[1])
         
         # Pre-resolve ALL MX records in parallel (big speed boost)
-        await self._dns.resolve_mx_batch(list(domains))
+        mx_by_domain = await self._dns.resolve_mx_batch(list(domains))
         
-        # Validate all emails in parallel
-        tasks = [self.validate_email(email) for email in unique_emails]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # Catch-all first: a domain with several addresses gets the catch-all probe in the same
+        # transaction as its first real RCPT, so a catch-all domain costs no further RCPTs
+        per_domain = Counter(email.split('@')[1] for email in unique_emails if '@' in email)
+        first_by_domain: Dict[str, str] = {}
+        for email in unique_emails:
+            first_by_domain.setdefault(email.partition('@')[2], email)
+        catchall_targets = [
+            d for d, n in per_domain.items()
+            if n >= CATCH_ALL_FIRST_MIN_ADDRESSES and mx_by_domain.get(d) and _catchall_cache.get(d) is None
+            and not is_trusted_provider(d) and not check_disposable_fast(d) and not check_blacklist_fast(d)
+        ]
+        probes = await asyncio.gather(
+            *[self._smtp.verify_with_catch_all_probe(first_by_domain[d], mx_by_domain[d], d) for d in catchall_targets],
+            return_exceptions=True
+        )
+        probed = {
+            first_by_domain[d]: probe[1]
+            for d, probe in zip(catchall_targets, probes) if not isinstance(probe, BaseException)
+        }
         
-        # Process results
-        final_results = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                final_results.append({
-                    "email": unique_emails[i],
-                    "status": "Error",
-                    "reason": str(result),
-                    "is_valid": False,
-                    **self._init_result(unique_emails[i])
-                })
-            else:
+        async def validate_one(email: str) -> Dict[str, Any]:
+            try:
+                result = await self.validate_email(email, probed.get(email))
                 if batch_id:
                     result["batch_id"] = batch_id
-                final_results.append(result)
+            except Exception as e:
+                result = {
+                    "email": email,
+                    "status": "Error",
+                    "reason": str(e),
+                    "is_valid": False,
+                    **self._init_result(email)
+                }
+            if on_result:
+                on_result(result)
+            return result
+        
+        # Validate all emails in parallel
+        final_results = await asyncio.gather(*[validate_one(email) for email in unique_emails])
         
         elapsed = time.time() - start_time
         rate = len(unique_emails) / max(elapsed, 0.001)
@@ -1065,10 +1297,11 @@ async def validate_email_fast(email: str) -> Dict[str, Any]:
     return await validator.validate_email(email)
 
 
-async def validate_bulk_fast(emails: List[str], batch_id: str = None) -> List[Dict[str, Any]]:
+async def validate_bulk_fast(emails: List[str], batch_id: str = None,
+                             on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
     """Validate multiple emails (convenience function)"""
     validator = await get_fast_validator()
-    return await validator.validate_bulk(emails, batch_id)
+    return await validator.validate_bulk(emails, batch_id, on_result=on_result)
 
 
 # ======================= BACKWARD COMPATIBILITY =======================
@@ -0,0 +1,236 @@
+"""
+Greylist Re-check Queue
+Addresses whose RCPT got a temporary 450/451 are re-checked in the background
+after the server's suggested delay (exponential default otherwise) instead of
+staying "unknown". Pending checks live in a delay queue persisted through the
+cache store (namespace "greylist"), so they survive a restart; workers sharing
+the store claim each due check before running it, so it runs once. Each final
+verdict goes to a callback (main.py updates the stored record, task and CSV).
+"""
+import asyncio
+import heapq
+import os
+import re
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .cache_store import PersistentCacheStore, persist
+
+GREYLIST_CODES = {450, 451}
+
+# Delay before a re-check: the server's suggestion (clamped), else DEFAULT * 2^attempt
+GREYLIST_DEFAULT_DELAY = 300.0
+GREYLIST_MIN_DELAY = 60.0
+GREYLIST_MAX_DELAY = 3600.0
+GREYLIST_MAX_ATTEMPTS = 4
+
+GREYLIST_CONCURRENCY = 20  # Re-checks running at once
+GREYLIST_MAX_PENDING = 100000
+GREYLIST_RETENTION = 86400  # Persisted entries are dropped this long after they were due
+GREYLIST_CLAIM_TTL = 300.0  # A claimed re-check whose worker went silent this long is up for grabs again
+
+# "try again in 300 seconds", "greylisted for 5 minutes", "retry after 60s"
+_RETRY_AFTER = re.compile(r"\b(\d+)\s*(seconds?|secs?|s|minutes?|mins?|m)\b", re.IGNORECASE)
+
+RecheckFn = Callable[[str], Awaitable[Dict[str, Any]]]
+VerdictFn = Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[None]]
+
+
+def parse_retry_after(message: Optional[str]) -> Optional[float]:
+    """Delay (seconds) suggested in a greylisting reply, if any"""
+    if not message:
+        return None
+    match = _RETRY_AFTER.search(message)
+    if not match:
+        return None
+    seconds = float(match.group(1))
+    if match.group(2).lower().startswith("m"):
+        seconds *= 60
+    return seconds
+
+
+def is_greylisted(result: Dict[str, Any]) -> bool:
+    """Temporary RCPT reply - fast/strict results carry smtp_code, async results checks.smtp"""
+    if result.get("smtp_code") in GREYLIST_CODES:
+        return True
+    return result.get("checks", {}).get("smtp") == "temporary"
+
+
+class GreylistQueue:
+    """
+    Delay queue (heap ordered by due time) of greylisted addresses.
+    schedule() never blocks the caller; the runner task re-checks due entries
+    through `recheck` and hands final verdicts to `on_verdict(context, result)`.
+    """
+
+    def __init__(self, concurrency: int = GREYLIST_CONCURRENCY, max_pending: int = GREYLIST_MAX_PENDING):
+        self.max_pending = max_pending
+        self.recheck: Optional[RecheckFn] = None
+        self.on_verdict: Optional[VerdictFn] = None
+        self._heap: List[Tuple[float, str]] = []
+        self._items: Dict[str, Dict[str, Any]] = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._wakeup = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+        self._store: Optional[PersistentCacheStore] = None
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"  # Claim holder name of this worker
+        self.scheduled = 0
+        self.rechecks = 0
+        self.resolved = 0
+        self.gave_up = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @staticmethod
+    def delay_for(attempt: int, suggested: Optional[float] = None) -> float:
+        delay = suggested if suggested else GREYLIST_DEFAULT_DELAY * (2 ** attempt)
+        return min(GREYLIST_MAX_DELAY, max(GREYLIST_MIN_DELAY, delay))
+
+    def schedule(self, email: str, result: Dict[str, Any], context: Dict[str, Any], attempt: int = 0) -> bool:
+        """
+        Queue a re-check of a greylisted result. `context` (task id, user id, ...) is
+        passed back with the final verdict. Returns False when the queue is full.
+        """
+        key = f"{context.get('task_id') or context.get('user_id')}:{email.lower()}"
+        if key not in self._items and len(self._items) >= self.max_pending:
+            return False
+        suggested = result.get("retry_after") or parse_retry_after(result.get("smtp_message"))
+        item = {
+            "email": email,
+            "attempt": attempt,
+            "due_at": time.time() + self.delay_for(attempt, suggested),
+            "context": context
+        }
+        self._add(key, item)
+        self.scheduled += 1
+        return True
+
+    def _add(self, key: str, item: Dict[str, Any]):
+        self._items[key] = item
+        heapq.heappush(self._heap, (item["due_at"], key))
+        persist("greylist", key, item, item["due_at"] + GREYLIST_RETENTION)
+        self._wakeup.set()
+
+    def _remove(self, key: str):
+        self._items.pop(key, None)
+        persist("greylist", key, None, 0)  # Expired row - purged on the next flush
+
+    def load_persisted(self, store: PersistentCacheStore) -> int:
+        """Re-queue checks pending at shutdown (overdue ones run right away, once claimed)"""
+        self._store = store
+        loaded = 0
+        for key, item, _ in store.load("greylist"):
+            if item:
+                self._items[key] = item
+                heapq.heappush(self._heap, (item["due_at"], key))
+                loaded += 1
+        return loaded
+
+    async def start(self, recheck: RecheckFn, on_verdict: VerdictFn):
+        self.recheck = recheck
+        self.on_verdict = on_verdict
+        if self._store is None:
+            print("WARNING: [GREYLIST] No cache store (VALIDATOR_CACHE_PATH is empty) - "
+                  "pending re-checks are kept in memory only and are lost on restart")
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                due_at, key = heapq.heappop(self._heap)
+                item = self._items.get(key)
+                if item is None or item["due_at"] != due_at:
+                    continue  # Superseded by a later schedule() of the same address
+                task = asyncio.create_task(self._recheck(key, item))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self, key: str, item: Dict[str, Any]) -> bool:
+        """
+        Take this scheduled check (one key per attempt) in the shared store. Another worker's live
+        claim: look again once it could have lapsed; a settled one: that worker already handled it.
+        """
+        if self._store is None:
+            return True
+        instance = item.setdefault("instance", f"{key}@{item['due_at']}")
+        holder = await asyncio.to_thread(
+            self._store.claim, "greylist", instance, self.owner, time.time() + GREYLIST_CLAIM_TTL
+        )
+        if holder == self.owner:
+            return True
+        if holder:
+            retry = dict(item, due_at=time.time() + GREYLIST_CLAIM_TTL)
+            self._items[key] = retry
+            heapq.heappush(self._heap, (retry["due_at"], key))
+            self._wakeup.set()
+        else:
+            self._items.pop(key, None)
+        return False
+
+    async def _settle(self, item: Dict[str, Any]):
+        if self._store is not None:
+            await asyncio.to_thread(self._store.settle, "greylist", item["instance"], time.time() + GREYLIST_RETENTION)
+
+    async def _recheck(self, key: str, item: Dict[str, Any]):
+        if not await self._claim(key, item):
+            return
+        async with self._semaphore:
+            self.rechecks += 1
+            try:
+                result = await self.recheck(item["email"])
+            except Exception as e:
+                print(f"[GREYLIST] Re-check of {item['email']} failed: {e}")
+                result = None
+
+        if (result is None or is_greylisted(result)) and item["attempt"] + 1 < GREYLIST_MAX_ATTEMPTS:
+            suggested = result and (result.get("retry_after") or parse_retry_after(result.get("smtp_message")))
+            attempt = item["attempt"] + 1
+            next_item = {k: v for k, v in item.items() if k != "instance"}
+            self._add(key, dict(next_item, attempt=attempt, due_at=time.time() + self.delay_for(attempt, suggested)))
+            await self._settle(item)
+            return
+
+        self._remove(key)
+        await self._settle(item)
+        if result is None or is_greylisted(result):
+            self.gave_up += 1  # Stays "unknown"
+            return
+        self.resolved += 1
+        try:
+            await self.on_verdict(item["context"], result)
+        except Exception as e:
+            print(f"[GREYLIST] Storing verdict for {item['email']} failed: {e}")
+
+    async def close(self):
+        """Stop the runner; unfinished checks stay persisted for the next start"""
+        tasks = ([self._runner] if self._runner else []) + list(self._running)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._runner = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._items),
+            "next_due_in": round(self._heap[0][0] - time.time(), 1) if self._heap else None,
+            "scheduled": self.scheduled,
+            "rechecks": self.rechecks,
+            "resolved": self.resolved,
+            "gave_up": self.gave_up
+        }
+
+
+# ======================= GLOBAL QUEUE =======================
+
+greylist_queue = GreylistQueue()
@@ -0,0 +1,127 @@
+"""
+Pending Deep Checks
+Two-tier single-email validation: the instant verdict is returned to the client
+while SMTP & catch-all finish in a background task registered here under a
+check id. Clients fetch the final result or wait for it (long poll / SSE);
+finished checks are kept for PENDING_CHECK_TTL seconds.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+from uuid import uuid4
+
+PENDING_CHECK_TTL = 600.0
+MAX_PENDING_CHECKS = 10000
+
+DoneFn = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class PendingCheck:
+    """One background deep verification"""
+
+    __slots__ = ("check_id", "owner", "preliminary", "result", "failed", "created_at", "finished_at", "done", "task")
+
+    def __init__(self, check_id: str, owner: Any, preliminary: Dict[str, Any]):
+        self.check_id = check_id
+        self.owner = owner
+        self.preliminary = preliminary
+        self.result: Optional[Dict[str, Any]] = None
+        self.failed = False
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.done = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> bool:
+        return not self.done.is_set()
+
+    def current(self) -> Dict[str, Any]:
+        """Final result once known, else the instant verdict"""
+        return self.result if self.result is not None else self.preliminary
+
+
+class PendingChecks:
+    """Registry of in-flight and recently finished deep checks (bounded, oldest finished dropped first)"""
+
+    def __init__(self, ttl: float = PENDING_CHECK_TTL, max_checks: int = MAX_PENDING_CHECKS):
+        self.ttl = ttl
+        self.max_checks = max_checks
+        self._checks: "OrderedDict[str, PendingCheck]" = OrderedDict()
+        self.submitted = 0
+        self.completed = 0
+        self.failures = 0
+
+    def submit(self, preliminary: Dict[str, Any], deep: Awaitable[Dict[str, Any]], owner: Any = None,
+               on_done: Optional[DoneFn] = None) -> str:
+        """Run `deep` in the background; returns the check id to fetch / subscribe with"""
+        self._prune()
+        check = PendingCheck(uuid4().hex, owner, preliminary)
+        check.task = asyncio.create_task(self._run(check, deep, on_done))
+        self._checks[check.check_id] = check
+        self.submitted += 1
+        return check.check_id
+
+    async def _run(self, check: PendingCheck, deep: Awaitable[Dict[str, Any]], on_done: Optional[DoneFn]):
+        try:
+            check.result = await deep
+            self.completed += 1
+        except Exception as e:
+            print(f"[PENDING CHECK] {check.check_id} failed: {e}")
+            check.failed = True
+            self.failures += 1
+        finally:
+            check.finished_at = time.time()
+            check.done.set()
+        if on_done and check.result is not None:
+            try:
+                await on_done(check.result)
+            except Exception as e:
+                print(f"[PENDING CHECK] Storing result of {check.check_id} failed: {e}")
+
+    def get(self, check_id: str) -> Optional[PendingCheck]:
+        check = self._checks.get(check_id)
+        if check and check.finished_at and time.time() - check.finished_at > self.ttl:
+            del self._checks[check_id]
+            return None
+        return check
+
+    async def wait(self, check: PendingCheck, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for the final result; True once it is there"""
+        try:
+            await asyncio.wait_for(check.done.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return not check.pending
+
+    def _prune(self):
+        now = time.time()
+        for check_id in [cid for cid, c in self._checks.items() if c.finished_at and now - c.finished_at > self.ttl]:
+            del self._checks[check_id]
+        while len(self._checks) >= self.max_checks:
+            oldest = next((cid for cid, c in self._checks.items() if not c.pending), None)
+            if oldest is None:
+                break  # Everything still running - never drop an unfinished check
+            del self._checks[oldest]
+
+    async def close(self):
+        """Cancel running checks (app shutdown)"""
+        tasks = [c.task for c in self._checks.values() if c.task and not c.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "tracked": len(self._checks),
+            "running": sum(1 for c in self._checks.values() if c.pending),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failures
+        }
+
+
+# ======================= GLOBAL REGISTRY =======================
+
+pending_checks = PendingChecks()
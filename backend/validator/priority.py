@@ -0,0 +1,265 @@
+"""
+Priority Lanes & Fair Share
+Interactive single checks and bulk jobs share the validation worker and SMTP
+session slots. Each slot pool is a PrioritySemaphore: waiters are served
+interactive-first and part of the capacity is reserved for the interactive
+lane, so one large upload cannot queue a single check behind its probes.
+Within a lane, waiters are grouped by share (one per user) and dequeued by
+weighted deficit round-robin, so a 200k-row upload and a 500-row upload
+advance side by side instead of in arrival order.
+Lane and share follow the request through context variables (inherited by the
+tasks it spawns); queue waits are tracked per lane and per job.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional
+
+LANE_INTERACTIVE = "interactive"
+LANE_BULK = "bulk"
+LANES = (LANE_INTERACTIVE, LANE_BULK)  # Priority order
+
+# Slots per round-robin turn by subscription plan name, e.g. "pro=2,enterprise=4" (others get 1)
+PLAN_WEIGHTS = {
+    name.strip().lower(): float(weight)
+    for name, _, weight in (item.partition("=") for item in os.getenv("VALIDATOR_PLAN_WEIGHTS", "").split(","))
+    if name.strip() and weight
+}
+DEFAULT_WEIGHT = 1.0
+MIN_WEIGHT = 0.1
+
+MAX_JOB_STATS = 1000  # Jobs whose queue times are kept (LRU)
+
+
+class Share:
+    """Who a slot request is for: fair-share key (user), job for metrics, DRR weight"""
+
+    __slots__ = ("key", "job_id", "weight")
+
+    def __init__(self, key: str, job_id: Optional[str] = None, weight: float = DEFAULT_WEIGHT):
+        self.key = key
+        self.job_id = job_id
+        self.weight = max(MIN_WEIGHT, weight)
+
+
+current_lane: ContextVar[str] = ContextVar("validation_lane", default=LANE_INTERACTIVE)
+current_share: ContextVar[Optional[Share]] = ContextVar("validation_share", default=None)
+
+
+@contextmanager
+def priority_lane(lane: str):
+    """Run the enclosed validation (and the tasks it starts) in `lane`"""
+    token = current_lane.set(lane)
+    try:
+        yield
+    finally:
+        current_lane.reset(token)
+
+
+@contextmanager
+def fair_share(key: str, job_id: Optional[str] = None, weight: float = DEFAULT_WEIGHT):
+    """Queue the enclosed validation's slot requests under share `key` with DRR `weight`"""
+    token = current_share.set(Share(key, job_id, weight))
+    try:
+        yield
+    finally:
+        current_share.reset(token)
+
+
+def plan_weight(plan_name: Optional[str]) -> float:
+    return PLAN_WEIGHTS.get((plan_name or "").lower(), DEFAULT_WEIGHT)
+
+
+class WaitStats:
+    """Queue waits of one lane or job"""
+
+    __slots__ = ("acquired", "queued", "total_wait", "max_wait")
+
+    def __init__(self):
+        self.acquired = 0
+        self.queued = 0  # Acquisitions that had to wait
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float):
+        self.acquired += 1
+        if wait > 0:
+            self.queued += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "acquired": self.acquired,
+            "queued": self.queued,
+            "avg_wait_ms": round(self.total_wait / self.queued * 1000, 1) if self.queued else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1)
+        }
+
+
+class FairQueue:
+    """
+    Waiters grouped by share key, dequeued by deficit round-robin: each turn a share's
+    deficit grows by its weight and it is served one waiter per whole unit.
+    Waiters without a share form one FIFO group.
+    """
+
+    def __init__(self):
+        self._queues: "OrderedDict[Optional[str], Deque[asyncio.Future]]" = OrderedDict()
+        self._deficit: Dict[Optional[str], float] = {}
+        self._weight: Dict[Optional[str], float] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, waiter: asyncio.Future, share: Optional[Share]):
+        key = share.key if share else None
+        if key not in self._queues:
+            self._queues[key] = deque()
+            self._deficit[key] = 0.0
+        self._weight[key] = share.weight if share else DEFAULT_WEIGHT
+        self._queues[key].append(waiter)
+        self._size += 1
+
+    def remove(self, waiter: asyncio.Future, share: Optional[Share]):
+        key = share.key if share else None
+        queue = self._queues.get(key)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self._size -= 1
+            if not queue:
+                self._drop(key)
+
+    def popleft(self) -> asyncio.Future:
+        while True:
+            key, queue = next(iter(self._queues.items()))
+            if self._deficit[key] < 1:
+                self._deficit[key] += self._weight[key]
+                self._queues.move_to_end(key)
+                continue
+            self._deficit[key] -= 1
+            self._size -= 1
+            waiter = queue.popleft()
+            if not queue:
+                self._drop(key)
+            return waiter
+
+    def _drop(self, key: Optional[str]):
+        # An idle share does not bank deficit for later
+        del self._queues[key], self._deficit[key], self._weight[key]
+
+    def shares(self) -> Dict[str, int]:
+        return {str(key): len(queue) for key, queue in self._queues.items()}
+
+
+class PrioritySemaphore:
+    """
+    Semaphore with lanes: `reserved` of the `limit` slots can only be taken by the
+    interactive lane, and freed slots go to waiting interactive callers first,
+    then round-robin across bulk shares.
+    Use `async with sem.slot():` (lane and share come from the context).
+    """
+
+    def __init__(self, name: str, limit: int, reserved: int = 0):
+        self.name = name
+        self.limit = limit
+        self.lane_limits = {LANE_INTERACTIVE: limit, LANE_BULK: limit - reserved}
+        self.in_use = {lane: 0 for lane in LANES}
+        self.lane_stats = {lane: WaitStats() for lane in LANES}
+        self._waiters: Dict[str, FairQueue] = {lane: FairQueue() for lane in LANES}
+        _semaphores.append(self)
+
+    def _can_take(self, lane: str) -> bool:
+        return sum(self.in_use.values()) < self.limit and self.in_use[lane] < self.lane_limits[lane]
+
+    async def acquire(self, lane: str):
+        start = time.time()
+        if self._can_take(lane) and not any(self._waiters[l] for l in LANES[:LANES.index(lane) + 1]):
+            self.in_use[lane] += 1
+            self.lane_stats[lane].record(0.0)
+            record_job_wait(0.0)
+            return
+        share = current_share.get()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(waiter, share)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was handed over as we were cancelled - pass it on
+                self.release(lane)
+            else:
+                self._waiters[lane].remove(waiter, share)
+            raise
+        wait = time.time() - start
+        self.lane_stats[lane].record(wait)
+        record_job_wait(wait)
+
+    def release(self, lane: str):
+        self.in_use[lane] -= 1
+        self._wake()
+
+    def _wake(self):
+        for lane in LANES:
+            waiters = self._waiters[lane]
+            while waiters and self._can_take(lane):
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    self.in_use[lane] += 1
+                    waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self):
+        lane = current_lane.get()
+        await self.acquire(lane)
+        try:
+            yield lane
+        finally:
+            self.release(lane)
+
+    def stats(self) -> Dict[str, Any]:
+        lanes = {}
+        for lane in LANES:
+            lanes[lane] = {
+                "in_use": self.in_use[lane],
+                "waiting": len(self._waiters[lane]),
+                "waiting_by_share": self._waiters[lane].shares(),
+                "limit": self.lane_limits[lane],
+                **self.lane_stats[lane].to_dict()
+            }
+        return {"limit": self.limit, "lanes": lanes}
+
+
+# ======================= REGISTRY =======================
+
+_semaphores: List[PrioritySemaphore] = []
+_job_stats: "OrderedDict[str, WaitStats]" = OrderedDict()
+
+
+def record_job_wait(wait: float):
+    """Slot wait of the current job (worker, SMTP session and per-MX slots alike)"""
+    share = current_share.get()
+    if share is None or share.job_id is None:
+        return
+    stats = _job_stats.get(share.job_id)
+    if stats is None:
+        stats = _job_stats[share.job_id] = WaitStats()
+        while len(_job_stats) > MAX_JOB_STATS:
+            _job_stats.popitem(last=False)
+    else:
+        _job_stats.move_to_end(share.job_id)
+    stats.record(wait)
+
+
+def get_priority_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-lane usage and queue waits of every slot pool (for /api/metrics)"""
+    return {sem.name: sem.stats() for sem in _semaphores}
+
+
+def get_job_stats() -> Dict[str, Dict[str, Any]]:
+    """Slot queue times per bulk job, most recent last"""
+    return {job_id: stats.to_dict() for job_id, stats in _job_stats.items()}
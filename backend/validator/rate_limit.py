@@ -0,0 +1,132 @@
+"""
+Per-MX Rate Limiting
+Token bucket per MX host, shared by the async, fast and strict validators:
+every RCPT probe takes one token, so the probe rate to one destination stays
+under its budget across all jobs and code paths (concurrency caps alone let a
+fast server be hammered until it answers 421 and blocks the IP).
+Defaults and per-provider overrides (matched on the MX host suffix) come from
+VALIDATOR_MX_RATE / VALIDATOR_MX_BURST / VALIDATOR_MX_RATE_OVERRIDES.
+"""
+import asyncio
+import bisect
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+# Steady RCPT probes per second per MX host, and how many may go out back to back
+DEFAULT_RATE = float(os.getenv("VALIDATOR_MX_RATE", "10"))
+DEFAULT_BURST = float(os.getenv("VALIDATOR_MX_BURST", "20"))
+
+# MX host suffix -> (rate, burst); VALIDATOR_MX_RATE_OVERRIDES="google.com=50:100,example.net=2:4" adds/replaces
+PROVIDER_RATES: Dict[str, Tuple[float, float]] = {
+    "google.com": (50.0, 100.0),           # gmail-smtp-in.l.google.com, Google Workspace
+    "protection.outlook.com": (20.0, 40.0),  # Outlook / Microsoft 365
+    "yahoodns.net": (5.0, 10.0),           # Yahoo / AOL - quick to defer
+}
+for _item in os.getenv("VALIDATOR_MX_RATE_OVERRIDES", "").split(","):
+    _suffix, _, _spec = _item.partition("=")
+    if _suffix.strip() and _spec:
+        _rate, _, _burst = _spec.partition(":")
+        PROVIDER_RATES[_suffix.strip().lower()] = (float(_rate), float(_burst or _rate))
+
+MAX_BUCKETS = 5000
+
+# Upper bounds (seconds) of the wait-time histogram buckets; the last bucket is open-ended
+WAIT_BUCKETS = (0.0, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def rate_for(mx_host: str) -> Tuple[float, float]:
+    """(rate, burst) for an MX host - longest matching provider suffix, else the defaults"""
+    host = mx_host.lower().rstrip(".")
+    best = None
+    for suffix in PROVIDER_RATES:
+        if (host == suffix or host.endswith("." + suffix)) and (best is None or len(suffix) > len(best)):
+            best = suffix
+    return PROVIDER_RATES[best] if best else (DEFAULT_RATE, DEFAULT_BURST)
+
+
+class TokenBucket:
+    """
+    Token bucket with reservations: a request takes its tokens at once (the balance
+    may go negative) and sleeps until they would have accrued, so callers are
+    served in arrival order and a request larger than the burst still gets through.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.total_wait = 0.0
+        self.requests = 0
+
+    def reserve(self, tokens: float) -> float:
+        """Take `tokens`; returns the seconds to wait before using them"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.tokens -= tokens
+        self.requests += 1
+        return max(0.0, -self.tokens / self.rate)
+
+    def refund(self, tokens: float):
+        self.tokens = min(self.burst, self.tokens + tokens)
+
+
+class MXRateLimiter:
+    """Token buckets keyed by MX host (LRU-bounded) plus a wait-time histogram"""
+
+    def __init__(self, max_buckets: int = MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.histogram = [0] * (len(WAIT_BUCKETS) + 1)
+        self.throttled = 0  # Requests that had to wait
+
+    def bucket(self, mx_host: str) -> TokenBucket:
+        key = mx_host.lower()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(*rate_for(key))
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    async def acquire(self, mx_host: str, tokens: int = 1) -> float:
+        """Wait until `tokens` RCPT probes may go to `mx_host`; returns the seconds waited"""
+        bucket = self.bucket(mx_host)
+        wait = bucket.reserve(tokens)
+        self.histogram[bisect.bisect_left(WAIT_BUCKETS, wait)] += 1
+        if wait > 0:
+            self.throttled += 1
+            bucket.total_wait += wait
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                bucket.refund(tokens)  # Probe abandoned (e.g. per-email timeout) - give the budget back
+                raise
+        return wait
+
+    def refund(self, mx_host: str, tokens: int):
+        """Give back tokens taken for RCPTs that were never sent (they are retried and charged again)"""
+        self.bucket(mx_host).refund(tokens)
+
+    def get_stats(self, top: int = 20) -> Dict[str, Any]:
+        labels = [f"<={b}s" for b in WAIT_BUCKETS] + [f">{WAIT_BUCKETS[-1]}s"]
+        busiest = sorted(self._buckets.items(), key=lambda kv: kv[1].total_wait, reverse=True)[:top]
+        return {
+            "buckets": len(self._buckets),
+            "throttled": self.throttled,
+            "wait_histogram": dict(zip(labels, self.histogram)),
+            "most_throttled": {
+                host: {"rate": b.rate, "burst": b.burst, "requests": b.requests, "total_wait_s": round(b.total_wait, 2)}
+                for host, b in busiest if b.total_wait > 0
+            }
+        }
+
+
+# ======================= GLOBAL LIMITER =======================
+
+mx_rate_limiter = MXRateLimiter()
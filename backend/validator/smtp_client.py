@@ -0,0 +1,285 @@
+"""
+Probe SMTP Client
+Minimal asyncio-streams SMTP client for RCPT verification.
+Supports lock-step commands and ESMTP PIPELINING (RFC 2920):
+aiosmtplib pairs exactly one read with each write, so pipelined
+replies arriving in one packet cannot be read back through it.
+"""
+import asyncio
+import socket
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Callable, List, Optional, Set, Tuple
+
+SMTPReply = Tuple[int, str]
+
+# (mx_host, ip address) - one connection target
+ConnectCandidate = Tuple[str, str]
+
+# RFC 8305 "Connection Attempt Delay"
+CONNECTION_ATTEMPT_DELAY = 0.25
+
+# Latency feedback: (mx_host, kind, seconds) with kind "banner" or "tarpit" (TCP up, no banner in time)
+ConnectObserver = Callable[[str, str, float], None]
+
+
+class SMTPProbeError(Exception):
+    """Unexpected reply or broken connection during a probe"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+        self.message = message
+
+
+class SMTPConnectFailed(SMTPProbeError):
+    """TCP connect failed or the server sent no 220 banner"""
+
+
+@lru_cache(maxsize=1)
+def default_local_hostname() -> str:
+    """FQDN for EHLO (resolved once - getfqdn can block on reverse DNS)"""
+    return socket.getfqdn()
+
+
+def quote_address(address: str) -> str:
+    """Wrap an address in angle brackets for MAIL FROM / RCPT TO"""
+    address = address.strip()
+    if address.startswith("<") and address.endswith(">"):
+        return address
+    return f"<{address}>"
+
+
+class ProbeSMTP:
+    """
+    SMTP connection used for mailbox probes.
+    Method names mirror aiosmtplib.SMTP (connect/ehlo/mail/rcpt/rset/noop/quit)
+    but RCPT returns the reply instead of raising on refusal.
+    """
+
+    def __init__(self, hostname: str, port: int = 25, timeout: float = 2.0,
+                 local_hostname: Optional[str] = None):
+        self.hostname = hostname
+        self.port = port
+        self.timeout = timeout
+        self.local_hostname = local_hostname or default_local_hostname()
+        self.extensions: Set[str] = set()
+        self.last_used = time.time()  # Last completed command (pool idle tracking)
+        self.tcp_connected = False  # TCP up (a timeout after this is a slow / missing banner)
+        self.banner_latency: Optional[float] = None  # Connect start -> 220
+        self.on_round_trip: Optional[Callable[[float], None]] = None  # Called with each command round trip time
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self) -> SMTPReply:
+        """Open the TCP connection and read the 220 banner"""
+        start = time.time()
+        try:
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.hostname, self.port),
+                timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            raise
+        except OSError as e:
+            raise SMTPConnectFailed(0, f"Connect to {self.hostname}:{self.port} failed: {e}")
+
+        self.tcp_connected = True
+        try:
+            code, message = await self.read_reply()
+        except BaseException:
+            self.close()  # Banner timed out / cancelled: do not leak the socket
+            raise
+        self.banner_latency = time.time() - start
+        if code != 220:
+            self.close()
+            raise SMTPConnectFailed(code, message)
+        return code, message
+
+    async def ehlo(self) -> SMTPReply:
+        """EHLO and record advertised extensions"""
+        code, message = await self.execute_command(f"EHLO {self.local_hostname}")
+        if code != 250:
+            raise SMTPProbeError(code, message)
+        self.extensions = {
+            line.split()[0].lower() for line in message.splitlines()[1:] if line.strip()
+        }
+        return code, message
+
+    async def helo(self) -> SMTPReply:
+        code, message = await self.execute_command(f"HELO {self.local_hostname}")
+        if code != 250:
+            raise SMTPProbeError(code, message)
+        self.extensions = set()
+        return code, message
+
+    def supports_extension(self, extension: str) -> bool:
+        return extension.lower() in self.extensions
+
+    async def mail(self, sender: str) -> SMTPReply:
+        """MAIL FROM (raises on refusal, like aiosmtplib)"""
+        code, message = await self.execute_command(f"MAIL FROM:{quote_address(sender)}")
+        if code != 250:
+            raise SMTPProbeError(code, message)
+        return code, message
+
+    async def rcpt(self, recipient: str) -> SMTPReply:
+        """RCPT TO - the reply code is the probe result, so refusals are returned"""
+        return await self.execute_command(f"RCPT TO:{quote_address(recipient)}")
+
+    async def rset(self) -> SMTPReply:
+        return await self.execute_command("RSET")
+
+    async def noop(self) -> SMTPReply:
+        return await self.execute_command("NOOP")
+
+    async def quit(self) -> SMTPReply:
+        try:
+            return await self.execute_command("QUIT")
+        finally:
+            self.close()
+
+    async def execute_command(self, command: str, timeout: Optional[float] = None) -> SMTPReply:
+        """Lock-step: write one command, read its reply"""
+        replies = await self.pipeline([command], timeout=timeout)
+        return replies[0]
+
+    async def pipeline(self, commands: List[str], timeout: Optional[float] = None) -> List[SMTPReply]:
+        """
+        Write all commands in a single flush, then read one reply per command.
+        Only valid for a pipelining group (RFC 2920) or a single command.
+        """
+        if not self.is_connected:
+            raise SMTPProbeError(0, "Server not connected")
+
+        start = time.time()
+        self._writer.write("".join(f"{c}\r\n" for c in commands).encode("ascii"))
+        await asyncio.wait_for(self._writer.drain(), timeout=timeout or self.timeout)
+
+        replies = []
+        for _ in commands:
+            replies.append(await self.read_reply(timeout))
+        self.last_used = time.time()
+        if self.on_round_trip is not None:
+            self.on_round_trip(self.last_used - start)
+        return replies
+
+    async def read_reply(self, timeout: Optional[float] = None) -> SMTPReply:
+        """Read one (possibly multiline) reply"""
+        lines = []
+        code = 0
+        while True:
+            raw = await asyncio.wait_for(self._reader.readline(), timeout=timeout or self.timeout)
+            if not raw:
+                self.close()
+                raise SMTPProbeError(0, "Connection closed by server")
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            try:
+                code = int(line[:3])
+            except ValueError:
+                raise SMTPProbeError(0, f"Malformed SMTP reply: {line}")
+            lines.append(line[4:].strip())
+            if line[3:4] != "-":
+                return code, "\n".join(lines)
+
+    def close(self):
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except Exception:
+                pass
+            self._writer = None
+
+
+# ======================= HAPPY EYEBALLS =======================
+
+async def resolve_candidates(mx_hosts: List[str], port: int = 25, timeout: float = 2.0) -> List[ConnectCandidate]:
+    """
+    Addresses for each MX host, in MX order. Within a host the address
+    families alternate, IPv6 first (RFC 8305 section 4).
+    """
+    loop = asyncio.get_running_loop()
+
+    async def lookup(host: str) -> List[ConnectCandidate]:
+        try:
+            infos = await asyncio.wait_for(
+                loop.getaddrinfo(host, port, type=socket.SOCK_STREAM), timeout=timeout
+            )
+        except Exception:
+            return []
+        v6 = list(dict.fromkeys(info[4][0] for info in infos if info[0] == socket.AF_INET6))
+        v4 = list(dict.fromkeys(info[4][0] for info in infos if info[0] == socket.AF_INET))
+        ordered = []
+        for i in range(max(len(v6), len(v4))):
+            ordered += [(host, addr) for addr in (v6[i:i + 1] + v4[i:i + 1])]
+        return ordered
+
+    resolved = await asyncio.gather(*[lookup(host) for host in mx_hosts])
+    return [candidate for addresses in resolved for candidate in addresses]
+
+
+async def race_connect(
+    candidates: List[ConnectCandidate],
+    port: int = 25,
+    timeout: float = 2.0,
+    attempt_delay: float = CONNECTION_ATTEMPT_DELAY,
+    local_hostname: Optional[str] = None,
+    observer: Optional[ConnectObserver] = None
+) -> Tuple[ProbeSMTP, ConnectCandidate, List[ConnectCandidate]]:
+    """
+    Staggered parallel connects (RFC 8305): a new attempt starts every
+    attempt_delay, or as soon as the previous one fails. The first 220 banner
+    wins and the other attempts are cancelled.
+    observer gets each attempt's banner latency, or a "tarpit" signal when
+    TCP connected but no banner came before the timeout.
+    Returns (connected client, winning candidate, candidates that failed).
+    """
+    queue = deque(candidates)
+    running = {}
+    failed: List[ConnectCandidate] = []
+    last_error: Optional[Exception] = None
+
+    async def attempt(candidate: ConnectCandidate) -> ProbeSMTP:
+        smtp = ProbeSMTP(hostname=candidate[1], port=port, timeout=timeout, local_hostname=local_hostname)
+        try:
+            await asyncio.wait_for(smtp.connect(), timeout=timeout)
+        except asyncio.TimeoutError:
+            smtp.close()
+            if observer is not None and smtp.tcp_connected:
+                observer(candidate[0], "tarpit", timeout)
+            raise
+        except BaseException:
+            smtp.close()  # Cancelled loser (or failed connect): never leave the socket open
+            raise
+        if observer is not None:
+            observer(candidate[0], "banner", smtp.banner_latency)
+        return smtp
+
+    try:
+        while queue or running:
+            if queue:
+                candidate = queue.popleft()
+                running[asyncio.ensure_future(attempt(candidate))] = candidate
+            done, _ = await asyncio.wait(
+                running, timeout=attempt_delay if queue else None, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                candidate = running.pop(task)
+                if task.exception() is None:
+                    return task.result(), candidate, failed
+                failed.append(candidate)
+                last_error = task.exception()
+    finally:
+        # Losers: cancel, and close any that connected at the same moment
+        for task in running:
+            task.cancel()
+        for outcome in await asyncio.gather(*running, return_exceptions=True):
+            if isinstance(outcome, ProbeSMTP):
+                outcome.close()
+
+    raise SMTPConnectFailed(0, f"All connection attempts failed: {last_error}")
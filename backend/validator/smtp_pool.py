@@ -1,138 +1,408 @@
 """
 SMTP Connection Pool Manager
-Manages domain-based SMTP connection pools with connection reuse
+Manages MX-host-based SMTP connection pools with connection reuse
+(one warm session serves every recipient domain routed to that MX)
 """
 import asyncio
-import aiosmtplib
 import random
-from typing import List, Optional, Dict, Any
+import re
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import List, Optional, Dict, Any, Tuple
+
+from .smtp_client import (
+    ProbeSMTP, SMTPProbeError, SMTPConnectFailed, ConnectCandidate, quote_address, race_connect, resolve_candidates
+)
+from .concurrency import get_limiter
+from .rate_limit import mx_rate_limiter
+from .circuit_breaker import smtp_breaker
+from .domain_profile import domain_profiles
+
+SMTP_PORT = 25
+
+# Defaults until the MX host's profile has learned its own (banner / command p95 based) timeouts
+CONNECT_TIMEOUT = 2.0
+COMMAND_TIMEOUT = 2.0
+
+# Recipients per MAIL FROM transaction (RFC 5321 requires servers to accept at least 100)
+MAX_RCPT_PER_TRANSACTION = 20
+
+# Resolved MX addresses are reused this long; addresses that failed to connect are tried last for this long
+ADDRESS_CACHE_TTL = 300
+FAILED_ADDRESS_PENALTY = 300
+
+# Pooled connections idle longer than this get a NOOP before reuse
+HEALTH_CHECK_IDLE = 10.0
+
+# A per-transaction recipient limit learned from a 452 / x.5.3 refusal is re-probed after this long
+RCPT_LIMIT_TTL = 3600
+# 452 texts that mean a full mailbox or disk rather than "too many recipients"
+STORAGE_HINTS = ("4.2.2", "4.3.1", "full", "quota", "storage")
+TOO_MANY_RCPTS_STATUS = re.compile(r"\b[45]\.5\.3\b")  # Enhanced status code "too many recipients"
+
+class PoolConnectError(Exception):
+    """No MX host of the pool accepted a connection"""
+
 
 class SMTPConnectionPool:
     """
-    Connection pool for a single domain
-    Maintains 2-4 reusable SMTP connections
+    Connection pool for a single MX host
+    Maintains reusable SMTP connections shared by all domains it serves;
+    concurrent sessions are capped by the MX host's adaptive (AIMD) limiter
     """
     
-    def __init__(self, domain: str, mx_hosts: List[str], max_size: int = 3):
-        self.domain = domain
+    def __init__(self, mx_host: str, mx_hosts: List[str], max_size: int = 3):
+        self.mx_host = mx_host
         self.mx_hosts = mx_hosts
         self.max_size = max_size
-        self.pool: List[aiosmtplib.SMTP] = []
+        self.pool: List[ProbeSMTP] = []
         self.lock = asyncio.Lock()
         self.probe_email = "verify@mail-validator.com"  # Sender for verification
+        self.max_rcpt = MAX_RCPT_PER_TRANSACTION
+        self._rcpt_limit = self.max_rcpt  # Lowered when the server refuses more recipients, until _rcpt_limit_until
+        self._rcpt_limit_until = 0.0
+        self.in_use = 0  # Connections checked out of the pool right now
+        self.last_activity = time.time()
+        self.closed = False  # Set when the registry evicts this pool
+        self.broken_retries = 0  # Transactions replayed after a pooled session turned out dead
+        self.preferred: Optional[ConnectCandidate] = None  # Last happy-eyeballs winner
+        self._failed_until: Dict[ConnectCandidate, float] = {}
+        self._candidates: List[ConnectCandidate] = []
+        self._candidates_expire = 0.0
+    
+    @property
+    def limiter(self):
+        """The MX host's AIMD limiter (looked up each time - the registry may have evicted an idle one)"""
+        return get_limiter(self.mx_host)
+    
+    @property
+    def timeouts(self) -> Tuple[float, float]:
+        """(connect, command) timeouts learned for this MX host"""
+        return domain_profiles.timeouts(self.mx_host, CONNECT_TIMEOUT, COMMAND_TIMEOUT)
+    
+    @property
+    def open_connections(self) -> int:
+        return len(self.pool) + self.in_use
+    
+    @property
+    def rcpt_limit(self) -> int:
+        """Recipients per transaction: the learned limit while it lasts, else max_rcpt"""
+        if self._rcpt_limit_until and time.time() >= self._rcpt_limit_until:
+            self._rcpt_limit, self._rcpt_limit_until = self.max_rcpt, 0.0
+        return self._rcpt_limit
+    
+    def _learn_rcpt_limit(self, accepted: int):
+        """The server took only `accepted` recipients in one transaction (1 = single-recipient mode)"""
+        self._rcpt_limit = max(1, min(accepted, self.rcpt_limit))
+        self._rcpt_limit_until = time.time() + RCPT_LIMIT_TTL
     
     async def verify_email(self, email: str) -> Dict[str, Any]:
         """
         Verify email deliverability using SMTP
         Reuses connection from pool or creates new one
         """
-        conn = None
         try:
-            # Get connection
-            conn = await self._acquire_connection()
-            
-            # SMTP verification flow
-            # MAIL FROM
-            await asyncio.wait_for(
-                conn.mail(self.probe_email),
-                timeout=2.0
-            )
-            
-            # RCPT TO (this is the actual test)
-            code, message = await asyncio.wait_for(
-                conn.rcpt(email),
-                timeout=2.0
-            )
-            
-            # RSET (clear state for next email - very important!)
-            await conn.rset()
+            await mx_rate_limiter.acquire(self.mx_host)
+            async with self.limiter.slot() as slot:
+                slot.domain = email.rpartition("@")[2]
+                # MAIL FROM, RCPT TO (the actual test), RSET (clear state for next email)
+                conn, replies = await self._run_transaction([email])
+                slot.observe(code for code, _ in replies)
             
             # Return to pool
             await self._release_connection(conn)
             
-            return {
-                "code": code,
-                "message": message.decode() if isinstance(message, bytes) else str(message),
-                "status": self._interpret_code(code)
-            }
+            code, message = replies[0]
+            return self._build_result(code, message)
             
         except asyncio.TimeoutError:
-            if conn:
-                await self._close_connection(conn)
             return {"code": 0, "status": "timeout", "message": "SMTP timeout"}
         
         except Exception as e:
-            if conn:
-                await self._close_connection(conn)
             return {"code": 0, "status": "error", "message": str(e)}
     
-    async def _acquire_connection(self) -> aiosmtplib.SMTP:
-        """Get connection from pool or create new one"""
-        async with self.lock:
-            # Try to reuse existing connection
-            while self.pool:
-                conn = self.pool.pop(0)
-                if await self._is_healthy(conn):
-                    return conn
-                else:
-                    # Connection dead, close it
-                    await self._close_connection(conn)
+    async def verify_batch(self, emails: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Verify several recipients with one MAIL FROM:
+        MAIL FROM, up to rcpt_limit x RCPT TO, RSET.
+        A "too many recipients" refusal lowers rcpt_limit to what the server
+        took (for RCPT_LIMIT_TTL); at 1 it falls back to verify_email per address.
+        A chunk whose session broke for any other reason is retried per address
+        without touching rcpt_limit.
+        Returns {email: result} with the same result shape as verify_email.
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        pending = list(dict.fromkeys(emails))
+        
+        while pending:
+            limit = self.rcpt_limit
+            if limit == 1 or len(pending) == 1:
+                for email in pending:
+                    results[email] = await self.verify_email(email)
+                break
             
-            # No healthy connection, create new
-            return await self._create_connection()
+            chunk, pending = pending[:limit], pending[limit:]
+            leftover = await self._verify_transaction(chunk, results)
+            pending = leftover + pending
+        
+        return results
+    
+    async def _verify_transaction(self, chunk: List[str], results: Dict[str, Dict[str, Any]]) -> List[str]:
+        """
+        Run one multi-RCPT transaction and store each reply under its address.
+        Returns the addresses that still need a verdict (server stopped accepting recipients).
+        """
+        await mx_rate_limiter.acquire(self.mx_host, len(chunk))
+        async with self.limiter.slot() as slot:
+            slot.domain = chunk[0].rpartition("@")[2]
+            try:
+                conn, replies = await self._run_transaction(chunk)
+                slot.observe(code for code, _ in replies)
+                if not conn.supports_extension("pipelining"):
+                    slot.round_trips = len(replies) + 2
+            except PoolConnectError as e:
+                for email in chunk:
+                    results[email] = {"code": 0, "status": "error", "message": str(e)}
+                return []
+            except asyncio.TimeoutError:
+                slot.timed_out = True
+                for email in chunk:
+                    results[email] = {"code": 0, "status": "timeout", "message": "SMTP timeout"}
+                return []
+            except Exception:
+                # MAIL FROM refused or session broke mid-transaction - says nothing about the
+                # recipient limit, so the learned limit stays and the chunk is retried per address
+                conn = None
+        
+        if conn is None:
+            # verify_email takes a token per address - the chunk's reservation carries over
+            mx_rate_limiter.refund(self.mx_host, len(chunk))
+            for email in chunk:
+                results[email] = await self.verify_email(email)
+            return []
+        
+        await self._release_connection(conn)
+        if len(replies) < len(chunk):
+            # Lock-step stopped at the refusal: the rest never went out and are charged on retry
+            mx_rate_limiter.refund(self.mx_host, len(chunk) - len(replies))
+        
+        answered = self._first_refusal(replies)
+        if answered < len(replies):
+            self._learn_rcpt_limit(answered)
+        for email, (code, message) in zip(chunk, replies[:answered]):
+            results[email] = self._build_result(code, message)
+        return chunk[answered:]
+    
+    async def _run_transaction(self, recipients: List[str]) -> Tuple[ProbeSMTP, List[Tuple[int, str]]]:
+        """
+        Check out a connection and run one transaction on it. On failure the
+        connection is closed before the error propagates; if a reused session
+        turns out to be dead, the transaction is retried once on a fresh one.
+        The caller releases the returned connection.
+        """
+        conn, reused = await self._acquire_connection()
+        try:
+            return conn, await self._transaction(conn, recipients)
+        except asyncio.CancelledError:
+            self._drop_connection(conn)
+            raise
+        except Exception as e:
+            broken = self._is_broken_connection(e)
+            if broken:
+                self._drop_connection(conn)  # Nobody left to say QUIT to
+            else:
+                await self._discard_connection(conn)
+            if not (reused and broken):
+                raise
+        
+        # Stale pooled session (server timed it out) - not the recipient's fault
+        self.broken_retries += 1
+        conn = await self._create_connection()
+        self.in_use += 1
+        try:
+            return conn, await self._transaction(conn, recipients)
+        except asyncio.CancelledError:
+            self._drop_connection(conn)
+            raise
+        except Exception:
+            await self._discard_connection(conn)
+            raise
+    
+    def _is_broken_connection(self, error: Exception) -> bool:
+        """Dropped or closing session, as opposed to a timeout or a real SMTP refusal"""
+        if isinstance(error, asyncio.TimeoutError):
+            return False
+        if isinstance(error, SMTPProbeError):
+            return error.code in (0, 421)
+        return isinstance(error, (ConnectionError, OSError, asyncio.IncompleteReadError))
+    
+    async def _transaction(self, conn: ProbeSMTP, recipients: List[str]) -> List[Tuple[int, str]]:
+        """
+        MAIL FROM + one RCPT TO per recipient + RSET. Returns the RCPT replies.
+        With PIPELINING the whole group goes out in a single flush (one round trip);
+        otherwise commands run lock-step and stop once the server refuses more recipients.
+        """
+        conn.timeout = self.timeouts[1]  # Pooled sessions pick up the latest learned value
+        if conn.supports_extension("pipelining"):
+            commands = [f"MAIL FROM:{quote_address(self.probe_email)}"]
+            commands += [f"RCPT TO:{quote_address(r)}" for r in recipients]
+            commands.append("RSET")
+            replies = await conn.pipeline(commands)
+            mail_code, mail_message = replies[0]
+            if mail_code != 250:
+                raise SMTPProbeError(mail_code, mail_message)
+            return replies[1:-1]
+        
+        await conn.mail(self.probe_email)
+        replies = []
+        for recipient in recipients:
+            replies.append(await conn.rcpt(recipient))
+            if self._first_refusal(replies) < len(replies):
+                break
+        await conn.rset()
+        return replies
+    
+    def _first_refusal(self, replies: List[Tuple[int, str]]) -> int:
+        """Index of the first reply that means 'no more recipients in this transaction' (len if none)"""
+        for i, (code, message) in enumerate(replies):
+            if i and self._is_rcpt_limit(code, message):
+                return i
+        return len(replies)
+    
+    def _is_rcpt_limit(self, code: int, message: str) -> bool:
+        """
+        452 or x.5.3 "too many recipients" (RFC 5321 4.5.3.1.10). Other temp-fails - greylisting
+        450/451 included - are per-recipient replies and leave batching alone.
+        """
+        message_lower = message.lower()
+        if code >= 400 and (TOO_MANY_RCPTS_STATUS.search(message) or "too many recipients" in message_lower):
+            return True
+        return code == 452 and not any(hint in message_lower for hint in STORAGE_HINTS)
     
-    async def _release_connection(self, conn: aiosmtplib.SMTP):
-        """Return connection to pool"""
+    def _build_result(self, code: int, message: str) -> Dict[str, Any]:
+        """Result dict shared by single and batch verification"""
+        return {
+            "code": code,
+            "message": message,
+            "status": self._interpret_code(code)
+        }
+    
+    async def _acquire_connection(self) -> Tuple[ProbeSMTP, bool]:
+        """
+        Get connection from pool or create new one. Returns (connection, reused).
+        The pool lock is held only to pop; a connection idle for longer than
+        HEALTH_CHECK_IDLE gets a NOOP round trip outside the lock, fresher ones
+        are used as-is (a dead one is caught by the retry in _run_transaction).
+        Dead sessions are closed without a QUIT.
+        """
+        self.last_activity = time.time()
+        while True:
+            async with self.lock:
+                # Most recently used first - the freshest sessions skip the check
+                conn = self.pool.pop() if self.pool else None
+            if conn is None:
+                break
+            if conn.is_connected and (time.time() - conn.last_used < HEALTH_CHECK_IDLE or await self._is_healthy(conn)):
+                self.in_use += 1
+                return conn, True
+            # Connection dead - a QUIT would only wait for a reply that never comes
+            conn.close()
+        
+        # No healthy connection, create new
+        conn = await self._create_connection()
+        self.in_use += 1
+        return conn, False
+    
+    async def _release_connection(self, conn: ProbeSMTP):
+        """Return connection to pool (keeps as many idle as the MX's current limit allows)"""
+        self.in_use -= 1
         async with self.lock:
-            if len(self.pool) < self.max_size:
+            if not self.closed and len(self.pool) < max(self.max_size, self.limiter.current_limit):
                 self.pool.append(conn)
-            else:
-                # Pool full, close connection
-                await self._close_connection(conn)
+                return
+        # Pool full - QUIT outside the lock
+        await self._close_connection(conn)
     
-    async def _create_connection(self) -> aiosmtplib.SMTP:
-        """Create new SMTP connection to MX hosts"""
-        last_error = None
+    async def _create_connection(self) -> ProbeSMTP:
+        """
+        Create new SMTP connection, racing the MX hosts' addresses (happy eyeballs, RFC 8305):
+        staggered attempts, first banner wins. The last winner is tried first and
+        addresses that failed recently go last, so a dead primary costs nothing after the first race.
+        No connect is attempted while the circuit breaker is open for these MX hosts.
+        """
+        reason = smtp_breaker.check(self.mx_host)
+        if reason:
+            raise PoolConnectError(reason)
+        try:
+            smtp, winner, failed = await race_connect(
+                await self._connect_candidates(), port=SMTP_PORT, timeout=self.timeouts[0],
+                observer=domain_profiles.record_latency
+            )
+        except Exception as e:
+            # All MX hosts failed
+            self.preferred = None
+            if isinstance(e, SMTPConnectFailed):
+                smtp_breaker.record_connect(self.mx_host, ok=False)
+            raise PoolConnectError(f"All MX hosts failed for {self.mx_host}: {e}")
+        
+        smtp_breaker.record_connect(self.mx_host, ok=True)
+        smtp.timeout = self.timeouts[1]
+        smtp.on_round_trip = partial(domain_profiles.record_latency, winner[0], "command")
+        self.preferred = winner
+        self._failed_until.pop(winner, None)
+        for candidate in failed:
+            self._failed_until[candidate] = time.time() + FAILED_ADDRESS_PENALTY
         
-        # Try each MX host in order
-        for mx_host in self.mx_hosts:
+        try:
+            # EHLO (records PIPELINING), HELO for pre-ESMTP servers
             try:
-                # Create client
-                smtp = aiosmtplib.SMTP(
-                    hostname=mx_host,
-                    port=25,
-                    timeout=2.0,
-                    use_tls=False,  # Start without TLS
-                    start_tls=False  # Don't upgrade
-                )
-                
-                # Connect with timeout
-                await asyncio.wait_for(smtp.connect(), timeout=2.0)
-                
-                # EHLO
                 await smtp.ehlo()
-                
-                return smtp
-                
-            except Exception as e:
-                last_error = e
-                continue
+            except SMTPProbeError:
+                await smtp.helo()
+        except Exception as e:
+            smtp.close()
+            raise PoolConnectError(f"EHLO/HELO refused by {winner[0]}: {e}")
+        return smtp
+    
+    async def _connect_candidates(self) -> List[ConnectCandidate]:
+        """MX addresses in connect order: preferred winner, then MX order, recently failed last"""
+        now = time.time()
+        if not self._candidates or now >= self._candidates_expire:
+            self._candidates = await resolve_candidates(self.mx_hosts, SMTP_PORT)
+            self._candidates_expire = now + ADDRESS_CACHE_TTL
+        if not self._candidates:
+            raise Exception(f"No addresses for MX hosts of {self.mx_host}")
         
-        # All MX hosts failed
-        raise Exception(f"All MX hosts failed for {self.domain}: {last_error}")
+        def rank(candidate: ConnectCandidate) -> int:
+            if candidate == self.preferred:
+                return 0
+            return 2 if self._failed_until.get(candidate, 0) > now else 1
+        
+        return sorted(self._candidates, key=rank)
     
-    async def _is_healthy(self, conn: aiosmtplib.SMTP) -> bool:
+    async def _is_healthy(self, conn: ProbeSMTP) -> bool:
         """Check if connection is still alive"""
         try:
             if not conn.is_connected:
                 return False
             # Try NOOP to test connection
-            await asyncio.wait_for(conn.noop(), timeout=1.0)
-            return True
+            code, _ = await asyncio.wait_for(conn.noop(), timeout=1.0)
+            return code == 250
         except:
             return False
     
-    async def _close_connection(self, conn: aiosmtplib.SMTP):
+    async def _discard_connection(self, conn: ProbeSMTP):
+        """Close a checked-out connection that must not go back to the pool"""
+        self.in_use -= 1
+        await self._close_connection(conn)
+    
+    def _drop_connection(self, conn: ProbeSMTP):
+        """Cancelled mid-transaction: close the socket without a QUIT round trip"""
+        self.in_use -= 1
+        conn.close()
+    
+    async def _close_connection(self, conn: ProbeSMTP):
         """Close SMTP connection safely"""
         try:
             if conn.is_connected:
@@ -153,22 +423,158 @@ class SMTPConnectionPool:
         else:
             return f"code_{code}"
     
-    async def verify_fake_email(self) -> bool:
+    async def verify_with_catch_all_probe(self, domain: str, email: str) -> Tuple[Optional[bool], Optional[Dict[str, Any]]]:
+        """
+        Catch-all probe and a real address in ONE transaction:
+        MAIL FROM, RCPT <random>@domain, RCPT email, RSET.
+        Returns (is_catch_all, result for email). is_catch_all is None when the
+        probe got a temporary reply; the email result is None when the server
+        stopped accepting recipients after the probe.
+        """
+        fake_email = f"nonexistent{random.randint(100000, 999999)}@{domain}"
+        await mx_rate_limiter.acquire(self.mx_host, 2)
+        async with self.limiter.slot() as slot:
+            slot.domain = domain
+            conn, replies = await self._run_transaction([fake_email, email])
+            slot.observe(code for code, _ in replies)
+        await self._release_connection(conn)
+        
+        probe_code = replies[0][0]
+        if probe_code == 250:
+            is_catch_all = True
+        elif probe_code in (550, 551, 553):
+            is_catch_all = False
+        else:
+            is_catch_all = None
+        
+        if self._first_refusal(replies) < 2:
+            return is_catch_all, None
+        code, message = replies[1]
+        return is_catch_all, self._build_result(code, message)
+    
+    async def verify_fake_email(self, domain: str) -> bool:
         """
         Test with fake email for catch-all detection
+        Catch-all is a property of the recipient domain, not the MX host
         Returns True if fake email is accepted (catch-all)
         """
         fake_local = f"nonexistent{random.randint(100000, 999999)}"
-        fake_email = f"{fake_local}@{self.domain}"
+        fake_email = f"{fake_local}@{domain}"
         
         result = await self.verify_email(fake_email)
         
         # If fake email returns 250, it's catch-all
         return result.get("code") == 250
     
+    async def close_idle(self, max_idle: float) -> int:
+        """QUIT pooled connections unused for max_idle seconds; returns how many were closed"""
+        cutoff = time.time() - max_idle
+        async with self.lock:
+            stale = [conn for conn in self.pool if conn.last_used < cutoff]
+            self.pool = [conn for conn in self.pool if conn.last_used >= cutoff]
+        await asyncio.gather(*[self._close_connection(conn) for conn in stale])
+        return len(stale)
+    
     async def close_all(self):
-        """Close all connections in pool"""
+        """Close all connections in pool (connections in use are closed when released)"""
+        self.closed = True
         async with self.lock:
-            for conn in self.pool:
-                await self._close_connection(conn)
-            self.pool.clear()
+            idle, self.pool = self.pool, []
+        await asyncio.gather(*[self._close_connection(conn) for conn in idle])
+
+
+# ======================= POOL REGISTRY =======================
+
+# Pools kept (LRU); idle connections are QUIT after POOL_IDLE_TIMEOUT and
+# pools with nothing open are dropped after POOL_EXPIRY
+MAX_POOLS = 2000
+POOL_IDLE_TIMEOUT = 30.0
+POOL_EXPIRY = 600.0
+REAPER_INTERVAL = 10.0
+
+
+class SMTPPoolRegistry:
+    """
+    Bounded registry of SMTPConnectionPool keyed by primary MX host.
+    Least-recently-used pools are evicted past max_pools; a background
+    reaper QUITs idle connections and forgets pools that have gone quiet.
+    """
+    
+    def __init__(self, max_size: int = 3, max_pools: int = MAX_POOLS,
+                 idle_timeout: float = POOL_IDLE_TIMEOUT, pool_expiry: float = POOL_EXPIRY):
+        self.max_size = max_size
+        self.max_pools = max_pools
+        self.idle_timeout = idle_timeout
+        self.pool_expiry = pool_expiry
+        self.pools: "OrderedDict[str, SMTPConnectionPool]" = OrderedDict()
+        self.evictions = 0
+        self.expired = 0
+        self.reaped_connections = 0
+        self._reaper: Optional[asyncio.Task] = None
+    
+    def __len__(self) -> int:
+        return len(self.pools)
+    
+    def __contains__(self, mx_key: str) -> bool:
+        return mx_key in self.pools
+    
+    def get(self, mx_hosts: List[str]) -> SMTPConnectionPool:
+        """Pool for the primary MX host (created on first use)"""
+        self._ensure_reaper()
+        mx_key = mx_hosts[0].lower()
+        pool = self.pools.get(mx_key)
+        if pool is not None:
+            self.pools.move_to_end(mx_key)
+            return pool
+        
+        pool = self.pools[mx_key] = SMTPConnectionPool(mx_key, mx_hosts, self.max_size)
+        while len(self.pools) > self.max_pools:
+            _, evicted = self.pools.popitem(last=False)
+            self.evictions += 1
+            asyncio.ensure_future(evicted.close_all())
+        return pool
+    
+    def _ensure_reaper(self):
+        if self._reaper is None or self._reaper.done():
+            try:
+                self._reaper = asyncio.get_running_loop().create_task(self._reap_loop())
+            except RuntimeError:
+                pass  # No loop yet - started on the first call from async code
+    
+    async def _reap_loop(self):
+        while True:
+            await asyncio.sleep(REAPER_INTERVAL)
+            try:
+                await self.reap()
+            except Exception as e:
+                print(f"[SMTP POOL] Reaper error: {e}")
+    
+    async def reap(self):
+        """QUIT idle connections; drop pools with nothing open that have been quiet for pool_expiry"""
+        now = time.time()
+        for mx_key, pool in list(self.pools.items()):
+            self.reaped_connections += await pool.close_idle(self.idle_timeout)
+            if pool.open_connections == 0 and now - pool.last_activity > self.pool_expiry:
+                if self.pools.get(mx_key) is pool:
+                    del self.pools[mx_key]
+                    self.expired += 1
+    
+    async def close_all(self):
+        if self._reaper:
+            self._reaper.cancel()
+            self._reaper = None
+        pools = list(self.pools.values())
+        self.pools.clear()
+        await asyncio.gather(*[pool.close_all() for pool in pools], return_exceptions=True)
+    
+    def stats(self) -> Dict[str, Any]:
+        pools = list(self.pools.values())
+        return {
+            "pools": len(pools),
+            "open_sockets": sum(pool.open_connections for pool in pools),
+            "idle_sockets": sum(len(pool.pool) for pool in pools),
+            "in_use_sockets": sum(pool.in_use for pool in pools),
+            "evictions": self.evictions,
+            "expired_pools": self.expired,
+            "reaped_connections": self.reaped_connections
+        }
@@ -20,7 +20,7 @@ import aiodns
 import aiosmtplib
 import re
 import time
-from typing import Dict, Any, List, Tuple, Optional, Set
+from typing import Callable, Dict, Any, List, Tuple, Optional, Set
 from dataclasses import dataclass, field
 from functools import lru_cache
 from pathlib import Path
@@ -35,9 +35,13 @@ except ImportError:
         """Fallback scoring function"""
         return result
 
+from .domain_profile import domain_profiles
+from .rate_limit import mx_rate_limiter
+
 # ======================= STRICT CONFIGURATION =======================
 
 # Timeouts (optimized for speed while maintaining accuracy)
+# SMTP defaults; each MX host switches to timeouts learned from its own latency once it has enough samples
 CONNECTION_TIMEOUT = 5.0  # seconds - SMTP connection (reduced from 8)
 READ_TIMEOUT = 4.0  # seconds - SMTP read (reduced from 6)
 DNS_TIMEOUT = 2.0  # seconds - DNS resolution (reduced from 3)
@@ -451,20 +455,28 @@ class StrictSMTPVerifier:
             "retry_recommended": False
         }
         
+        if domain_profiles.is_tarpit(mx_host):
+            result["reason"] = "SMTP skipped – server tarpits verification probes"
+            return result
+        connect_timeout, read_timeout = domain_profiles.timeouts(mx_host, CONNECTION_TIMEOUT, READ_TIMEOUT)
+        await mx_rate_limiter.acquire(mx_host)  # RCPT budget shared with the other validators
+        
         try:
             # Create SMTP connection
             smtp = aiosmtplib.SMTP(
                 hostname=mx_host,
                 port=25,
-                timeout=CONNECTION_TIMEOUT
+                timeout=connect_timeout
             )
             
             # Stage 1: CONNECT with timeout
             try:
+                started = time.time()
                 await asyncio.wait_for(
                     smtp.connect(),
-                    timeout=CONNECTION_TIMEOUT
+                    timeout=connect_timeout
                 )
+                domain_profiles.record_latency(mx_host, "banner", time.time() - started)
             except asyncio.TimeoutError:
                 result["status"] = "NEUTRAL"
                 result["reason"] = "SMTP connection timeout – server did not respond"
@@ -476,30 +488,34 @@ class StrictSMTPVerifier:
                 try:
                     await asyncio.wait_for(
                         smtp.ehlo(),
-                        timeout=READ_TIMEOUT
+                        timeout=read_timeout
                     )
                 except Exception:
                     # Fallback to HELO
                     try:
                         await asyncio.wait_for(
                             smtp.helo(),
-                            timeout=READ_TIMEOUT
+                            timeout=read_timeout
                         )
                     except Exception:
                         pass  # Some servers don't require EHLO/HELO
                 
                 # Stage 3: MAIL FROM
+                started = time.time()
                 await asyncio.wait_for(
                     smtp.mail(SMTP_MAIL_FROM),
-                    timeout=READ_TIMEOUT
+                    timeout=read_timeout
                 )
+                domain_profiles.record_latency(mx_host, "command", time.time() - started)
                 
                 # Stage 4: RCPT TO (the actual verification)
                 try:
+                    started = time.time()
                     response = await asyncio.wait_for(
                         smtp.rcpt(email),
-                        timeout=READ_TIMEOUT
+                        timeout=read_timeout
                     )
+                    domain_profiles.record_latency(mx_host, "command", time.time() - started)
                     code = response[0]
                     message = response[1] if len(response) > 1 else ""
                     
@@ -733,7 +749,8 @@ class StrictEmailValidator:
     async def validate_bulk(
         self, 
         emails: List[str],
-        batch_id: str = None
+        batch_id: str = None,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None
     ) -> List[Dict[str, Any]]:
         """
         Validate multiple emails with optimal performance.
@@ -742,6 +759,8 @@ class StrictEmailValidator:
         - DNS + MX resolution is async and parallel
         - SMTP concurrency limit: max 10 at a time
         - Never block pipeline on SMTP
+        
+        on_result is called with each result as soon as it is ready.
         """
         if not self._initialized:
             await self.initialize()
@@ -818,23 +837,23 @@ class StrictEmailValidator:
             
             return self._finalize_result(result)
         
-        # Run all validations with controlled concurrency
-        tasks = [validate_one(email) for email in unique_emails]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Process results
-        final_results = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                error_result = self._init_result(unique_emails[i])
-                error_result["status"] = "NEUTRAL"
-                error_result["reason"] = f"Validation error: {str(result)}"
-                error_result["retry_recommended"] = True
-                final_results.append(self._finalize_result(error_result))
-            else:
+        async def finish_one(email: str) -> Dict[str, Any]:
+            try:
+                result = await validate_one(email)
                 if batch_id:
                     result["batch_id"] = batch_id
-                final_results.append(result)
+            except Exception as e:
+                error_result = self._init_result(email)
+                error_result["status"] = "NEUTRAL"
+                error_result["reason"] = f"Validation error: {str(e)}"
+                error_result["retry_recommended"] = True
+                result = self._finalize_result(error_result)
+            if on_result:
+                on_result(result)
+            return result
+        
+        # Run all validations with controlled concurrency
+        final_results = await asyncio.gather(*[finish_one(email) for email in unique_emails])
         
         elapsed = time.time() - start_time
         rate = len(unique_emails) / max(elapsed, 0.001)
@@ -982,7 +1001,8 @@ async def validate_email_strict(email: str) -> Dict[str, Any]:
     return await validator.validate_email(email)
 
 
-async def validate_bulk_strict(emails: List[str], batch_id: str = None) -> List[Dict[str, Any]]:
+async def validate_bulk_strict(emails: List[str], batch_id: str = None,
+                               on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
     """Validate multiple emails with strict rules"""
     validator = await get_strict_validator()
-    return await validator.validate_bulk(emails, batch_id)
+    return await validator.validate_bulk(emails, batch_id, on_result=on_result)
@@ -0,0 +1,125 @@
+"""
+Verdict Cache
+Final per-address results keyed by normalized email.
+Bounded in-memory LRU in front of the shared cache backend, with a TTL per
+status class: a hard bounce stays invalid for days, an unknown is retried soon.
+"""
+import copy
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache_backend import CacheBackend, get_cache_backend
+from .circuit_breaker import REASON_PORT_25_BLOCKED, REASON_MX_CIRCUIT_OPEN
+
+# Seconds each status class stays cached (0 = never cache)
+VERDICT_TTLS = {
+    "invalid": 7 * 86400,
+    "valid": 86400,
+    "risky": 6 * 3600,
+    "unknown": 900,
+}
+DEFAULT_VERDICT_TTL = 3600
+
+# Sub-statuses that say more about our side than about the mailbox
+TRANSIENT_SUB_STATUSES = {"error": 0, "dns_error": 900, "timeout": 900}
+
+# SMTP short-circuited by a circuit breaker: the mailbox was never asked, so the verdict is not kept
+UNCHECKED_SMTP_STATUSES = {REASON_PORT_25_BLOCKED, REASON_MX_CIRCUIT_OPEN}
+
+# SMTP asked but got no definitive answer (greylisting, timeout, dropped session, odd code).
+# Scoring still calls these deliverable, so they are only kept briefly; "code_*" counts too.
+INCONCLUSIVE_SMTP_STATUSES = {"error", "timeout", "temporary", "pending", "unknown", "tarpit"}
+INCONCLUSIVE_SMTP_TTL = 900
+
+# Per-request fields that must not leak into a cached copy
+UNCACHED_FIELDS = ("batch_id", "execution_ms")
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+class VerdictCache:
+    """
+    Two-level verdict cache: local LRU (bounded) + shared backend (namespace "verdict").
+    Hits are returned as copies flagged cached=True.
+    """
+
+    def __init__(self, max_size: int = 100000, backend: Optional[CacheBackend] = None):
+        self.max_size = max_size
+        self._lru: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self) -> CacheBackend:
+        return self._backend or get_cache_backend()
+
+    def ttl_for(self, result: Dict[str, Any]) -> float:
+        smtp = str(result.get("checks", {}).get("smtp", ""))
+        if smtp in UNCHECKED_SMTP_STATUSES:
+            return 0
+        sub_status = result.get("sub_status")
+        if sub_status in TRANSIENT_SUB_STATUSES:
+            return TRANSIENT_SUB_STATUSES[sub_status]
+        if smtp in INCONCLUSIVE_SMTP_STATUSES or smtp.startswith("code_"):
+            return INCONCLUSIVE_SMTP_TTL
+        return VERDICT_TTLS.get(str(result.get("status", "")).lower(), DEFAULT_VERDICT_TTL)
+
+    async def get(self, email: str) -> Optional[Dict[str, Any]]:
+        key = normalize_email(email)
+        entry = self._lru.get(key)
+        if entry is not None:
+            result, expires_at = entry
+            if time.time() < expires_at:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return self._hit_copy(result, email)
+            del self._lru[key]
+
+        if self.backend.shared:
+            hit = await self.backend.get("verdict", key)
+            if hit is not None:
+                result, expires_at = hit
+                self._remember(key, result, expires_at)
+                self.hits += 1
+                return self._hit_copy(result, email)
+
+        self.misses += 1
+        return None
+
+    async def get_many(self, emails: List[str]) -> Dict[str, Dict[str, Any]]:
+        """{email: cached result} for the addresses that hit"""
+        hits = {}
+        for email in emails:
+            result = await self.get(email)
+            if result is not None:
+                hits[email] = result
+        return hits
+
+    def put(self, email: str, result: Dict[str, Any]):
+        ttl = self.ttl_for(result)
+        if ttl <= 0:
+            return
+        key = normalize_email(email)
+        stored = {k: v for k, v in result.items() if k not in UNCACHED_FIELDS}
+        self._remember(key, stored, time.time() + ttl)
+        self.backend.publish("verdict", key, stored, ttl)
+
+    def _remember(self, key: str, result: Dict[str, Any], expires_at: float):
+        self._lru[key] = (result, expires_at)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    def _hit_copy(self, result: Dict[str, Any], email: str) -> Dict[str, Any]:
+        res = copy.deepcopy(result)
+        res["email"] = email
+        res["execution_ms"] = 0.0
+        res["cached"] = True
+        return res
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"size": len(self._lru), "hits": self.hits, "misses": self.misses}